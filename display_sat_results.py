@@ -1,6 +1,100 @@
 #!venv/bin/python
+import json
+import sys
 from sys import argv, stdin, stderr
-from lib.file_io import read_grid
+from lib.file_io import read_grid, open_text
+from lib.gen_formule import decode_solution, decode_solutions
+
+SEPARATOR = "________________________________________________________________________________"
+
+# Texte d'une solution pour chaque format de sortie (--format=...), en
+# morceaux: début, début de ligne, après chaque case, fin de ligne, entre deux
+# lignes, fin
+FORMATS = {
+    # grille affichée case par case, suivie d'une ligne de séparation
+    "text": ("", "", " ", "\n", "", SEPARATOR + "\n\n"),
+    # une ligne JSON par solution: {"layout": ["BS-", "N--", ...]}
+    "jsonl": ('{"layout": [', '"', "", '"', ", ", "]}\n"),
+    # une ligne par solution, les lignes de la grille séparées par des '/'
+    "compact": ("", "", "", "", "/", "\n"),
+}
+
+# taille approximative (en octets) de chaque écriture
+BLOCK_SIZE = 1 << 20
+
+
+def format_layout(layout, output_format="text"):
+    """
+    Renvoie le texte d'une solution décodée (voir decode_solution) dans le
+    format de sortie choisi.
+    """
+    begin, row_begin, cell_end, row_end, row_sep, end = FORMATS[output_format]
+    return (
+        begin
+        + row_sep.join(
+            row_begin + "".join(cell + cell_end for cell in row) + row_end
+            for row in layout
+        )
+        + end
+    )
+
+
+def _template(width, height, output_format):
+    """
+    Renvoie le texte d'une solution dont toutes les cases valent '-' (en
+    octets) et la position de chaque case dans ce texte: tous les textes
+    d'un même format ont la même longueur, il suffit d'y recopier les
+    symboles des cases.
+    """
+    begin, row_begin, cell_end, row_end, row_sep, end = FORMATS[output_format]
+    text = begin
+    positions = []
+    for y in range(height):
+        if y:
+            text += row_sep
+        text += row_begin
+        for x in range(width):
+            positions.append(len(text))
+            text += "-" + cell_end
+        text += row_end
+    text += end
+    return text.encode(), positions
+
+
+def write_solutions(solutions, width, height, output_format="text", out=None):
+    """
+    Écrit les solutions fournies par le satsolver (listes d'entiers, ou
+    tableau numpy d'une solution par ligne) dans le format de sortie choisi,
+    sur out (flux binaire, sortie standard par défaut). Les solutions sont
+    décodées et écrites par blocs (avec numpy s'il est installé).
+    """
+    if out is None:
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    template, positions = _template(width, height, output_format)
+    count = max(1, BLOCK_SIZE // len(template))  # solutions par écriture
+    needed = 3 * width * (height + 1)  # variables lues dans chaque solution
+    for start in range(0, len(solutions), count):
+        chunk = solutions[start : start + count]
+        if numpy is None:
+            out.write(
+                "".join(
+                    format_layout(decode_solution(solution, width, height), output_format)
+                    for solution in chunk
+                ).encode()
+            )
+            continue
+        if not isinstance(chunk, numpy.ndarray):
+            chunk = numpy.array([solution[:needed] for solution in chunk])
+        block = numpy.tile(numpy.frombuffer(template, dtype=numpy.uint8), (len(chunk), 1))
+        block[:, positions] = decode_solutions(chunk, width, height).reshape(len(chunk), -1)
+        out.write(block.tobytes())
+    out.flush()
 
 
 def interpret_results(clause, gridWidth, gridHeight):
@@ -17,55 +111,57 @@ def interpret_results(clause, gridWidth, gridHeight):
       - 'N' = case noire
       - '-' = case vide
     """
-    # Parcourir la clause en ignorant les variables en dehors de la grille
-    # servant uniquement pour résoudre le problème
-    x = 0  # colonne courante
-    y = 0  # ligne courante
-    # La première variable dans la grille (la case en haut à gauche) est
-    # précédée par une ligne entière de variables
-    i = gridWidth * 3
-
-    # On ne sait pas combien de variables le satsolver a rajouté dans la
-    # clause pour résoudre le problème, on doit donc compter les lignes pour
-    # savoir où s'arrêter
-    while y < gridHeight:
-        if clause[i] > 0:
-            # Afficher un ballon
-            print("B", end=" ")
-        elif clause[i + 1] > 0:
-            # afficher une pierre
-            print("S", end=" ")
-        elif clause[i + 2] > 0:
-            # afficher une case noire
-            print("N", end=" ")
-        else:
-            # afficher une case vide
-            print("-", end=" ")
-        i += 3 # passer au groupe de variables suivante
-        x += 1 # passer à la colonne suivante
-        if x >= gridWidth:
-            # si on est arrivé en bout de ligne, afficher un retour à ligne
-            print("")
-            # repasser à la premièrecolonne et passer à la ligne suivante
-            x = 0
-            y += 1
-    # terminer l'affichage par une ligne pour bien marquer que c'est la fin de la grille
-    print(
-        "________________________________________________________________________________\n"
-    )
+    write_solutions([clause], gridWidth, gridHeight)
+
+
+def parse_models(text):
+    """
+    Convertit une suite de solutions (entiers séparés par des blancs, chaque
+    solution terminée par un 0) en un tableau numpy d'une solution par ligne
+    si numpy est installé et que toutes les solutions ont la même longueur,
+    en une liste de listes d'entiers sinon.
+    """
+    try:
+        import numpy
+    except ImportError:
+        solutions = text.split(" 0 ")
+        # se débarasser de potentielles listes vides causées par le split qui agit en fin de ligne
+        solutions = [line for line in solutions if line.strip() != ""]
+        return [list(map(int, line.split())) for line in solutions]
+
+    # conversion de tous les entiers en un seul appel
+    values = numpy.fromstring(text, dtype=numpy.int64, sep=" ")
+    ends = numpy.flatnonzero(values == 0) + 1
+    if len(ends) == 0 or ends[-1] != len(values):
+        # dernière solution sans 0 final
+        ends = numpy.append(ends, len(values))
+    lengths = numpy.diff(ends, prepend=0)
+    if len(lengths) and (lengths == lengths[0]).all():
+        return values.reshape(len(lengths), lengths[0])
+    return [values[start - length : start] for start, length in zip(ends, lengths)]
 
 
 if __name__ == "__main__":
-    if len(argv) < 3:
+    # format de sortie: --format=text (défaut), --format=jsonl ou --format=compact
+    output_format = "text"
+    for arg in argv:
+        if arg.startswith("--format="):
+            output_format = arg[len("--format="):]
+    # --verify: vérifier chaque solution sur les règles du jeu (voir
+    # lib/verify) et signaler celles qui sont invalides
+    verify = "--verify" in argv
+    argv = [arg for arg in argv if not arg.startswith("--format=") and arg != "--verify"]
+    if len(argv) < 3 or output_format not in FORMATS:
         print("Error: incorrect number of arguments", file=stderr)
         print(
-            "Usage: {} <name of satsolver> path/to/grid/file path/to/sat/output/file".format(
+            "Usage: {} [--format=text|jsonl|compact] [--verify] <name of satsolver> path/to/grid/file path/to/sat/output/file".format(
                 argv[0]
             ),
             file=stderr,
         )
         print("Supported satsolvers: minisat, picosat", file=stderr)
         print("Sat output can be read from stdin", file=stderr)
+        print("Sat output files can be compressed (gzip, xz, zstd)", file=stderr)
         exit(1)
 
     # Lire la grille
@@ -75,7 +171,8 @@ if __name__ == "__main__":
     if len(argv) == 3:
         satfile = stdin
     else:
-        satfile = open(argv[3], "r")
+        # (éventuellement compressé: gzip, xz ou zstd)
+        satfile = open_text(argv[3])
 
     content = satfile.read()  # Lire le contenu
 
@@ -84,24 +181,15 @@ if __name__ == "__main__":
         satfile.close()
 
     # Parser le contenu
+    solutions = None
     if argv[1] == "minisat":
         # Minisat ne fournit qu'une solution à la fois, et le format de fichier est très simple:
         # La première ligne contient "SAT\n" si le problème est satisfaisable, et la 2e ligne
         # contient la solution
         satisfiability = content.split("\n", 1)[0]
-        solutions = content.split("\n", 1)[1]
 
         if satisfiability == "SAT":
-            solutions = solutions.split("\n")
-            # se débarasser de potentielles listes vides causées par le split qui agit en fin de ligne
-            solutions = [line for line in solutions if line != ""]
-            # convertir la solution (chaine de caractères) en liste d'entiers
-            solutions = [list(map(int, line.split(" "))) for line in solutions]
-            print("S : stone\nB : balloon\nN : black cell\n- : empty cell\n")
-            print("{} solutions found:".format(len(solutions)))
-        else:
-            print("No solutions found")
-            exit(0)
+            solutions = parse_models(content.split("\n", 1)[1])
 
     elif argv[1] == "picosat":
         # l'affichage de sortie de picosat est plus compliqué: si le problème est satisfaisable
@@ -120,22 +208,34 @@ if __name__ == "__main__":
                 0
             ]  # se débarasser du nombre de solutions
             solutions = solutions.replace(
-                "v ", ""
+                "v ", " "
             )  # supprimer tous les "v " en début de ligne
             solutions = solutions.replace(
                 "\n", " "
             )  # recoller toutes les lignes ensemble
-            solutions = solutions.split(" 0 ")  # couper la liste à chaque 0
-            # se débarasser de potentielles listes vides causées par le split qui agit en fin de ligne
-            solutions = [line for line in solutions if line != ""]
-            # convertir la solution (chaine de caractères) en liste d'entiers
-            solutions = [list(map(int, line.split(" "))) for line in solutions]
-            print("S : stone\nB : balloon\nN : black cell\n- : empty cell\n")
-            print("{} solutions found:".format(len(solutions)))
-        else:
+            solutions = parse_models(solutions)
+
+    if solutions is None:
+        if output_format == "text":
             print("No solutions found")
-            exit(0)
+        else:
+            print("No solutions found", file=stderr)
+        exit(0)
 
     # Afficher les solutions
-    for line in solutions:
-        interpret_results(line, grid["width"], grid["height"])
+    if output_format == "text":
+        print("S : stone\nB : balloon\nN : black cell\n- : empty cell\n")
+        print("{} solutions found:".format(len(solutions)))
+    write_solutions(solutions, grid["width"], grid["height"], output_format)
+
+    if verify:
+        from lib.verify import verify_models, describe
+
+        invalid = 0
+        for i, flags in enumerate(verify_models(grid, solutions)):
+            if flags:
+                invalid += 1
+                print("error: solution {} is invalid: {}".format(i + 1, ", ".join(describe(flags))), file=stderr)
+        if invalid:
+            print("error: {} invalid solutions out of {}".format(invalid, len(solutions)), file=stderr)
+            exit(1)
@@ -0,0 +1,22 @@
+#!venv/bin/python
+from sys import argv, stderr
+from lib.file_io import read_grid
+from lib.corpus import write_corpus, append_corpus
+
+if __name__ == "__main__":
+    # ajouter les grilles à un corpus existant plutôt que de l'écraser: --append
+    append = "--append" in argv
+    argv = [arg for arg in argv if arg != "--append"]
+    # vérification du nombre d'arguments
+    if len(argv) < 3:
+        print("Erreur: veuillez fournir le corpus à créer et au moins une grille en argument", file=stderr)
+        print("Usage: {} [--append] path/to/corpus.dfc path/to/grid.json path/to/another/grid.json ....".format(argv[0]), file=stderr)
+        exit(1)
+
+    # lire les grilles au fur et à mesure de l'écriture
+    grids = (read_grid(path) for path in argv[2:])
+    if append:
+        count = append_corpus(argv[1], grids)
+    else:
+        count = write_corpus(argv[1], grids)
+    print("{}: {} grids".format(argv[1], count))
@@ -0,0 +1,7 @@
+#!venv/bin/python
+from sys import argv
+from lib.cli import solve
+
+if __name__ == "__main__":
+    # voir lib/cli (aussi disponible avec: python3 -m lib solve ...)
+    solve(argv)
@@ -0,0 +1,5 @@
+from sys import argv
+from lib.cli import main
+
+# python3 -m lib <commande> ... (voir lib/cli)
+main(argv)
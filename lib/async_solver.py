@@ -0,0 +1,279 @@
+"""
+API asyncio: résolution, énumération des solutions et test d'unicité sans
+bloquer la boucle d'événements.
+
+Le travail est fait dans des processus de résolution gérés par
+AsyncSolver: au plus max_concurrency appels en parallèle (les autres
+attendent leur tour), chaque processus ne traitant qu'un appel à la fois.
+Un appel annulé (tâche annulée, ou délai timeout dépassé) arrête vraiment le
+calcul: le processus qui le faisait est tué, puis remplacé au besoin. Un
+budget (voir lib/budget) limite au contraire la résolution sans perdre le
+processus, et indique ce qui a été dépensé.
+
+    async with AsyncSolver(workers=4) as solver:
+        layout = await solver.solve(grid, timeout=2)
+        result, spent = await solver.solve_within(grid, Budget(seconds=1))
+        async for layout in solver.enumerate(grid, limit=100):
+            ...
+        unique = await solver.is_unique(grid)
+
+Les processus sont lancés avec la méthode "spawn": comme pour
+multiprocessing, le programme principal doit protéger son code par
+if __name__ == "__main__".
+
+Les grilles sont des dictionnaires au format de file_io.read_grid ou des
+GridModel; les solutions sont données comme par decode_solution (liste de
+height chaînes de width caractères).
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.grid_model import GridModel
+
+# nombre de solutions envoyées d'un coup par un processus qui énumère: il
+# attend ensuite que le consommateur en demande d'autres
+CHUNK_SIZE = 64
+
+
+def _worker_main(conn, backend, encoding):
+    """
+    Boucle d'un processus de résolution: reçoit des requêtes
+    (type, modèle, limite) et renvoie des messages (type, valeur, suite).
+    La limite d'une résolution est son budget (voir lib/budget).
+    """
+    from lib import bitset_solver
+    from lib.backends import get_backend
+    from lib.gen_formule import decode_solution
+    from lib.gen_segments import ENCODERS
+    from lib.validate import validate_grid, unsat_reason
+    from lib.budget import solve_within
+
+    backend = get_backend(backend)
+    encoder = ENCODERS[encoding]
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        kind, model, limit = request
+        try:
+            if kind == "solve":
+                result, spent = "UNSAT", {"seconds": 0.0, "budget": limit}
+                if unsat_reason(validate_grid(model)) is None:
+                    result, spent = solve_within(backend, encoder(model), limit)
+                    if result != "UNSAT" and result != "UNKNOWN":
+                        result = decode_solution(result, model.width, model.height)
+                conn.send(("done", (result, spent), False))
+                continue
+            # énumération, avec le solveur dédié (pas de doublons dus aux
+            # variables auxiliaires des encodages)
+            chunk = []
+            count = 0
+            for solution in bitset_solver.itersolve(model):
+                chunk.append(decode_solution(solution, model.width, model.height))
+                count += 1
+                if count == limit:
+                    break
+                if len(chunk) == CHUNK_SIZE:
+                    conn.send(("solutions", chunk, True))
+                    chunk = []
+                    if not conn.recv():
+                        break  # le consommateur s'est arrêté
+            if chunk:
+                conn.send(("solutions", chunk, False))
+            conn.send(("done", count, False))
+        except Exception as error:
+            conn.send(("error", error, False))
+
+
+def _model(grid):
+    return grid if isinstance(grid, GridModel) else GridModel.from_json(grid)
+
+
+class _Worker:
+    def __init__(self, context, backend, encoding):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, backend, encoding), daemon=True
+        )
+        self.process.start()
+        # seul le processus fils garde son extrémité: sa mort est alors vue
+        # comme une fin de fichier
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class AsyncSolver:
+    """
+    Processus de résolution pour l'API asyncio.
+    Arguments (optionnels):
+      - workers: nombre maximal de processus (nombre de processeurs par
+        défaut), démarrés à la demande puis réutilisés
+      - max_concurrency: nombre maximal d'appels en parallèle (workers par
+        défaut)
+      - backend, encoding: satsolver et encodage de solve (voir
+        backends.get_backend et gen_segments.ENCODERS). enumerate et
+        is_unique utilisent le solveur dédié (voir lib/bitset_solver).
+    """
+
+    def __init__(self, workers=None, max_concurrency=None, backend="pycosat",
+                 encoding="classic"):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.encoding = encoding
+        self._context = multiprocessing.get_context("spawn")
+        self._semaphore = asyncio.Semaphore(min(max_concurrency or self.workers, self.workers))
+        self._idle = []
+        self._all = []
+        # attente des réponses des processus, sans bloquer la boucle
+        self._threads = ThreadPoolExecutor(self.workers)
+
+    async def _take(self):
+        if self._idle:
+            return self._idle.pop()
+        # le lancement d'un processus prend plusieurs dizaines de
+        # millisecondes: il est fait hors de la boucle d'événements
+        worker = await asyncio.get_running_loop().run_in_executor(
+            self._threads, _Worker, self._context, self.backend, self.encoding
+        )
+        self._all.append(worker)
+        return worker
+
+    def _discard(self, worker):
+        worker.kill()
+        self._all.remove(worker)
+
+    async def _receive(self, worker, deadline):
+        loop = asyncio.get_running_loop()
+        reply = loop.run_in_executor(self._threads, worker.conn.recv)
+        if deadline is None:
+            return await reply
+        return await asyncio.wait_for(reply, max(0, deadline - loop.time()))
+
+    def _deadline(self, timeout):
+        if timeout is None:
+            return None
+        return asyncio.get_running_loop().time() + timeout
+
+    async def solve(self, grid, timeout=None, budget=None):
+        """
+        Résout la grille. Renvoie la disposition d'une solution, None si la
+        grille n'a pas de solution, ou "UNKNOWN" si le satsolver n'a pas
+        répondu (budget épuisé, voir solve_within). Lève TimeoutError si la
+        réponse n'est pas arrivée au bout de timeout secondes.
+        """
+        result, _ = await self.solve_within(grid, budget, timeout)
+        return None if result == "UNSAT" else result
+
+    async def solve_within(self, grid, budget=None, timeout=None):
+        """
+        Résout la grille avec le budget fourni (voir lib/budget). Renvoie,
+        comme budget.solve_within, le résultat (disposition d'une solution,
+        "UNSAT" ou "UNKNOWN") et les ressources dépensées: {"seconds": durée
+        de la résolution, "budget": budget alloué}. Lève TimeoutError si la
+        réponse n'est pas arrivée au bout de timeout secondes.
+        """
+        model = _model(grid)
+        deadline = self._deadline(timeout)
+        async with self._semaphore:
+            worker = await self._take()
+            try:
+                worker.conn.send(("solve", model, budget))
+                kind, value, _ = await self._receive(worker, deadline)
+            except BaseException:
+                # annulation, délai dépassé ou processus mort: le calcul en
+                # cours est abandonné avec son processus
+                self._discard(worker)
+                raise
+            self._idle.append(worker)
+        if kind == "error":
+            raise value
+        return value
+
+    async def enumerate(self, grid, limit=None, timeout=None):
+        """
+        Itérateur asynchrone sur les solutions de la grille (au plus limit
+        solutions si limit est fourni). Lève TimeoutError si l'énumération
+        n'est pas terminée au bout de timeout secondes. Les solutions sont
+        calculées par paquets, à mesure qu'elles sont consommées.
+        """
+        model = _model(grid)
+        deadline = self._deadline(timeout)
+        async with self._semaphore:
+            worker = await self._take()
+            more = False  # le processus attend qu'on lui demande la suite
+            error = None
+            try:
+                worker.conn.send(("enumerate", model, limit))
+                while True:
+                    kind, value, more = await self._receive(worker, deadline)
+                    if kind == "done":
+                        break
+                    if kind == "error":
+                        error = value
+                        break
+                    for layout in value:
+                        yield layout
+                    if more:
+                        worker.conn.send(True)
+                        more = False
+            except GeneratorExit:
+                # le consommateur s'est arrêté: prévenir le processus, qui
+                # redevient disponible
+                try:
+                    if more:
+                        worker.conn.send(False)
+                    while (await self._receive(worker, deadline))[0] != "done":
+                        pass
+                except BaseException:
+                    self._discard(worker)
+                    raise
+                self._idle.append(worker)
+                raise
+            except BaseException:
+                self._discard(worker)
+                raise
+            self._idle.append(worker)
+        if error is not None:
+            raise error
+
+    async def is_unique(self, grid, timeout=None):
+        """
+        Renvoie True si la grille a exactement une solution.
+        """
+        count = 0
+        async for _ in self.enumerate(grid, limit=2, timeout=timeout):
+            count += 1
+        return count == 1
+
+    async def close(self):
+        """
+        Arrête les processus (ceux qui calculent encore sont tués).
+        """
+        for worker in self._idle:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        loop = asyncio.get_running_loop()
+        for worker in self._all:
+            if worker in self._idle:
+                await loop.run_in_executor(self._threads, worker.process.join)
+            else:
+                worker.kill()
+        self._idle = []
+        self._all = []
+        self._threads.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
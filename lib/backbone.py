@@ -0,0 +1,127 @@
+"""
+Backbone d'une grille: les cases dont le contenu (ballon, pierre ou rien)
+est le même dans toutes les solutions.
+
+Plutôt que de faire un appel au satsolver par variable, on part d'une
+solution et on garde comme candidats les littéraux ballon/pierre de chaque
+case dans cette solution. On répartit ensuite les candidats en k lots et on
+demande au satsolver une solution qui contredit au moins un candidat de
+chaque lot (une clause par lot):
+  - si la formule est satisfaisable, la nouvelle solution élimine tous les
+    candidats qu'elle contredit, au moins k d'un coup (filtrage par les
+    solutions), et on recommence;
+  - sinon on divise k par deux. Quand k vaut 1, une réponse insatisfaisable
+    prouve que tous les candidats restants sont dans le backbone.
+Le premier essai se fait avec un seul lot, puis avec 64 lots.
+Le backbone d'une grille 20x20, même avec un nombre astronomique de
+solutions, s'obtient ainsi en quelques dizaines d'appels au plus (deux pour
+une grille à solution unique).
+"""
+from lib.gen_formule import BALLOON, STONE, cell_var, gen_cnf
+from lib.backends import PycosatBackend
+from lib.profiling import profiled
+from lib.grid_model import unpack_grid
+
+
+@profiled("backbone")
+def compute_backbone(
+    width, height=None, zones=None, blacks=None, backend=None, encoder=gen_cnf, groups=64,
+    budget=None,
+):
+    """
+    Calcule le backbone de la grille.
+    Arguments:
+      - width, height, zones, blacks: grille, comme pour gen_cnf (ou un
+                                      GridModel à la place de width)
+      - backend (optionnel): satsolver à utiliser (voir lib/backends),
+                             pycosat par défaut
+      - encoder (optionnel): fonction d'encodage de la grille (gen_cnf ou
+                             gen_cnf_segments)
+      - groups (optionnel): nombre de lots de candidats après le premier
+                            essai
+      - budget (optionnel): budget du calcul (voir lib/budget): la durée
+                            est partagée par tous les appels au satsolver,
+                            le nombre de propagations est limité appel par
+                            appel
+    Renvoie None si la grille n'a pas de solution, "UNKNOWN" si le satsolver
+    n'a pas répondu (budget épuisé), sinon un dictionnaire:
+    {
+        "layout": liste de height chaînes de width caractères:
+                  'B' ballon forcé, 'S' pierre forcée, '-' case forcément
+                  vide, 'N' case noire, '?' case non forcée,
+        "literals": liste des littéraux du backbone (variables ballon et
+                    pierre des cases),
+        "solver_calls": nombre d'appels au satsolver
+    }
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    if backend is None:
+        backend = PycosatBackend()
+    deadline = None if budget is None else budget.deadline()
+
+    def solve(cnf):
+        return backend.solve(cnf, None if budget is None else budget.remaining(deadline))
+
+    cnf = encoder(width, height, zones, blacks)
+    solver_calls = 1
+    model = solve(cnf)
+    if model == "UNSAT":
+        return None
+    if model == "UNKNOWN":
+        return model
+
+    solid = set(map(tuple, blacks))
+    candidates = []
+    for y in range(height):
+        for x in range(width):
+            if (x, y) not in solid:
+                for mode in (BALLOON, STONE):
+                    candidates.append(model[cell_var(x, y, width, mode) - 1])
+
+    backbone = set()
+    # premier essai avec un seul lot: une grille à solution unique est
+    # réglée dès le deuxième appel
+    lots = 1
+    while candidates:
+        lots = max(1, min(lots, len(candidates)))
+        # au moins un des candidats de chaque lot doit être contredit
+        model = solve(
+            cnf + [[-literal for literal in candidates[i::lots]] for i in range(lots)]
+        )
+        solver_calls += 1
+        if model == "UNSAT":
+            if lots == 1:
+                backbone.update(candidates)
+                break
+            lots //= 2
+        elif model == "UNKNOWN":
+            return model
+        else:
+            # ne garder que les candidats qui sont vrais dans la nouvelle
+            # solution
+            candidates = [l for l in candidates if model[abs(l) - 1] == l]
+            if solver_calls == 2:
+                lots = groups
+
+    layout = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            balloon = cell_var(x, y, width, BALLOON)
+            stone = cell_var(x, y, width, STONE)
+            if (x, y) in solid:
+                row.append("N")
+            elif balloon in backbone:
+                row.append("B")
+            elif stone in backbone:
+                row.append("S")
+            elif -balloon in backbone and -stone in backbone:
+                row.append("-")
+            else:
+                row.append("?")
+        layout.append("".join(row))
+    return {
+        "layout": layout,
+        "literals": sorted(backbone, key=abs),
+        "solver_calls": solver_calls,
+    }
@@ -0,0 +1,361 @@
+"""
+Satsolvers interchangeables.
+
+Chaque backend expose une méthode solve(cnf) ayant la même interface que
+pycosat.solve: elle prend une liste de clauses (listes d'entiers) et renvoie
+soit la liste des littéraux d'une solution, soit "UNSAT", soit "UNKNOWN".
+Un budget (voir lib/budget) peut être fourni en second argument: le
+backend renvoie "UNKNOWN" quand il est épuisé. Une durée maximale est
+imposée en lançant le satsolver dans un processus (ou un sous-processus),
+tué à l'échéance.
+
+  - PycosatBackend: pycosat, dans le processus courant
+  - SubprocessBackend: n'importe quel satsolver DIMACS installé localement
+    (picosat, kissat, cadical, minisat...), lancé comme sous-processus. La
+    formule lui est envoyée par un tube et la solution est lue sur sa sortie
+    standard: pas de fichiers temporaires.
+  - PortfolioBackend: lance plusieurs backends en parallèle dans des
+    processus séparés, renvoie la première réponse et tue les autres.
+
+get_backend() construit un backend à partir d'une chaîne de caractères
+(option --backend des scripts), par exemple:
+    "pycosat", "pycosat:seed=3", "picosat", "cmd:kissat -q",
+    "portfolio:pycosat,pycosat:seed=1,picosat"
+"""
+import os
+
+
+class Backend:
+    """
+    Classe de base des backends. Si seed est fourni, l'ordre des clauses est
+    mélangé avant la résolution: deux graines différentes font explorer au
+    satsolver des chemins différents, ce qui est utile en portfolio.
+    """
+
+    name = "backend"
+
+    def __init__(self, seed=None):
+        self.seed = seed
+
+    def prepare(self, cnf):
+        if self.seed is None:
+            return cnf
+        import random
+
+        clauses = list(cnf)
+        random.Random(self.seed).shuffle(clauses)
+        return clauses
+
+    def solve(self, cnf, budget=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        if self.seed is None:
+            return self.name
+        return "{}:seed={}".format(self.name, self.seed)
+
+
+class PycosatBackend(Backend):
+    """
+    pycosat, dans le processus courant.
+    """
+
+    name = "pycosat"
+    # avec une durée maximale, premier essai dans le processus courant
+    # limité à ce nombre de propagations (quelques millisecondes): les
+    # formules faciles, comme les petites composantes d'une grille (voir
+    # lib/decompose), sont résolues sans lancer de processus
+    quick_propagations = 1 << 18
+
+    def solve(self, cnf, budget=None):
+        import pycosat
+
+        if budget is not None and budget.seconds is not None:
+            import time
+            from lib.budget import Budget
+
+            if budget.expired:
+                return "UNKNOWN"
+            start = time.monotonic()
+            quick = self.quick_propagations
+            if budget.propagations is not None:
+                quick = min(quick, budget.propagations)
+            result = pycosat.solve(self.prepare(cnf), prop_limit=quick)
+            if result != "UNKNOWN" or quick == budget.propagations:
+                return result
+            # pycosat ne peut pas être interrompu: il est relancé dans un
+            # processus tué à l'échéance
+            return PortfolioBackend([self]).solve(
+                cnf, Budget(budget.propagations, budget.seconds - (time.monotonic() - start))
+            )
+        if budget is not None and budget.propagations is not None:
+            return pycosat.solve(self.prepare(cnf), prop_limit=budget.propagations)
+        return pycosat.solve(self.prepare(cnf))
+
+
+class SubprocessBackend(Backend):
+    """
+    Satsolver externe lancé comme sous-processus.
+    Arguments:
+      - command: liste des éléments de la ligne de commande. Le satsolver
+                 doit lire la formule DIMACS sur son entrée standard et
+                 écrire sa réponse sur sa sortie standard, soit au format des
+                 compétitions SAT (lignes "s SATISFIABLE" puis "v ..."), soit
+                 au format de minisat ("SAT" puis la solution sur une ligne).
+      - seed (optionnel): graine de mélange des clauses
+    """
+
+    def __init__(self, command, seed=None):
+        super().__init__(seed)
+        self.command = list(command)
+        self.name = "cmd:" + " ".join(self.command)
+
+    def solve(self, cnf, budget=None):
+        # les formules binaires (voir lib/binary_cnf) connaissent leur nombre
+        # de variables
+        import subprocess
+        import threading
+
+        if budget is not None and budget.expired:
+            return "UNKNOWN"
+
+        nb_vars = getattr(cnf, "nb_vars", None)
+        cnf = self.prepare(cnf)
+        try:
+            process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return "UNKNOWN"
+        if nb_vars is None:
+            nb_vars = 0
+            for clause in cnf:
+                for variable in clause:
+                    nb_vars = max(nb_vars, abs(variable))
+        # La formule est écrite depuis un thread pendant qu'on lit la sortie:
+        # le satsolver peut commencer à écrire avant d'avoir tout lu
+        writer = threading.Thread(
+            target=_write_dimacs, args=(cnf, nb_vars, process.stdin)
+        )
+        writer.start()
+        # durée maximale: le satsolver est tué à l'échéance (le nombre de
+        # propagations n'est pas limité)
+        timer = None
+        if budget is not None and budget.seconds is not None:
+            timer = threading.Timer(budget.seconds, process.kill)
+            timer.start()
+        output = process.stdout.read().decode(errors="replace")
+        writer.join()
+        process.wait()
+        if timer is not None:
+            timer.cancel()
+            if timer.finished.is_set() and process.returncode < 0:
+                # tué: la sortie peut être tronquée
+                return "UNKNOWN"
+        return parse_solver_output(output, nb_vars)
+
+
+def _write_dimacs(cnf, nb_vars, stream):
+    """
+    Ecrit la formule au format DIMACS dans le flux fourni, par blocs.
+    """
+    try:
+        stream.write("p cnf {} {}\n".format(nb_vars, len(cnf)).encode())
+        block = []
+        for clause in cnf:
+            block.append(" ".join(map(str, clause)) + " 0\n")
+            if len(block) >= 4096:
+                stream.write("".join(block).encode())
+                block = []
+        stream.write("".join(block).encode())
+        stream.close()
+    except (BrokenPipeError, OSError):
+        # Le satsolver s'est arrêté (ou a été tué) avant de tout lire
+        pass
+
+
+def parse_solver_output(output, nb_vars):
+    """
+    Interprète la sortie d'un satsolver (format des compétitions SAT ou
+    format de minisat). Renvoie la liste complète des littéraux des
+    variables 1..nb_vars (les variables non mentionnées sont fausses), ou
+    "UNSAT", ou "UNKNOWN".
+    """
+    status = "UNKNOWN"
+    literals = []
+    minisat_model = False
+    for line in output.splitlines():
+        line = line.strip()
+        if line in ("s SATISFIABLE", "SAT", "SATISFIABLE"):
+            status = "SAT"
+            minisat_model = line == "SAT"
+        elif line in ("s UNSATISFIABLE", "UNSAT", "UNSATISFIABLE"):
+            return "UNSAT"
+        elif line.startswith("v "):
+            literals.extend(int(v) for v in line[2:].split())
+        elif minisat_model and line:
+            literals.extend(int(v) for v in line.split())
+            minisat_model = False
+    if status != "SAT":
+        return "UNKNOWN"
+    solution = [-v for v in range(1, nb_vars + 1)]
+    for literal in literals:
+        if literal != 0 and abs(literal) <= nb_vars:
+            solution[abs(literal) - 1] = literal
+    return solution
+
+
+class PortfolioBackend(Backend):
+    """
+    Lance plusieurs backends en parallèle, chacun dans son processus, et
+    renvoie la première réponse définitive (solution ou "UNSAT"). Les autres
+    processus (et leurs éventuels satsolvers externes) sont alors tués.
+    """
+
+    name = "portfolio"
+
+    def __init__(self, backends):
+        super().__init__()
+        self.backends = list(backends)
+        self.name = "portfolio:" + ",".join(map(repr, self.backends))
+
+    def __repr__(self):
+        return self.name
+
+    def solve(self, cnf, budget=None):
+        import multiprocessing
+        import queue as queue_module
+        import time
+
+        if budget is not None and budget.expired:
+            return "UNKNOWN"
+        deadline = None
+        worker_budget = None
+        if budget is not None:
+            # la durée est limitée ici (les concurrents sont tués), le
+            # nombre de propagations par chaque concurrent
+            if budget.seconds is not None:
+                deadline = time.monotonic() + budget.seconds
+            if budget.propagations is not None:
+                from lib.budget import Budget
+
+                worker_budget = Budget(budget.propagations)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_portfolio_worker,
+                args=(backend, cnf, results, worker_budget),
+                daemon=True,
+            )
+            for backend in self.backends
+        ]
+        for process in processes:
+            process.start()
+        answer = "UNKNOWN"
+        pending = len(processes)
+        try:
+            while pending:
+                timeout = 0.05
+                if deadline is not None:
+                    timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+                try:
+                    result = results.get(timeout=timeout)
+                except queue_module.Empty:
+                    if deadline is not None and time.monotonic() > deadline:
+                        break  # budget épuisé
+                    # un concurrent mort sans répondre ne doit pas bloquer
+                    # la course
+                    if any(process.is_alive() for process in processes):
+                        continue
+                    try:
+                        result = results.get_nowait()
+                    except queue_module.Empty:
+                        break
+                pending -= 1
+                if result != "UNKNOWN":
+                    answer = result
+                    break
+        finally:
+            for process in processes:
+                _kill(process)
+        return answer
+
+
+def _portfolio_worker(backend, cnf, results, budget=None):
+    # chaque concurrent a son propre groupe de processus, pour pouvoir tuer
+    # aussi les satsolvers externes qu'il a lancés
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    try:
+        result = backend.solve(cnf, budget)
+    except Exception:
+        result = "UNKNOWN"
+    results.put(result)
+
+
+def _kill(process):
+    import signal
+
+    if process.is_alive():
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+        else:
+            process.kill()
+    process.join()
+
+
+# Lignes de commande des satsolvers connus: formule lue sur l'entrée standard
+# et solution écrite sur la sortie standard
+KNOWN_SOLVERS = {
+    "picosat": ["picosat"],
+    "kissat": ["kissat", "-q"],
+    "cadical": ["cadical", "-q"],
+    "glucose": ["glucose", "-model", "-verb=0", "/dev/stdin"],
+    "cryptominisat5": ["cryptominisat5", "--verb=0"],
+    "minisat": ["minisat", "-verb=0", "/dev/stdin", "/dev/stdout"],
+}
+
+
+def get_backend(spec):
+    """
+    Construit un backend à partir de sa description textuelle:
+      - "pycosat" ou "pycosat:seed=N"
+      - le nom d'un satsolver connu (voir KNOWN_SOLVERS), éventuellement
+        suivi de ":seed=N"
+      - "cmd:<ligne de commande>" pour n'importe quel autre satsolver
+      - "portfolio:<backend>,<backend>,..." pour une course entre backends
+    """
+    if spec.startswith("portfolio:"):
+        return PortfolioBackend(get_backend(s) for s in spec[10:].split(","))
+    if spec.startswith("cmd:"):
+        return SubprocessBackend(spec[4:].split())
+    name, _, options = spec.partition(":")
+    seed = None
+    if options.startswith("seed="):
+        seed = int(options[5:])
+    if name == "pycosat":
+        return PycosatBackend(seed)
+    if name in KNOWN_SOLVERS:
+        return SubprocessBackend(KNOWN_SOLVERS[name], seed)
+    raise ValueError("Unknown satsolver backend: {}".format(spec))
+
+
+def parse_backend_flag(args, default="pycosat"):
+    """
+    Extrait de la liste d'arguments fournie l'option --backend=description et
+    renvoie le backend choisi et la liste des arguments restants.
+    """
+    spec = default
+    remaining = []
+    for arg in args:
+        if arg.startswith("--backend="):
+            spec = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    return get_backend(spec), remaining
@@ -0,0 +1,115 @@
+"""
+Format binaire brut pour les formules CNF, rechargeable sans analyse de
+texte.
+
+Format du fichier (entiers little-endian):
+  - en-tête (32 octets): signature b"DOSUNCNF", version (uint16), réservé
+    (uint16), nombre de variables (uint32), nombre de clauses (uint64),
+    nombre total de littéraux (uint64)
+  - positions: nombre de clauses + 1 entiers int64, la clause i étant
+    formée des littéraux d'indices positions[i] à positions[i+1] - 1
+  - littéraux: tous les littéraux des clauses, à la suite (int32)
+
+load_binary_cnf() projette le fichier en mémoire avec numpy.memmap: rien
+n'est lu ni converti avant d'être utilisé. La formule rechargée se passe
+directement aux backends (voir lib/backends) ou à pycosat, comme une liste
+de clauses.
+"""
+import struct
+import sys
+from array import array
+
+MAGIC = b"DOSUNCNF"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQ")
+
+
+def save_binary_cnf(cnf, path):
+    """
+    Enregistre les clauses fournies (liste de listes d'entiers, format de
+    pycosat) dans le fichier path au format binaire.
+    """
+    literals = array("i")
+    offsets = array("q", [0])
+    nb_vars = 0
+    for clause in cnf:
+        literals.extend(clause)
+        offsets.append(len(literals))
+    if literals:
+        nb_vars = max(max(literals), -min(literals))
+    if sys.byteorder == "big":
+        literals.byteswap()
+        offsets.byteswap()
+    with open(path, "wb") as out:
+        out.write(
+            HEADER.pack(MAGIC, VERSION, 0, nb_vars, len(offsets) - 1, len(literals))
+        )
+        out.write(offsets.tobytes())
+        out.write(literals.tobytes())
+
+
+class BinaryCNF:
+    """
+    Formule chargée par load_binary_cnf. Se comporte comme une liste de
+    clauses (len, indexation, itération). Attributs:
+      - nb_vars: plus grand indice de variable utilisé
+      - offsets, literals: tableaux numpy (projetés en mémoire) des
+        positions des clauses et des littéraux, voir le format en tête de
+        module
+    """
+
+    def __init__(self, nb_vars, offsets, literals):
+        self.nb_vars = nb_vars
+        self.offsets = offsets
+        self.literals = literals
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("clause index out of range")
+        return self.literals[self.offsets[i] : self.offsets[i + 1]].tolist()
+
+    def __iter__(self):
+        # une seule conversion de tout le tableau, puis des tranches de
+        # listes: bien plus rapide qu'une conversion par clause
+        literals = self.literals.tolist()
+        offsets = self.offsets.tolist()
+        for i in range(len(offsets) - 1):
+            yield literals[offsets[i] : offsets[i + 1]]
+
+
+def load_binary_cnf(path):
+    """
+    Charge la formule enregistrée par save_binary_cnf dans le fichier path,
+    par projection en mémoire (nécessite numpy). Renvoie un BinaryCNF.
+    """
+    import numpy
+
+    with open(path, "rb") as in_file:
+        header = in_file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("Not a binary CNF file: {}".format(path))
+    magic, version, _, nb_vars, nb_clauses, nb_literals = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not a binary CNF file: {}".format(path))
+    if version != VERSION:
+        raise ValueError("Unsupported binary CNF version {}: {}".format(version, path))
+    offsets = numpy.memmap(
+        path, dtype="<i8", mode="r", offset=HEADER.size, shape=(nb_clauses + 1,)
+    )
+    if nb_literals:
+        literals = numpy.memmap(
+            path,
+            dtype="<i4",
+            mode="r",
+            offset=HEADER.size + 8 * (nb_clauses + 1),
+            shape=(nb_literals,),
+        )
+    else:
+        # numpy refuse de projeter une zone vide
+        literals = numpy.zeros(0, dtype="<i4")
+    return BinaryCNF(nb_vars, offsets, literals)
@@ -0,0 +1,282 @@
+"""
+Solveur dédié au Dosun Fuwari, sans passer par une formule CNF.
+
+L'état de la grille est représenté par des entiers utilisés comme ensembles
+de bits (bit y*width+x pour la case (x,y)): cases noires, ballons, pierres,
+cases de chaque zone... La recherche est un retour arrière qui choisit à
+chaque étape la zone dont le ballon (ou la pierre) a le moins de positions
+possibles, et qui propage le support des colonnes: placer un ballon dans une
+case place aussi un ballon dans toutes les cases au-dessus d'elle jusqu'à la
+première case noire (ou au bord), ce qui fixe le ballon des zones de ces
+cases. Les pierres sont traitées de la même façon vers le bas.
+
+Les cases qui n'appartiennent à aucune zone ne reçoivent un ballon ou une
+pierre que s'il le faut pour supporter un autre ballon ou une autre pierre:
+seules les solutions minimales sur ces cases sont renvoyées (Grid.solve
+rend ces cases noires avant la résolution, elles n'existent donc pas dans
+l'interface graphique).
+"""
+from lib.gen_formule import BALLOON, STONE, BLACK, cell_var
+from lib.profiling import profiled
+from lib.grid_model import unpack_grid
+
+
+class _Puzzle:
+    """
+    Données précalculées d'une grille, partagées par toute la recherche.
+    """
+
+    def __init__(self, width, height, zones, blacks):
+        self.width = width
+        self.height = height
+        self.black = 0
+        for x, y in blacks:
+            self.black |= 1 << (y * width + x)
+
+        # préfixes/suffixes des segments de colonne: pref[c] contient c et
+        # toutes les cases au-dessus de c jusqu'à la première case noire,
+        # suff[c] contient c et toutes les cases en dessous
+        size = width * height
+        self.pref = [0] * size
+        self.suff = [0] * size
+        for x in range(width):
+            run = 0
+            for y in range(height):
+                c = y * width + x
+                if self.black >> c & 1:
+                    run = 0
+                else:
+                    run |= 1 << c
+                    self.pref[c] = run
+            run = 0
+            for y in reversed(range(height)):
+                c = y * width + x
+                if self.black >> c & 1:
+                    run = 0
+                else:
+                    run |= 1 << c
+                    self.suff[c] = run
+
+        self.zone_masks = []
+        self.zones_of = [()] * size
+        for z, zone in enumerate(zones):
+            mask = 0
+            for x, y in zone:
+                c = y * width + x
+                mask |= 1 << c
+                self.zones_of[c] = self.zones_of[c] + (z,)
+            self.zone_masks.append(mask)
+
+        # candidats statiques: une case ne peut contenir le ballon de sa zone
+        # que si aucune autre case de la même zone n'est au-dessus d'elle dans
+        # son segment, et que le préfixe ne contient pas deux cases d'une
+        # même autre zone (idem pour les pierres vers le bas)
+        self.balloon_candidates = []
+        self.stone_candidates = []
+        for z, mask in enumerate(self.zone_masks):
+            balloons = []
+            stones = []
+            for c in _bits(mask & ~self.black):
+                if self._is_consistent(self.pref[c]):
+                    balloons.append(c)
+                if self._is_consistent(self.suff[c]):
+                    stones.append(c)
+            self.balloon_candidates.append(balloons)
+            self.stone_candidates.append(stones)
+
+    def _is_consistent(self, cells):
+        seen = set()
+        for c in _bits(cells):
+            for z in self.zones_of[c]:
+                if z in seen:
+                    return False
+                seen.add(z)
+        return True
+
+    def model(self, balloons, stones):
+        """
+        Traduit la solution trouvée en liste de littéraux, au même format et
+        avec la même numérotation que pycosat sur la formule de gen_cnf.
+        """
+        width = self.width
+        solution = [0] * (3 * width * (self.height + 2))
+        for y in range(-1, self.height + 1):
+            for x in range(width):
+                c = y * width + x
+                inside = 0 <= y < self.height
+                for mode, value in (
+                    (BALLOON, inside and balloons >> c & 1),
+                    (STONE, inside and stones >> c & 1),
+                    (BLACK, not inside or self.black >> c & 1),
+                ):
+                    var = cell_var(x, y, width, mode)
+                    solution[var - 1] = var if value else -var
+        return solution
+
+
+def _bits(mask):
+    """
+    Enumère les indices des bits à 1 de mask.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _place(puzzle, state, cells, kind):
+    """
+    Ajoute les cases fournies (ensemble de bits) aux ballons (kind == 0) ou
+    aux pierres (kind == 1) de l'état, en fixant le ballon/la pierre des
+    zones concernées. Renvoie le nouvel état, ou None en cas de conflit.
+    L'état est un triplet de paires (ballons, pierres):
+      - les cases occupées (ensembles de bits)
+      - la case choisie dans chaque zone (listes, -1 si pas encore choisie)
+      - les cases des zones déjà pourvues (ensembles de bits)
+    """
+    placed, owners, closed = state
+    if cells & placed[1 - kind]:
+        return None
+    new = cells & ~placed[kind]
+    owner = list(owners[kind])
+    done = closed[kind]
+    for c in _bits(new):
+        for z in puzzle.zones_of[c]:
+            if owner[z] != -1:
+                return None
+            owner[z] = c
+            done |= puzzle.zone_masks[z]
+    if kind == 0:
+        return (placed[0] | new, placed[1]), (owner, owners[1]), (done, closed[1])
+    return (placed[0], placed[1] | new), (owners[0], owner), (closed[0], done)
+
+
+def _domain(puzzle, state, z, kind):
+    """
+    Renvoie les positions encore possibles pour le ballon (kind == 0) ou la
+    pierre (kind == 1) de la zone z.
+    """
+    placed, _, closed = state
+    # une case ne peut être ajoutée ni si elle contient déjà l'autre type
+    # d'objet, ni si sa zone est déjà pourvue
+    blocked = placed[1 - kind] | (closed[kind] & ~placed[kind])
+    if kind == 0:
+        candidates, extents = puzzle.balloon_candidates[z], puzzle.pref
+    else:
+        candidates, extents = puzzle.stone_candidates[z], puzzle.suff
+    return [c for c in candidates if not extents[c] & blocked]
+
+
+class _Exhausted(Exception):
+    pass
+
+
+class _Limit:
+    """
+    Budget de la recherche (voir lib/budget): le nombre de propagations est
+    le nombre de placements essayés, l'échéance est vérifiée tous les
+    CHECK_EVERY placements.
+    """
+
+    CHECK_EVERY = 256
+
+    def __init__(self, budget):
+        self.propagations = budget.propagations
+        self.deadline = budget.deadline()
+        self.count = 0
+
+    def spend(self):
+        self.count += 1
+        if self.propagations is not None and self.count > self.propagations:
+            raise _Exhausted()
+        if self.deadline is not None and not self.count % self.CHECK_EVERY:
+            import time
+
+            if time.monotonic() > self.deadline:
+                raise _Exhausted()
+
+
+def _search(puzzle, state, limit=None):
+    """
+    Retour arrière: énumère les états complets atteignables depuis state.
+    Lève _Exhausted quand le budget limit (optionnel, voir _Limit) est
+    épuisé.
+    """
+    best = None
+    for kind in (0, 1):
+        owner = state[1][kind]
+        for z in range(len(owner)):
+            if owner[z] != -1:
+                continue
+            domain = _domain(puzzle, state, z, kind)
+            if not domain:
+                return
+            if best is None or len(domain) < len(best[2]):
+                best = (z, kind, domain)
+                if len(domain) == 1:
+                    break
+        if best is not None and len(best[2]) == 1:
+            break
+    if best is None:
+        yield state
+        return
+    z, kind, domain = best
+    extents = puzzle.pref if kind == 0 else puzzle.suff
+    for c in domain:
+        if limit is not None:
+            limit.spend()
+        new_state = _place(puzzle, state, extents[c], kind)
+        if new_state is not None:
+            yield from _search(puzzle, new_state, limit)
+
+
+def itersolve(width, height=None, zones=None, blacks=None):
+    """
+    Enumère toutes les solutions de la grille, au même format que
+    pycosat.itersolve sur la formule de gen_cnf.
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    puzzle = _Puzzle(width, height, zones, blacks)
+    unset = [-1] * len(zones)
+    start = ((0, 0), (unset, unset), (0, 0))
+    for (balloons, stones), _, _ in _search(puzzle, start):
+        yield puzzle.model(balloons, stones)
+
+
+@profiled("bitset_solver")
+def solve(width, height=None, zones=None, blacks=None, budget=None):
+    """
+    Résout la grille sans générer de formule. Même format de sortie que
+    pycosat.solve sur la formule de gen_cnf: liste d'entiers, "UNSAT" si
+    la grille n'a pas de solution, ou "UNKNOWN" si le budget (optionnel,
+    voir lib/budget; les propagations sont ici les placements essayés) est
+    épuisé.
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    puzzle = _Puzzle(width, height, zones, blacks)
+    unset = [-1] * len(zones)
+    start = ((0, 0), (unset, unset), (0, 0))
+    limit = _Limit(budget) if budget else None
+    try:
+        for (balloons, stones), _, _ in _search(puzzle, start, limit):
+            return puzzle.model(balloons, stones)
+    except _Exhausted:
+        return "UNKNOWN"
+    return "UNSAT"
+
+
+def count_solutions(width, height=None, zones=None, blacks=None, limit=None):
+    """
+    Compte les solutions énumérées par itersolve (sans construire les
+    modèles), en s'arrêtant à limit si limit est fourni.
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    puzzle = _Puzzle(width, height, zones, blacks)
+    unset = [-1] * len(zones)
+    start = ((0, 0), (unset, unset), (0, 0))
+    count = 0
+    for _ in _search(puzzle, start):
+        count += 1
+        if count == limit:
+            break
+    return count
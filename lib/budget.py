@@ -0,0 +1,170 @@
+"""
+Budgets de résolution: limiter les ressources d'un appel au satsolver, pour
+qu'une grille pathologique ne bloque pas tout un lot.
+
+Un Budget limite le nombre de propagations (pycosat: prop_limit) et/ou la
+durée d'un appel (le satsolver est alors lancé dans un processus, tué à
+l'échéance). Les backends (voir lib/backends) acceptent un budget en second
+argument de solve et renvoient "UNKNOWN" quand il est épuisé.
+
+Dans un lot, les grilles sans réponse sont mises de côté et réessayées à la
+fin du lot avec un budget multiplié par factor, au plus rounds fois (voir
+solve_batch): les grilles faciles passent d'abord, et le temps passé sur le
+lot est borné.
+
+Quand une grille demande plusieurs appels au satsolver (backbone,
+composantes indépendantes), sa durée maximale est une échéance commune à
+tous ses appels (voir Budget.deadline et Budget.remaining), le nombre de
+propagations reste limité appel par appel.
+
+Format textuel (option --budget=... des scripts):
+    "propagations=1000000", "seconds=2", "propagations=1000000,seconds=2"
+"""
+import time
+
+# multiplication du budget à chaque nouvel essai, et nombre de nouveaux essais
+DEFAULT_FACTOR = 4
+DEFAULT_ROUNDS = 2
+
+
+class Budget:
+    """
+    Ressources allouées à un appel au satsolver (None: pas de limite).
+    Arguments:
+      - propagations: nombre maximal de propagations (ignoré par les
+                      satsolvers externes)
+      - seconds: durée maximale, en secondes
+    """
+
+    __slots__ = ("propagations", "seconds")
+
+    def __init__(self, propagations=None, seconds=None):
+        self.propagations = propagations
+        self.seconds = seconds
+
+    def __bool__(self):
+        return self.propagations is not None or self.seconds is not None
+
+    @property
+    def expired(self):
+        """
+        Vrai si la durée allouée est nulle (échéance déjà passée).
+        """
+        return self.seconds is not None and self.seconds <= 0
+
+    def deadline(self):
+        """
+        Renvoie l'échéance (en temps time.monotonic, valable dans tous les
+        processus) d'une durée allouée à partir de maintenant, None sans
+        limite de durée.
+        """
+        return None if self.seconds is None else time.monotonic() + self.seconds
+
+    def remaining(self, deadline):
+        """
+        Renvoie le budget d'un des appels partageant l'échéance deadline
+        (voir deadline): même nombre de propagations, durée restante.
+        """
+        if deadline is None:
+            return self
+        return Budget(self.propagations, max(0.0, deadline - time.monotonic()))
+
+    def scaled(self, factor):
+        """
+        Renvoie le budget multiplié par factor.
+        """
+        return Budget(
+            None if self.propagations is None else int(self.propagations * factor),
+            None if self.seconds is None else self.seconds * factor,
+        )
+
+    def __repr__(self):
+        parts = []
+        if self.propagations is not None:
+            parts.append("propagations={}".format(self.propagations))
+        if self.seconds is not None:
+            parts.append("seconds={:g}".format(self.seconds))
+        return ",".join(parts) or "unlimited"
+
+
+def parse_budget(spec):
+    """
+    Construit un Budget à partir de sa description textuelle (voir en tête
+    de module). Lève ValueError si elle est incorrecte.
+    """
+    budget = Budget()
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name == "propagations":
+            budget.propagations = int(float(value))
+        elif name == "seconds":
+            budget.seconds = float(value)
+        else:
+            raise ValueError("Unknown budget: {}".format(part))
+    return budget
+
+
+def parse_budget_flags(args):
+    """
+    Extrait de la liste d'arguments fournie les options --budget=description,
+    --escalate=facteur et --rounds=N (voir solve_batch). Renvoie le budget
+    (None sans --budget), le facteur, le nombre de nouveaux essais et la
+    liste des arguments restants.
+    """
+    budget = None
+    factor = DEFAULT_FACTOR
+    rounds = DEFAULT_ROUNDS
+    remaining = []
+    for arg in args:
+        if arg.startswith("--budget="):
+            budget = parse_budget(arg.split("=", 1)[1])
+        elif arg.startswith("--escalate="):
+            factor = float(arg.split("=", 1)[1])
+        elif arg.startswith("--rounds="):
+            rounds = int(arg.split("=", 1)[1])
+        else:
+            remaining.append(arg)
+    return budget, factor, rounds, remaining
+
+
+def solve_within(backend, cnf, budget=None):
+    """
+    Résout la formule avec le budget fourni. Renvoie le résultat du backend
+    (solution, "UNSAT" ou "UNKNOWN") et les ressources dépensées:
+    {"seconds": durée de l'appel, "budget": budget alloué}.
+    """
+    start = time.perf_counter()
+    result = backend.solve(cnf, budget)
+    return result, {"seconds": time.perf_counter() - start, "budget": budget}
+
+
+def solve_batch(items, attempt, budget=None, factor=DEFAULT_FACTOR, rounds=DEFAULT_ROUNDS):
+    """
+    Traite un lot: attempt(item, budget) renvoie (résultat, dépense), voir
+    solve_within. Les éléments dont le résultat est "UNKNOWN" sont réessayés
+    à la fin du lot avec un budget multiplié par factor, au plus rounds fois
+    (sans budget, chaque élément n'est essayé qu'une fois).
+    Génère, dans l'ordre où ils sont obtenus, les triplets (élément,
+    résultat, dépense); les éléments toujours sans réponse sont générés à la
+    fin avec le résultat "UNKNOWN". items n'est parcouru qu'une fois, au fur
+    et à mesure.
+    """
+    escalate = bool(budget) and rounds > 0
+    deferred = []
+    for item in items:
+        result, spent = attempt(item, budget)
+        if result == "UNKNOWN" and escalate:
+            deferred.append(item)
+        else:
+            yield item, result, spent
+    for escalation in range(rounds if escalate else 0):
+        if not deferred:
+            return
+        budget = budget.scaled(factor)
+        pending, deferred = deferred, []
+        for item in pending:
+            result, spent = attempt(item, budget)
+            if result == "UNKNOWN" and escalation < rounds - 1:
+                deferred.append(item)
+            else:
+                yield item, result, spent
@@ -0,0 +1,596 @@
+"""
+Commandes en ligne de commande, sans interface graphique: utilisées par les
+scripts json-solve.py, json-2-sat.py et json-2-3sat.py, et par le point
+d'entrée unique:
+    python3 -m lib solve [options] grille.json corpus.dfc ...
+    python3 -m lib cnf [options] grille.json ...
+    python3 -m lib 3sat [options] grille.json ...
+    python3 -m lib validate grille.json corpus.dfc ...
+    python3 -m lib check-3sat [--limit=N] grille.json ...
+    python3 -m lib count [--workers=N] [--all-models] grille.json corpus.dfc ...
+    python3 -m lib bench-implied [--encoding=...] [--budget=...] grille.json corpus.dfc ...
+    python3 -m lib render [--output=dossier] [--solution] grille.json corpus.dfc ...
+    python3 -m lib check-imports [--budget=ms]
+
+Chaque commande prend la liste des arguments (le premier étant le nom de la
+commande, utilisé dans les messages d'usage) et n'importe que ce dont elle a
+besoin.
+"""
+import sys
+from sys import stderr
+
+SEPARATOR = "________________________________________________________________________________\n"
+
+# Modules de la bibliothèque utilisables sans interface graphique. Aucun
+# d'eux ne doit importer tkinter, ni pycosat ou numpy avant d'en avoir besoin
+# (voir check_imports).
+HEADLESS_MODULES = (
+    "lib.grid_model",
+    "lib.grid_editor",
+    "lib.gen_formule",
+    "lib.gen_segments",
+    "lib.backends",
+    "lib.bitset_solver",
+    "lib.backbone",
+    "lib.validate",
+    "lib.hints",
+    "lib.decompose",
+    "lib.counting",
+    "lib.equisat",
+    "lib.implied",
+    "lib.solution_pager",
+    "lib.budget",
+    "lib.render",
+    "lib.verify",
+    "lib.binary_cnf",
+    "lib.corpus",
+    "lib.file_io",
+    "lib.cli",
+)
+FORBIDDEN_IMPORTS = ("tkinter", "_tkinter", "pycosat", "numpy")
+
+# Temps d'import maximal (en millisecondes) de l'ensemble des modules sans
+# interface graphique
+IMPORT_BUDGET = 50
+
+
+def solve(argv):
+    """
+    Résout directement des grilles avec le satsolver choisi et affiche les
+    solutions (script json-solve.py).
+    """
+    import time
+    from lib.file_io import iter_grids
+    from lib.profiling import parse_cli_flags, stage
+    from lib.gen_formule import sat_3sat, decode_solution
+    from lib.gen_segments import parse_encoding_flag
+    from lib.backends import parse_backend_flag
+    from lib.budget import parse_budget_flags, solve_within, solve_batch
+    from lib.backbone import compute_backbone
+    from lib.decompose import solve_components
+    from lib.validate import validate_grid, unsat_reason, format_diagnostic
+    from lib.grid_model import GridModel
+
+    # options d'instrumentation: --profile[=rapport.json] --cprofile=dossier
+    argv = parse_cli_flags(argv)
+    # choix de l'encodage: --encoding=classic (défaut) ou --encoding=segments,
+    # et clauses impliquées: --implied=support,cardinality,exclusion
+    encoder, argv = parse_encoding_flag(argv)
+    # choix du satsolver: --backend=pycosat (défaut), picosat, cmd:..., portfolio:...
+    backend, argv = parse_backend_flag(argv)
+    # budget de chaque appel au satsolver: --budget=propagations=N,seconds=S;
+    # les grilles sans réponse sont réessayées à la fin avec un budget
+    # multiplié par --escalate=4, au plus --rounds=2 fois (voir lib/budget)
+    budget, factor, rounds, argv = parse_budget_flags(argv)
+    # réduction en 3-SAT avant la résolution: --3sat (--lean: variables de
+    # remplissage partagées, voir gen_formule.sat_3sat)
+    reduce_3sat = "--3sat" in argv
+    lean = "--lean" in argv
+    argv = [arg for arg in argv if arg not in ("--3sat", "--lean")]
+    # afficher les cases forcées (présentes dans toutes les solutions) plutôt
+    # qu'une solution: --backbone
+    backbone = "--backbone" in argv
+    argv = [arg for arg in argv if arg != "--backbone"]
+    # résolution séparée des parties indépendantes de la grille, en
+    # parallèle (voir lib/decompose): --split
+    split = "--split" in argv
+    argv = [arg for arg in argv if arg != "--split"]
+    # vérification du nombre d'arguments
+    if len(argv) < 2:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--backend=pycosat|picosat|cmd:<commande>|portfolio:<backend>,<backend>...] [--encoding=classic|segments] [--implied=support,cardinality,exclusion] [--3sat [--lean]] [--backbone] [--split] [--budget=propagations=N,seconds=S [--escalate=4] [--rounds=2]] [--profile[=report.json]] [--cprofile=dir] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+
+    print("S : stone\nB : balloon\nN : black cell\n- : empty cell")
+    if backbone:
+        print("? : cell that differs between solutions")
+    print("")
+
+    def to_solve():
+        # grilles fournies en argument (les corpus de grilles, voir
+        # lib/corpus, sont acceptés comme les fichiers JSON) qui restent à
+        # résoudre: les grilles invalides ou manifestement sans solution
+        # sont affichées directement
+        for name, grid in iter_grids(argv[1:]):
+            # représentation dense de la grille (voir lib/grid_model)
+            try:
+                grid = GridModel.from_json(grid)
+            except ValueError as error:
+                print("{}: error: {}".format(name, error), file=stderr)
+                continue
+            # vérifier la grille: les grilles manifestement sans solution ne
+            # sont pas envoyées au satsolver
+            diagnostics = validate_grid(grid)
+            for diagnostic in diagnostics:
+                print("{}: {}".format(name, format_diagnostic(diagnostic)), file=stderr)
+            reason = unsat_reason(diagnostics)
+            if reason is not None:
+                print(name)
+                print("No solution found ({})".format(reason["message"]))
+                print(SEPARATOR)
+                continue
+            yield name, grid
+
+    def attempt(item, budget):
+        # résoudre une grille: disposition de la solution (backbone avec
+        # --backbone), "UNSAT" ou "UNKNOWN", et ressources dépensées (durée
+        # de tous les appels au satsolver pour la grille)
+        name, grid = item
+        if backbone or split:
+            start = time.perf_counter()
+            if backbone:
+                result = compute_backbone(grid, backend=backend, encoder=encoder, budget=budget)
+            else:
+                result = solve_components(grid, backend=backend, encoder=encoder, budget=budget)
+            spent = {"seconds": time.perf_counter() - start, "budget": budget}
+            return "UNSAT" if result is None else result, spent
+        # générer les clauses
+        cnf = encoder(grid)
+        if reduce_3sat:
+            cnf = sat_3sat(cnf, grid, lean=lean)
+        # résoudre
+        with stage("satsolver") as st:
+            solution, spent = solve_within(backend, cnf, budget)
+            st.record_cnf(cnf)
+        if solution == "UNSAT" or solution == "UNKNOWN":
+            return solution, spent
+        return decode_solution(solution, grid.width, grid.height), spent
+
+    # les grilles sans réponse dans le budget sont réessayées à la fin
+    for (name, grid), result, spent in solve_batch(to_solve(), attempt, budget, factor, rounds):
+        print(name)
+        if result == "UNSAT":
+            print("No solution found")
+        elif result == "UNKNOWN":
+            if budget:
+                print("Satsolver gave no answer (budget {} exhausted after {:.3f} s)".format(
+                    spent["budget"], spent["seconds"]
+                ))
+            else:
+                print("Satsolver gave no answer")
+        elif backbone:
+            for row in result["layout"]:
+                print(" ".join(row))
+            print("({} satsolver calls)".format(result["solver_calls"]))
+        else:
+            for row in result:
+                print(" ".join(row))
+        print(SEPARATOR)
+
+
+def export_cnf(argv, reduce_3sat=False):
+    """
+    Exporte la formule de chaque grille au format DIMACS (ou binaire), à
+    côté de la grille (scripts json-2-sat.py et, avec reduce_3sat,
+    json-2-3sat.py).
+    """
+    from lib.file_io import read_grid, save_dimacs, save_dimacs_stream, count_cnf
+    from lib.binary_cnf import save_binary_cnf
+    from lib.profiling import parse_cli_flags
+    from lib.gen_formule import gen_cnf, sat_3sat, iter_cnf, iter_3sat
+    from lib.gen_segments import parse_encoding_flag
+    from lib.validate import validate_grid, format_diagnostic
+    from lib.grid_model import GridModel
+
+    # options d'instrumentation: --profile[=rapport.json] --cprofile=dossier
+    argv = parse_cli_flags(argv)
+    # choix de l'encodage: --encoding=classic (défaut) ou --encoding=segments,
+    # et clauses impliquées: --implied=support,cardinality,exclusion
+    encoder, argv = parse_encoding_flag(argv)
+    # compression des fichiers DIMACS: --compress=gz, xz ou zst
+    extension = ".cnf"
+    for arg in argv:
+        if arg.startswith("--compress="):
+            extension += "." + arg.split("=", 1)[1]
+    argv = [arg for arg in argv if not arg.startswith("--compress=")]
+    # format binaire brut (voir lib/binary_cnf) plutôt que DIMACS: --binary
+    binary = "--binary" in argv
+    argv = [arg for arg in argv if arg != "--binary"]
+    if binary:
+        extension = ".bcnf"
+    # encodage et écriture en flux, sans garder la formule en mémoire (voir
+    # gen_formule.iter_cnf): --stream
+    stream = "--stream" in argv
+    argv = [arg for arg in argv if arg != "--stream"]
+    # réduction en 3-SAT avec variables de remplissage partagées: --lean
+    lean = "--lean" in argv
+    argv = [arg for arg in argv if arg != "--lean"]
+    if stream and (binary or encoder is not gen_cnf):
+        print("Erreur: --stream n'est possible qu'avec l'encodage classic (sans --implied) et le format DIMACS", file=stderr)
+        sys.exit(1)
+    # vérification du nombre d'arguments
+    if len(argv) < 2:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--profile[=report.json]] [--cprofile=dir] [--encoding=classic|segments] [--implied=support,cardinality,exclusion] [--compress=gz|xz|zst | --binary] [--stream] [--lean] path/to/grid.json path/to/another/grid.json ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+
+    # convertir chaque grille fournie en argument et les exporter au format DIMACS
+    for i in range(1, len(argv)):
+        # lire la grille
+        grid = read_grid(argv[i])
+        # représentation dense de la grille (voir lib/grid_model)
+        try:
+            grid = GridModel.from_json(grid)
+        except ValueError as error:
+            print("{}: error: {}".format(argv[i], error), file=stderr)
+            continue
+        # signaler les problèmes de la grille (la formule est exportée quand
+        # même)
+        for diagnostic in validate_grid(grid):
+            print("{}: {}".format(argv[i], format_diagnostic(diagnostic)), file=stderr)
+        # générer le nom du fichier de sortie
+        output_filename = argv[i].split(".json")[0] + extension
+        if stream:
+            def clauses(grid=grid):
+                if reduce_3sat:
+                    return iter_3sat(iter_cnf(grid), 1 + 3 * (grid.height + 2) * grid.width, lean)
+                return iter_cnf(grid)
+
+            # l'en-tête d'un fichier non compressé est complété à la fin;
+            # sinon, les clauses sont d'abord comptées (sans être gardées)
+            counts = (None, None) if extension == ".cnf" else count_cnf(clauses())
+            save_dimacs_stream(clauses(), output_filename, *counts)
+            continue
+        # générer les clauses
+        cnf = encoder(grid)
+        if reduce_3sat:
+            # convertir les clauses en clauses 3-SAT
+            cnf = sat_3sat(cnf, grid, lean=lean)
+        # exporter au format DIMACS (ou binaire)
+        if binary:
+            save_binary_cnf(cnf, output_filename)
+        else:
+            save_dimacs(cnf, output_filename)
+
+
+def validate(argv):
+    """
+    Affiche les diagnostics de chaque grille (voir lib/validate). Termine
+    avec le code 1 si une grille est mal formée ou certainement sans
+    solution.
+    """
+    from lib.file_io import iter_grids
+    from lib.validate import validate_grid, format_diagnostic
+
+    if len(argv) < 2:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+    failed = False
+    for name, grid in iter_grids(argv[1:]):
+        diagnostics = validate_grid(grid["width"], grid["height"], grid["zones"], grid["blacks"])
+        for diagnostic in diagnostics:
+            print("{}: {}".format(name, format_diagnostic(diagnostic)))
+            failed = failed or diagnostic["severity"] in ("unsat", "error")
+        if not diagnostics:
+            print("{}: ok".format(name))
+    sys.exit(1 if failed else 0)
+
+
+def count(argv):
+    """
+    Affiche le nombre exact de solutions de chaque grille (voir
+    lib/counting), les composantes indépendantes étant comptées dans
+    --workers=N processus. Avec --all-models, compte toutes les solutions
+    de la formule (cases hors zone comprises).
+    """
+    from lib.file_io import iter_grids
+    from lib.counting import count_models
+    from lib.grid_model import GridModel
+
+    workers = None
+    for arg in argv[1:]:
+        if arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+    minimal = "--all-models" not in argv
+    paths = [arg for arg in argv[1:] if not arg.startswith("--workers=") and arg != "--all-models"]
+    if not paths:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--workers=N] [--all-models] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+    # composantes déjà comptées, partagées entre les grilles
+    cache = {}
+    for name, grid in iter_grids(paths):
+        try:
+            grid = GridModel.from_json(grid)
+        except ValueError as error:
+            print("{}: error: {}".format(name, error), file=stderr)
+            continue
+        print("{}: {}".format(name, count_models(grid, minimal=minimal, cache=cache, workers=workers)))
+
+
+def check_3sat(argv):
+    """
+    Vérifie la réduction en 3-SAT (voir gen_formule.sat_3sat), classique et
+    lean, pour chaque encodage et chaque grille fournie: formules
+    équisatisfaisables et mêmes modèles sur les variables de la grille (au
+    plus --limit=N modèles comparés, 100 par défaut, voir lib/equisat).
+    Termine avec le code 1 si une différence est trouvée.
+    """
+    from lib.file_io import iter_grids
+    from lib.gen_formule import sat_3sat
+    from lib.gen_segments import ENCODERS
+    from lib.equisat import check_reduction
+    from lib.grid_model import GridModel
+
+    limit = 100
+    for arg in argv[1:]:
+        if arg.startswith("--limit="):
+            limit = int(arg.split("=", 1)[1])
+    paths = [arg for arg in argv[1:] if not arg.startswith("--limit=")]
+    if not paths:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--limit=100] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+    failed = False
+    for name, grid in iter_grids(paths):
+        try:
+            grid = GridModel.from_json(grid)
+        except ValueError as error:
+            print("{}: error: {}".format(name, error), file=stderr)
+            continue
+        # variables des cases (les variables auxiliaires de l'encodage
+        # segments sont ignorées)
+        nb_vars = 3 * (grid.height + 2) * grid.width
+        for encoding, encoder in ENCODERS.items():
+            cnf = encoder(grid)
+            for lean in (False, True):
+                reduced = sat_3sat(cnf, grid, lean=lean)
+                result = check_reduction(cnf, reduced, nb_vars, limit=limit)
+                print("{} [{}{}]: {} ({}{} models, {} clauses -> {}){}".format(
+                    name,
+                    encoding,
+                    ", lean" if lean else "",
+                    "ok" if result["ok"] else "FAILED",
+                    result["models"],
+                    "" if result["complete"] else "+",
+                    len(cnf),
+                    len(reduced),
+                    "".join("\n    " + error for error in result["errors"]),
+                ))
+                failed = failed or not result["ok"]
+    sys.exit(1 if failed else 0)
+
+
+def bench_implied(argv):
+    """
+    Compare, sur les grilles fournies, la résolution avec pycosat de la
+    formule de base (--encoding=..., classic par défaut) et de la formule
+    renforcée par chaque famille de clauses impliquées, puis par toutes
+    (voir lib/implied): nombre de clauses, temps total d'encodage et de
+    résolution, et nombre de grilles sans réponse dans le budget
+    --budget=propagations=N,seconds=S de chaque grille (voir lib/budget;
+    sans nouvel essai).
+    """
+    import time
+    from lib.file_io import iter_grids
+    from lib.gen_segments import parse_encoding_flag
+    from lib.implied import IMPLIED
+    from lib.backends import PycosatBackend
+    from lib.budget import parse_budget_flags, solve_within
+    from lib.grid_model import GridModel
+
+    encoder, argv = parse_encoding_flag(argv)
+    budget, _, _, argv = parse_budget_flags(argv)
+    if len(argv) < 2:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--encoding=classic|segments] [--budget=propagations=N,seconds=S] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+    grids = []
+    for name, grid in iter_grids(argv[1:]):
+        try:
+            grids.append(GridModel.from_json(grid))
+        except ValueError as error:
+            print("{}: error: {}".format(name, error), file=stderr)
+    backend = PycosatBackend()
+    configurations = [()] + [(family,) for family in IMPLIED] + [tuple(IMPLIED)]
+    print("{:<32} {:>10} {:>10} {:>10} {:>8}".format("implied", "clauses", "encode", "solve", "unknown"))
+    for implied in configurations:
+        clauses = 0
+        unknown = 0
+        encode_time = solve_time = 0.0
+        for grid in grids:
+            start = time.perf_counter()
+            cnf = encoder(grid, implied=implied)
+            encode_time += time.perf_counter() - start
+            clauses += len(cnf)
+            result, spent = solve_within(backend, cnf, budget)
+            solve_time += spent["seconds"]
+            unknown += result == "UNKNOWN"
+        print("{:<32} {:>10} {:>9.3f}s {:>9.3f}s {:>8}".format(
+            ",".join(implied) or "(none)", clauses, encode_time, solve_time, unknown
+        ))
+
+
+def render_images(argv):
+    """
+    Enregistre une image de chaque grille (voir lib/render), dans le
+    dossier --output=dossier (dossier courant par défaut), au format
+    --format=png (défaut) ou ppm, avec des cases de --cell=N pixels. Avec
+    --solution, les grilles sont d'abord résolues (mêmes options --backend,
+    --encoding et --budget que solve) et leur solution est dessinée, si
+    elle est vérifiée (voir lib/verify).
+    """
+    import os
+    from lib.file_io import iter_grids
+    from lib.profiling import parse_cli_flags, stage
+    from lib.gen_formule import decode_solution
+    from lib.gen_segments import parse_encoding_flag
+    from lib.backends import parse_backend_flag
+    from lib.budget import parse_budget_flags, solve_within, solve_batch
+    from lib.validate import validate_grid, unsat_reason
+    from lib.verify import verify_layouts, describe
+    from lib.grid_model import GridModel
+    from lib.render import render, save_image, ENCODERS, CELL_WIDTH, BORDER_WIDTH
+
+    argv = parse_cli_flags(argv)
+    encoder, argv = parse_encoding_flag(argv)
+    backend, argv = parse_backend_flag(argv)
+    budget, factor, rounds, argv = parse_budget_flags(argv)
+    output = "."
+    extension = "png"
+    cell_width = CELL_WIDTH
+    paths = []
+    for arg in argv[1:]:
+        if arg.startswith("--output="):
+            output = arg.split("=", 1)[1]
+        elif arg.startswith("--format="):
+            extension = arg.split("=", 1)[1]
+        elif arg.startswith("--cell="):
+            cell_width = int(arg.split("=", 1)[1])
+        elif arg != "--solution":
+            paths.append(arg)
+    solution = "--solution" in argv
+    if "." + extension not in ENCODERS:
+        print("error: unsupported image format: {}".format(extension), file=stderr)
+        sys.exit(1)
+    if not paths:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--output=dir] [--format=png|ppm] [--cell=50] [--solution [--backend=...] [--encoding=...] [--budget=propagations=N,seconds=S [--escalate=4] [--rounds=2]]] [--profile[=report.json]] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        sys.exit(1)
+    # bordures proportionnelles aux cases (4 pixels pour 50)
+    border_width = max(1, cell_width * BORDER_WIDTH // CELL_WIDTH)
+    os.makedirs(output, exist_ok=True)
+
+    def to_render():
+        for name, grid in iter_grids(paths):
+            try:
+                yield name, GridModel.from_json(grid)
+            except ValueError as error:
+                print("{}: error: {}".format(name, error), file=stderr)
+
+    def attempt(item, budget):
+        # solution à dessiner (None sans --solution), "UNSAT" ou "UNKNOWN"
+        name, grid = item
+        if not solution:
+            return None, None
+        if unsat_reason(validate_grid(grid)) is not None:
+            return "UNSAT", None
+        result, spent = solve_within(backend, encoder(grid), budget)
+        if result == "UNSAT" or result == "UNKNOWN":
+            return result, spent
+        return decode_solution(result, grid.width, grid.height), spent
+
+    # les grilles sans réponse dans le budget sont réessayées à la fin
+    for (name, grid), layout, spent in solve_batch(to_render(), attempt, budget, factor, rounds):
+        if layout == "UNKNOWN" and budget:
+            print("{}: warning: no answer (budget {} exhausted after {:.3f} s), drawing the grid only".format(
+                name, spent["budget"], spent["seconds"]
+            ), file=stderr)
+            layout = None
+        elif layout == "UNSAT" or layout == "UNKNOWN":
+            print("{}: warning: no solution found, drawing the grid only".format(name), file=stderr)
+            layout = None
+        elif layout is not None:
+            # seules les solutions vérifiées sont dessinées
+            flags = verify_layouts(grid, [layout])[0]
+            if flags:
+                print("{}: warning: invalid solution ({}), drawing the grid only".format(
+                    name, "; ".join(describe(flags))
+                ), file=stderr)
+                layout = None
+        # nom de l'image: celui de la grille, suivi de son indice pour une
+        # grille de corpus ("corpus.dfc[3]" -> "corpus-3.png")
+        base, _, index = os.path.basename(name).partition("[")
+        base = os.path.splitext(base)[0]
+        if index:
+            base += "-" + index.rstrip("]")
+        path = os.path.join(output, "{}.{}".format(base, extension))
+        with stage("render"):
+            save_image(render(grid, layout, cell_width, border_width), path)
+        print(path)
+
+
+def check_imports(argv):
+    """
+    Vérifie, dans un nouvel interpréteur, que les modules sans interface
+    graphique (HEADLESS_MODULES) s'importent sans tkinter, pycosat ni numpy,
+    en moins de --budget=ms millisecondes (IMPORT_BUDGET par défaut).
+    Termine avec le code 1 sinon.
+    """
+    import os
+    import subprocess
+
+    budget = IMPORT_BUDGET
+    for arg in argv[1:]:
+        if arg.startswith("--budget="):
+            budget = float(arg.split("=", 1)[1])
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # -X importtime: une ligne par module importé sur la sortie d'erreur,
+    # "import time: propre | cumulé | nom" (en microsecondes)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(HEADLESS_MODULES)],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        print(process.stderr, file=stderr)
+        sys.exit(1)
+    imported = set()
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # ligne d'en-tête
+        imported.add(name.strip().split(".")[0])
+        # seuls les imports de premier niveau (noms non indentés) sont
+        # comptés: leur temps cumulé comprend celui de leurs dépendances
+        if name.startswith(" lib."):
+            total += int(cumulative)
+    failed = False
+    for name in FORBIDDEN_IMPORTS:
+        if name in imported:
+            print("error: importing the headless modules imports {}".format(name), file=stderr)
+            failed = True
+    total /= 1000
+    print("headless import time: {:.1f} ms (budget: {} ms)".format(total, budget))
+    if total > budget:
+        print("error: import time over budget", file=stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+COMMANDS = {
+    "solve": solve,
+    "cnf": export_cnf,
+    "3sat": lambda argv: export_cnf(argv, reduce_3sat=True),
+    "validate": validate,
+    "count": count,
+    "check-3sat": check_3sat,
+    "bench-implied": bench_implied,
+    "render": render_images,
+    "check-imports": check_imports,
+}
+
+
+def main(argv):
+    """
+    Point d'entrée de python3 -m lib: argv[1] est le nom de la commande.
+    """
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print("Usage: python3 -m lib {} ...".format("|".join(COMMANDS)), file=stderr)
+        sys.exit(1)
+    COMMANDS[argv[1]](["python3 -m lib " + argv[1]] + argv[2:])
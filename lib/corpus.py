@@ -0,0 +1,234 @@
+"""
+Corpus de grilles: un seul fichier binaire contenant un grand nombre de
+grilles, lisibles directement par leur indice.
+
+Format du fichier (entiers little-endian):
+  - en-tête (24 octets): signature b"DOSUNCRP", version (uint16), réservé
+    (uint16), nombre de grilles (uint32), position de l'index (uint64)
+  - les grilles, les unes à la suite des autres. Chaque grille est:
+      largeur (uint16), hauteur (uint16), nombre de zones (uint32), puis la
+      matrice des cases ligne par ligne, une case par uint16: bit 15 à 1
+      pour une case noire, bits 0 à 14 égaux à 1 + numéro de la zone de la
+      case (0 si la case n'est dans aucune zone)
+  - l'index: position dans le fichier de chaque grille (uint64)
+
+L'index est en fin de fichier: pour ajouter des grilles, on les encode
+toutes (une grille invalide laisse le corpus intact), on les écrit à la
+place de l'ancien index, puis on réécrit l'index complet à la suite et on
+met à jour l'en-tête.
+
+Une case ne pouvant appartenir qu'à une seule zone, les grilles dont des
+zones se chevauchent ne peuvent pas être enregistrées. L'ordre des cases
+dans les zones et dans la liste des cases noires n'est pas conservé (les
+grilles relues les donnent ligne par ligne).
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"DOSUNCRP"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQ")
+RECORD = struct.Struct("<HHI")
+BLACK_BIT = 0x8000
+MAX_ZONES = 0x7FFF - 1
+MAX_SIZE = 0xFFFF
+
+
+def _pack_grid(grid):
+    """
+    Renvoie l'enregistrement binaire de la grille fournie (dictionnaire au
+    format de file_io.read_grid).
+    """
+    width, height = grid["width"], grid["height"]
+    zones = grid["zones"]
+    if not (0 <= width <= MAX_SIZE and 0 <= height <= MAX_SIZE):
+        raise ValueError("Grid size {}x{} does not fit the corpus format".format(width, height))
+    if len(zones) > MAX_ZONES:
+        raise ValueError("Too many zones for the corpus format: {}".format(len(zones)))
+
+    def index(x, y):
+        if not (0 <= x < width and 0 <= y < height):
+            raise ValueError("Cell ({}, {}) is outside the {}x{} grid".format(x, y, width, height))
+        return y * width + x
+
+    cells = array("H", bytes(2 * width * height))
+    for z, zone in enumerate(zones):
+        for x, y in zone:
+            c = index(x, y)
+            if cells[c]:
+                raise ValueError("Cell ({}, {}) belongs to several zones".format(x, y))
+            cells[c] = z + 1
+    for x, y in grid["blacks"]:
+        cells[index(x, y)] |= BLACK_BIT
+    if sys.byteorder == "big":
+        cells.byteswap()
+    return RECORD.pack(width, height, len(zones)) + cells.tobytes()
+
+
+def _write_index(out, offsets):
+    index = array("Q", offsets)
+    if sys.byteorder == "big":
+        index.byteswap()
+    out.write(index.tobytes())
+
+
+def write_corpus(path, grids):
+    """
+    Crée (ou écrase) le corpus path contenant les grilles fournies (itérable
+    de dictionnaires au format de file_io.read_grid). Renvoie le nombre de
+    grilles écrites. Le corpus est écrit dans un fichier temporaire qui ne
+    remplace path qu'une fois complet: si une grille est invalide, path
+    n'est pas modifié.
+    """
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, "wb") as out:
+            out.write(bytes(HEADER.size))
+            offsets = []
+            for grid in grids:
+                offsets.append(out.tell())
+                out.write(_pack_grid(grid))
+            index_offset = out.tell()
+            _write_index(out, offsets)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), index_offset))
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, path)
+    return len(offsets)
+
+
+def append_corpus(path, grids):
+    """
+    Ajoute les grilles fournies à la fin du corpus path (créé s'il n'existe
+    pas). Renvoie le nombre total de grilles du corpus.
+    """
+    if not os.path.exists(path):
+        return write_corpus(path, grids)
+    with open(path, "r+b") as out:
+        count, index_offset = _read_header(out.read(HEADER.size), path)
+        out.seek(index_offset)
+        offsets = array("Q")
+        offsets.frombytes(out.read(8 * count))
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        offsets = list(offsets)
+        # toutes les grilles sont encodées (et vérifiées) avant de toucher
+        # au fichier, puis remplacent l'ancien index
+        records = [_pack_grid(grid) for grid in grids]
+        out.seek(index_offset)
+        for record in records:
+            offsets.append(index_offset)
+            index_offset += len(record)
+        out.write(b"".join(records))
+        _write_index(out, offsets)
+        out.truncate()
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), index_offset))
+    return len(offsets)
+
+
+def _read_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError("Not a grid corpus: {}".format(path))
+    magic, version, _, count, index_offset = HEADER.unpack(data[: HEADER.size])
+    if magic != MAGIC:
+        raise ValueError("Not a grid corpus: {}".format(path))
+    if version != VERSION:
+        raise ValueError("Unsupported corpus version {}: {}".format(version, path))
+    return count, index_offset
+
+
+def is_corpus(path):
+    """
+    Renvoie True si le fichier path est un corpus de grilles.
+    """
+    try:
+        with open(path, "rb") as in_file:
+            return in_file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class CorpusReader:
+    """
+    Lecture d'un corpus par projection en mémoire (mmap): le fichier est
+    ouvert une seule fois, et chaque grille est lue directement à sa
+    position, sans parcourir les autres.
+        with CorpusReader("grilles.dfc") as corpus:
+            grid = corpus[42]
+            for grid in corpus:
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # fichier vide
+            self._file.close()
+            raise ValueError("Not a grid corpus: {}".format(path))
+        self.count, index_offset = _read_header(self._map, path)
+        self._index = array("Q")
+        self._index.frombytes(self._map[index_offset : index_offset + 8 * self.count])
+        if sys.byteorder == "big":
+            self._index.byteswap()
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, i):
+        """
+        Renvoie la grille d'indice i sans la décoder: (largeur, hauteur,
+        nombre de zones, matrice des cases sous forme d'array d'uint16, voir
+        le format en tête de module).
+        """
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("corpus index out of range")
+        offset = self._index[i]
+        width, height, nb_zones = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        cells = array("H")
+        cells.frombytes(self._map[start : start + 2 * width * height])
+        if sys.byteorder == "big":
+            cells.byteswap()
+        return width, height, nb_zones, cells
+
+    def __getitem__(self, i):
+        """
+        Renvoie la grille d'indice i, au format de file_io.read_grid.
+        """
+        width, height, nb_zones, cells = self.raw(i)
+        zones = [[] for _ in range(nb_zones)]
+        blacks = []
+        for c, value in enumerate(cells):
+            if value:
+                x, y = c % width, c // width
+                if value & BLACK_BIT:
+                    blacks.append([x, y])
+                    value &= ~BLACK_BIT
+                if value:
+                    zones[value - 1].append([x, y])
+        return {"width": width, "height": height, "blacks": blacks, "zones": zones}
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,209 @@
+"""
+Comptage exact des solutions d'une grille, sans les énumérer.
+
+Dans chaque segment de colonne (suite verticale maximale de cases non
+noires), les ballons occupent les p premières cases et les pierres les q
+dernières (p + q au plus la longueur du segment): une solution est un choix
+de (p, q) par segment tel que chaque zone ait exactement un ballon et une
+pierre.
+
+Les segments sont parcourus colonne par colonne (programmation dynamique):
+l'état est, pour chaque zone "ouverte" (rencontrée dans un segment déjà
+traité et présente dans un segment pas encore traité), le fait que son
+ballon et sa pierre soient déjà placés. Chaque état est associé au nombre de
+façons de l'atteindre. Une zone est fermée après son dernier segment: les
+états où il lui manque son ballon ou sa pierre sont abandonnés. La taille
+des états ne dépend que du nombre de zones ouvertes à un moment donné, et non
+du nombre de solutions: une grille qui en a un nombre astronomique se compte
+en quelques secondes. Les composantes indépendantes de la grille (voir
+lib/decompose) sont comptées séparément, chaque composante identique à une
+composante déjà comptée n'étant comptée qu'une fois.
+
+Deux définitions des solutions, qui ne diffèrent que pour les cases hors
+zone:
+  - minimal=True (défaut): comme bitset_solver.itersolve, les cases hors
+    zone ne reçoivent un ballon ou une pierre que pour en supporter un autre
+  - minimal=False: toutes les solutions de la formule de gen_cnf (ce que
+    compterait picosat --all), c'est-à-dire toutes les dispositions de
+    ballons et de pierres
+"""
+from lib.profiling import profiled
+from lib.grid_model import GridModel, BLACK
+
+
+def _plan(model, minimal):
+    """
+    Prépare le parcours des segments: pour chaque segment, la liste de ses
+    choix possibles (masque des bits posés, nombre de choix donnant ce
+    masque) et le masque des zones fermées après lui. Chaque zone ouverte
+    occupe deux bits (ballon, pierre) d'un emplacement libéré à sa
+    fermeture, pour que les états restent de petits entiers.
+    """
+    width, height, labels = model.width, model.height, model.labels
+    segments = []
+    for x in range(width):
+        segment = []
+        for c in range(x, width * height, width):
+            if labels[c] == BLACK:
+                if segment:
+                    segments.append(segment)
+                segment = []
+            else:
+                segment.append(c)
+        if segment:
+            segments.append(segment)
+
+    last = {}
+    for s, segment in enumerate(segments):
+        for c in segment:
+            if labels[c] >= 0:
+                last[labels[c]] = s
+
+    slots = {}  # zone ouverte -> emplacement
+    free = []
+    nb_slots = 0
+    plan = []
+    for s, segment in enumerate(segments):
+        zones = [labels[c] for c in segment]
+        for z in zones:
+            if z >= 0 and z not in slots:
+                if free:
+                    slots[z] = free.pop()
+                else:
+                    slots[z] = nb_slots
+                    nb_slots += 1
+        bits = [1 << (2 * slots[z]) if z >= 0 else 0 for z in zones]
+
+        # plus longs préfixe et suffixe sans deux cases d'une même zone
+        length = len(segment)
+        max_p = 0
+        seen = set()
+        while max_p < length and zones[max_p] not in seen:
+            if zones[max_p] >= 0:
+                seen.add(zones[max_p])
+            max_p += 1
+        max_q = 0
+        seen = set()
+        while max_q < length and zones[length - 1 - max_q] not in seen:
+            if zones[length - 1 - max_q] >= 0:
+                seen.add(zones[length - 1 - max_q])
+            max_q += 1
+
+        options = {}
+        balloons = 0
+        for p in range(max_p + 1):
+            if p:
+                balloons |= bits[p - 1]
+            if minimal and p and zones[p - 1] < 0:
+                continue
+            stones = 0
+            for q in range(min(max_q, length - p) + 1):
+                if q:
+                    stones |= bits[length - q] << 1
+                if minimal and q and zones[length - q] < 0:
+                    continue
+                mask = balloons | stones
+                options[mask] = options.get(mask, 0) + 1
+
+        close = 0
+        for z in set(zones):
+            if z >= 0 and last[z] == s:
+                close |= 3 << (2 * slots[z])
+                free.append(slots.pop(z))
+        plan.append((list(options.items()), close))
+    return plan
+
+
+def _count(model, minimal):
+    present = set(model.labels)
+    for label in range(model.nb_zones):
+        if label not in present:
+            return 0  # zone vide
+    states = {0: 1}
+    for options, close in _plan(model, minimal):
+        new_states = {}
+        for state, count in states.items():
+            for mask, multiplicity in options:
+                if state & mask:
+                    continue  # ballon (ou pierre) déjà placé dans la zone
+                new_state = state | mask
+                if new_state & close != close:
+                    continue  # zone fermée sans son ballon ou sa pierre
+                new_state ^= close
+                new_states[new_state] = new_states.get(new_state, 0) + count * multiplicity
+        states = new_states
+        if not states:
+            return 0
+    return states.get(0, 0)
+
+
+def _count_args(args):
+    return _count(*args)
+
+
+def _canonical(model):
+    # zones renumérotées dans l'ordre de leur première case: deux
+    # composantes identiques à la numérotation près ont la même clé
+    renumber = {}
+    labels = []
+    for label in model.labels:
+        if label >= 0:
+            label = renumber.setdefault(label, len(renumber))
+        labels.append(label)
+    return model.width, model.height, model.nb_zones, tuple(labels)
+
+
+@profiled("count_models")
+def count_models(width, height=None, zones=None, blacks=None, minimal=True, cache=None,
+                 workers=1):
+    """
+    Renvoie le nombre exact de solutions de la grille (voir en tête de
+    module pour minimal). La grille peut être donnée par un GridModel à la
+    place de width.
+    Arguments (optionnels):
+      - cache: dictionnaire gardant le nombre de solutions des composantes
+        déjà comptées, à réutiliser d'un appel à l'autre
+      - workers: nombre de processus comptant les composantes (None pour le
+        nombre de processeurs)
+    """
+    from lib.decompose import split_grid, _map
+
+    if not isinstance(width, GridModel):
+        width = GridModel.from_lists(width, height, zones, blacks)
+    if cache is None:
+        cache = {}
+    keys = []
+    todo = {}
+    for component in split_grid(width):
+        key = _canonical(component["model"]) + (minimal,)
+        keys.append(key)
+        if key not in cache:
+            todo.setdefault(key, component["model"])
+    counts = _map(_count_args, [(model, minimal) for model in todo.values()], workers)
+    cache.update(zip(todo, counts))
+    total = 1
+    for key in keys:
+        total *= cache[key]
+    if not minimal:
+        # cases des segments sans zone, hors de toute composante: chaque
+        # segment de longueur n a (n + 1)(n + 2)/2 dispositions
+        total *= _free_segments(width)
+    return total
+
+
+def _free_segments(model):
+    width, height, labels = model.width, model.height, model.labels
+    total = 1
+    for x in range(width):
+        length = 0
+        has_zone = False
+        for c in range(x, width * height + width, width):
+            if c >= width * height or labels[c] == BLACK:
+                if length and not has_zone:
+                    total *= (length + 1) * (length + 2) // 2
+                length = 0
+                has_zone = False
+            else:
+                length += 1
+                has_zone = has_zone or labels[c] >= 0
+    return total
@@ -0,0 +1,198 @@
+"""
+Décomposition d'une grille en parties indépendantes.
+
+Les zones n'interagissent que par les segments de colonnes (suites
+verticales maximales de cases non noires, voir gen_formule.column_segments):
+les ballons d'un segment sont collés en haut, ses pierres en bas. Dans le
+graphe qui relie chaque zone aux segments contenant ses cases, chaque
+composante connexe est donc une grille à part entière: ses solutions se
+combinent librement avec celles des autres composantes. Les cases noires et
+les bords des zones découpent souvent une grande grille en de nombreuses
+petites composantes.
+
+La grille a une solution si et seulement si chaque composante en a une, et
+son nombre de solutions est le produit des nombres de solutions des
+composantes. Chaque composante est encodée et résolue séparément, en
+parallèle dans des processus.
+
+Les segments sans case de zone ne font partie d'aucune composante: comme
+pour bitset_solver (solutions minimales sur les cases hors zone), leurs
+cases restent vides.
+"""
+from lib.gen_formule import gen_cnf, decode_solution
+from lib.profiling import profiled
+from lib.grid_model import GridModel, BLACK
+
+
+def _find(parent, i):
+    # union-find avec compression de chemin par division
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def split_grid(model):
+    """
+    Découpe la grille (GridModel) en composantes indépendantes.
+    Renvoie la liste des composantes, chacune étant un dictionnaire:
+    {
+        "model": GridModel de la composante, rognée à ses cases (les autres
+                 cases du rectangle sont noires), ses zones étant
+                 renumérotées dans l'ordre,
+        "x", "y": position du coin haut gauche de la composante dans la
+                  grille,
+        "zones": numéros, dans la grille, des zones de la composante
+    }
+    Une zone vide forme à elle seule une composante sans solution.
+    """
+    width, height, labels = model.width, model.height, model.labels
+
+    # segments de colonnes (listes de cases), et union des zones de chaque
+    # segment
+    parent = list(range(model.nb_zones))
+    segments = []
+    for x in range(width):
+        segment = None
+        for c in range(x, width * height, width):
+            if labels[c] == BLACK:
+                segment = None
+                continue
+            if segment is None:
+                segment = []
+                segments.append(segment)
+            segment.append(c)
+    for segment in segments:
+        root = None
+        for c in segment:
+            if labels[c] >= 0:
+                z = _find(parent, labels[c])
+                if root is None:
+                    root = z
+                elif z != root:
+                    parent[z] = root
+
+    # cases de chaque composante
+    cells = {}
+    for segment in segments:
+        for c in segment:
+            if labels[c] >= 0:
+                cells.setdefault(_find(parent, labels[c]), []).extend(segment)
+                break
+    empty = set(range(model.nb_zones))
+    for c in range(width * height):
+        if labels[c] >= 0:
+            empty.discard(labels[c])
+
+    components = []
+    for root in sorted(cells):
+        xs = [c % width for c in cells[root]]
+        ys = [c // width for c in cells[root]]
+        x0, y0 = min(xs), min(ys)
+        sub_width = max(xs) - x0 + 1
+        sub_height = max(ys) - y0 + 1
+        zones = sorted({labels[c] for c in cells[root] if labels[c] >= 0})
+        renumber = {z: i for i, z in enumerate(zones)}
+        sub = GridModel(sub_width, sub_height, [BLACK] * (sub_width * sub_height), len(zones))
+        for c, x, y in zip(cells[root], xs, ys):
+            label = labels[c]
+            sub.labels[(y - y0) * sub_width + x - x0] = renumber.get(label, label)
+        components.append({"model": sub, "x": x0, "y": y0, "zones": zones})
+    for z in sorted(empty):
+        components.append({"model": GridModel(1, 1, [BLACK], 1), "x": 0, "y": 0, "zones": [z]})
+    return components
+
+
+def _solve_component(args):
+    model, backend, encoder, budget, deadline = args
+    # durée restante avant l'échéance commune à toutes les composantes
+    if budget is not None:
+        budget = budget.remaining(deadline)
+        if budget.expired:
+            return "UNKNOWN"
+    solution = backend.solve(encoder(model), budget)
+    if solution == "UNSAT" or solution == "UNKNOWN":
+        return solution
+    return decode_solution(solution, model.width, model.height)
+
+
+def _map(function, items, workers):
+    import os
+
+    workers = min(workers or os.cpu_count() or 1, len(items))
+    # une seule composante (ou un seul processeur) ne vaut pas le lancement
+    # des processus
+    if workers <= 1:
+        return list(map(function, items))
+    from concurrent.futures import ProcessPoolExecutor
+
+    # les composantes sont envoyées par paquets: la plupart sont minuscules
+    chunksize = max(1, len(items) // (4 * workers))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(function, items, chunksize=chunksize))
+
+
+def merge_layouts(model, components, layouts):
+    """
+    Assemble les dispositions (voir decode_solution) des composantes fournies
+    (voir split_grid) en la disposition de toute la grille. Les cases hors
+    composante sont noires ou vides.
+    """
+    width = model.width
+    layout = [
+        ["N" if model.labels[y * width + x] == BLACK else "-" for x in range(width)]
+        for y in range(model.height)
+    ]
+    for component, sub_layout in zip(components, layouts):
+        sub = component["model"]
+        x0, y0 = component["x"], component["y"]
+        for y in range(sub.height):
+            row = layout[y0 + y]
+            for x in range(sub.width):
+                if sub.labels[y * sub.width + x] != BLACK:
+                    row[x0 + x] = sub_layout[y][x]
+    return ["".join(row) for row in layout]
+
+
+@profiled("solve_components")
+def solve_components(model, backend=None, encoder=gen_cnf, workers=None, budget=None):
+    """
+    Résout la grille (GridModel) composante par composante (voir
+    split_grid), dans workers processus (nombre de processeurs par défaut,
+    1 pour tout résoudre dans le processus courant).
+    Arguments backend et encoder: comme pour backbone.compute_backbone;
+    budget (optionnel): budget de la grille (voir lib/budget): la durée est
+    partagée par toutes les composantes (échéance commune), le nombre de
+    propagations est limité composante par composante.
+    Renvoie la disposition d'une solution (voir decode_solution), None si
+    la grille n'a pas de solution, ou "UNKNOWN" si le satsolver n'a pas
+    répondu pour une composante (budget épuisé).
+    """
+    if backend is None:
+        from lib.backends import PycosatBackend
+
+        backend = PycosatBackend()
+    deadline = None if budget is None else budget.deadline()
+    components = split_grid(model)
+    layouts = _map(
+        _solve_component,
+        [(c["model"], backend, encoder, budget, deadline) for c in components],
+        workers,
+    )
+    if "UNSAT" in layouts:
+        return None
+    if "UNKNOWN" in layouts:
+        return "UNKNOWN"
+    return merge_layouts(model, components, layouts)
+
+
+def count_components(model, workers=None):
+    """
+    Compte les solutions de la grille (GridModel), au sens de
+    bitset_solver.itersolve: produit des nombres de solutions des
+    composantes (voir split_grid), comptées dans workers processus (voir
+    counting.count_models).
+    """
+    from lib.counting import count_models
+
+    return count_models(model, workers=workers)
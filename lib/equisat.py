@@ -0,0 +1,91 @@
+"""
+Vérification d'une réduction de formule (par exemple sat_3sat): la formule
+réduite doit être équisatisfaisable avec la formule d'origine, et ses
+modèles, restreints aux variables de la formule d'origine, doivent être
+exactement les modèles de celle-ci.
+
+Les modèles sont comparés dans les deux sens, jusqu'à limit modèles de
+chaque côté:
+  - chaque modèle (restreint) de la formule réduite satisfait la formule
+    d'origine;
+  - chaque modèle de la formule d'origine se prolonge en un modèle de la
+    formule réduite.
+Les modèles de la formule réduite sont énumérés en interdisant à chaque fois
+leur restriction, pour ne pas compter plusieurs fois un même modèle prolongé
+de différentes façons par les variables auxiliaires.
+"""
+from lib.backends import PycosatBackend
+
+
+def _satisfies(cnf, model):
+    true = set(model)
+    return all(any(literal in true for literal in clause) for clause in cnf)
+
+
+def _projected_models(cnf, nb_vars, backend, limit):
+    # modèles restreints aux variables 1..nb_vars, sans doublons
+    cnf = [list(clause) for clause in cnf]
+    models = []
+    while len(models) < limit:
+        model = backend.solve(cnf)
+        if model == "UNSAT":
+            return models, True
+        if model == "UNKNOWN":
+            raise RuntimeError("Satsolver gave no answer")
+        model = model[:nb_vars]
+        models.append(model)
+        cnf.append([-literal for literal in model])
+    return models, False
+
+
+def check_reduction(cnf, reduced, nb_vars=None, backend=None, limit=100):
+    """
+    Compare la formule reduced à la formule cnf (listes de clauses au
+    format de pycosat) sur les variables 1..nb_vars (par défaut, toutes les
+    variables de cnf).
+    Renvoie un dictionnaire:
+    {
+        "ok": True si aucune différence n'a été trouvée,
+        "satisfiable": satisfaisabilité de cnf,
+        "models": nombre de modèles de cnf vérifiés,
+        "complete": True si tous les modèles ont été vérifiés (moins de
+                    limit modèles de chaque côté),
+        "errors": liste de messages décrivant les différences trouvées
+    }
+    """
+    if backend is None:
+        backend = PycosatBackend()
+    if nb_vars is None:
+        nb_vars = max((abs(literal) for clause in cnf for literal in clause), default=0)
+    errors = []
+
+    originals, complete = _projected_models(cnf, nb_vars, backend, limit)
+    reduced_models, reduced_complete = _projected_models(reduced, nb_vars, backend, limit)
+    if bool(originals) != bool(reduced_models):
+        errors.append(
+            "original formula is {}, reduced formula is {}".format(
+                "sat" if originals else "unsat", "sat" if reduced_models else "unsat"
+            )
+        )
+    for model in reduced_models:
+        if not _satisfies(cnf, model):
+            errors.append("model of the reduced formula is not a model of the original one")
+            break
+    for model in originals:
+        if backend.solve(reduced + [[literal] for literal in model]) == "UNSAT":
+            errors.append("model of the original formula does not extend to the reduced one")
+            break
+    complete = complete and reduced_complete
+    if complete and not errors and len(originals) != len(reduced_models):
+        errors.append(
+            "{} models for the original formula, {} for the reduced one".format(
+                len(originals), len(reduced_models)
+            )
+        )
+    return {
+        "ok": not errors,
+        "satisfiable": bool(originals),
+        "models": len(originals),
+        "complete": complete,
+        "errors": errors,
+    }
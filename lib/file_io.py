@@ -1,5 +1,9 @@
 import json
 
+from lib.profiling import profiled, stage
+from lib.corpus import CorpusReader, is_corpus
+from lib.grid_model import GridModel
+
 def save_grid(grid, path):
     """
     Enregistre la grille fournie en 1e argument dans le fichier fourni en
@@ -15,7 +19,10 @@ def save_grid(grid, path):
             ...
         ]
     }
+    Un GridModel (voir lib/grid_model) peut aussi être fourni.
     """
+    if isinstance(grid, GridModel):
+        grid = grid.to_json()
     with open(path, "w") as in_file:
         in_file.write(json.dumps(grid))
 
@@ -39,6 +46,79 @@ def read_grid(path):
         grid = json.loads(in_file.read())
     return grid
 
+def iter_grids(paths):
+    """
+    Enumère les grilles contenues dans les fichiers fournis: fichiers JSON
+    (une grille par fichier) ou corpus de grilles (voir lib/corpus, le
+    fichier n'est ouvert qu'une fois). Renvoie des couples (nom, grille), le
+    nom d'une grille de corpus étant "chemin[indice]".
+    """
+    for path in paths:
+        if is_corpus(path):
+            with CorpusReader(path) as corpus:
+                for i, grid in enumerate(corpus):
+                    yield "{}[{}]".format(path, i), grid
+        else:
+            yield path, read_grid(path)
+
+def _open_gzip(path, mode):
+    import gzip
+
+    return gzip.open(path, mode, compresslevel=6)
+
+
+def _open_xz(path, mode):
+    import lzma
+
+    return lzma.open(path, mode)
+
+
+def _open_zstd(path, mode):
+    # zstd n'est pas dans la bibliothèque standard avant Python 3.14:
+    # module compression.zstd, ou module zstandard s'il est installé
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            raise ValueError(
+                "zstd compression requires Python 3.14 or the zstandard module: {}".format(path)
+            ) from None
+    return zstd.open(path, mode)
+
+
+# Formats de compression: extension du fichier, premiers octets d'un fichier
+# compressé, fonction d'ouverture
+COMPRESSIONS = (
+    (".gz", b"\x1f\x8b", _open_gzip),
+    (".xz", b"\xfd7zXZ\x00", _open_xz),
+    (".zst", b"\x28\xb5\x2f\xfd", _open_zstd),
+)
+
+
+def open_text(path, mode="r"):
+    """
+    Ouvre le fichier texte path en lecture (mode "r") ou en écriture (mode
+    "w"), en le compressant ou décompressant au fil de l'eau si besoin:
+      - en écriture, le format de compression est choisi d'après
+        l'extension du fichier (.gz, .xz ou .zst, sinon pas de compression)
+      - en lecture, il est reconnu d'après les premiers octets du fichier,
+        quelle que soit son extension
+    """
+    if mode == "w":
+        for extension, _, opener in COMPRESSIONS:
+            if path.endswith(extension):
+                return opener(path, "wt")
+    else:
+        with open(path, "rb") as in_file:
+            start = in_file.read(8)
+        for _, magic, opener in COMPRESSIONS:
+            if start.startswith(magic):
+                return opener(path, "rt")
+    return open(path, mode)
+
+@profiled("save_dimacs", count_arg=0)
 def save_dimacs(cnf, filename):
     """
     Enregistre les clauses fournies en 1e argument dans le fichier fourni en
@@ -46,36 +126,140 @@ def save_dimacs(cnf, filename):
     Format de clauses attendu: liste d'entiers (format dimacs compatible avec
     pycosat)
     """
-    #Initialisation du nombre de clause
-    nb_clauses = 0
-    #Initialisation d'une liste pour chercher le nombre de variables de la formule
-    unique_variables=[]
+    # Nombre de variables (plus grand indice de variable, comme l'attend le
+    # format DIMACS) et nombre de clauses
+    nb_vars, nb_clauses = count_cnf(cnf)
 
-    for clause in cnf:
-        # incrémenter le nombre de clauses
-        nb_clauses+=1
-        # Pour chaque variable, si elle n'est pas dans unique_variables, incrementer
-        # le compteur du nombre de variable et l'ajouter dans unique_variables
-        for variable in clause:
-            if not(variable in unique_variables) and not(-variable in unique_variables):
-                unique_variables.append(variable)
-    
-    #Ecriture du le fichier au format DIMACS
-    with open(filename, "w") as fichier:
+    #Ecriture du le fichier au format DIMACS (compressé selon l'extension du
+    #fichier, voir open_text)
+    with open_text(filename, "w") as fichier:
         # En-tête
         fichier.write("c Creation du fichier DIMACS avec les clauses\n")
         fichier.write("p cnf ")
-        fichier.write(str(len(unique_variables)))
+        fichier.write(str(nb_vars))
         fichier.write(" ")
         fichier.write(str(nb_clauses))
         fichier.write("\n")
-        # Clauses
+        # Clauses, écrites par blocs
+        block = []
         for clause in cnf:
-            i = 1
-            for variable in clause:
-                fichier.write(str(variable))
-                fichier.write(" ")
-                if i == len(clause):
-                    fichier.write("0") # une clause dimacs est terminée par un 0
-                i += 1
-            fichier.write("\n")
+            if clause:
+                # une clause dimacs est terminée par un 0
+                block.append(" ".join(map(str, clause)) + " 0\n")
+            else:
+                # clause vide (formule insatisfaisable): un 0 seul
+                block.append("0\n")
+            if len(block) >= 4096:
+                fichier.write("".join(block))
+                block = []
+        fichier.write("".join(block))
+
+
+def count_cnf(cnf):
+    """
+    Renvoie (nombre de variables, nombre de clauses) des clauses fournies,
+    en les parcourant une seule fois sans les garder (cnf peut être un
+    itérable quelconque, par exemple gen_formule.iter_cnf). Le nombre de
+    variables est le plus grand indice de variable.
+    """
+    nb_vars = 0
+    nb_clauses = 0
+    for clause in cnf:
+        nb_clauses += 1
+        for variable in clause:
+            if variable > nb_vars:
+                nb_vars = variable
+            elif -variable > nb_vars:
+                nb_vars = -variable
+    return nb_vars, nb_clauses
+
+
+# largeur réservée pour chaque nombre de l'en-tête quand il est complété
+# après l'écriture des clauses (voir save_dimacs_stream)
+_HEADER_FIELD = 20
+
+
+def save_dimacs_stream(cnf, filename, nb_vars=None, nb_clauses=None):
+    """
+    Enregistre au format DIMACS des clauses fournies au fur et à mesure
+    (itérable quelconque, par exemple gen_formule.iter_cnf ou iter_3sat),
+    en un seul parcours et sans les garder en mémoire.
+    Si nb_vars et nb_clauses ne sont pas fournis, l'en-tête est écrit avec
+    des nombres provisoires, puis complété une fois toutes les clauses
+    écrites: ce n'est possible que pour un fichier non compressé (ValueError
+    sinon; voir count_cnf pour les compter à l'avance).
+    Renvoie (nombre de variables, nombre de clauses).
+    """
+    compressed = any(filename.endswith(extension) for extension, _, _ in COMPRESSIONS)
+    if nb_vars is None or nb_clauses is None:
+        if compressed:
+            raise ValueError(
+                "Streaming to a compressed file requires nb_vars and nb_clauses: {}".format(filename)
+            )
+        header = "p cnf {} {}\n".format(" " * _HEADER_FIELD, " " * _HEADER_FIELD)
+    else:
+        header = "p cnf {} {}\n".format(nb_vars, nb_clauses)
+
+    with stage("save_dimacs_stream") as st, open_text(filename, "w") as fichier:
+        fichier.write("c Creation du fichier DIMACS avec les clauses\n")
+        header_offset = fichier.tell() if not compressed else None
+        fichier.write(header)
+        # Clauses, écrites par blocs
+        max_var = 0
+        count = 0
+        block = []
+        for clause in cnf:
+            count += 1
+            if clause:
+                for variable in clause:
+                    if variable > max_var:
+                        max_var = variable
+                    elif -variable > max_var:
+                        max_var = -variable
+                # une clause dimacs est terminée par un 0
+                block.append(" ".join(map(str, clause)) + " 0\n")
+            else:
+                # clause vide (formule insatisfaisable): un 0 seul
+                block.append("0\n")
+            if len(block) >= 4096:
+                fichier.write("".join(block))
+                block = []
+        fichier.write("".join(block))
+        if nb_vars is None or nb_clauses is None:
+            # compléter l'en-tête (nombres alignés à gauche, complétés par
+            # des espaces)
+            fichier.seek(header_offset)
+            fichier.write("p cnf {:<{width}} {:<{width}}".format(
+                max_var, count, width=_HEADER_FIELD
+            ))
+        elif count != nb_clauses or max_var > nb_vars:
+            raise ValueError(
+                "{}: expected {} variables and {} clauses, got {} and {}".format(
+                    filename, nb_vars, nb_clauses, max_var, count
+                )
+            )
+        st.record(clauses=count, variables=max_var)
+    return max_var, count
+
+
+def read_dimacs(filename):
+    """
+    Lit le fichier DIMACS fourni (éventuellement compressé, voir open_text)
+    et renvoie ses clauses, au format de pycosat (liste de listes
+    d'entiers).
+    """
+    cnf = []
+    clause = []
+    with open_text(filename) as in_file:
+        for line in in_file:
+            if line.startswith(("c", "p", "%")):
+                continue
+            for literal in map(int, line.split()):
+                if literal == 0:
+                    cnf.append(clause)
+                    clause = []
+                else:
+                    clause.append(literal)
+    if clause:
+        cnf.append(clause)
+    return cnf
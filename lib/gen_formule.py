@@ -1,47 +1,194 @@
 #!venv/bin/python
-import itertools
-import pycosat as sat
+from array import array
 
-import lib.file_io as fio
+from lib.profiling import profiled
+from lib.grid_model import GridModel, unpack_grid, BLACK as BLACK_CELL
 
+# Décalage de chaque variable dans le groupe de trois variables d'une case
+BALLOON = 0
+STONE = 1
+BLACK = 2
 
-def sat_3sat(cnf, height, width):
+
+def cell_var(x, y, width, mode):
+    """
+    Renvoie l'indice de la variable DIMACS associée à la case (x,y) d'une
+    grille de largeur width. mode vaut BALLOON, STONE ou BLACK (voir la
+    convention de nommage détaillée dans gen_cnf).
+    """
+    return 3 * width * (1 + y) + 1 + 3 * x + mode
+
+
+def column_segments(width, height, blacks):
+    """
+    Découpe chaque colonne de la grille en segments: les suites verticales
+    maximales de cases non noires. Chaque segment est délimité en haut et en
+    bas par une case noire ou par le bord de la grille.
+    Renvoie la liste des segments, chacun étant la liste des coordonnées
+    [x, y] de ses cases, de haut en bas.
+    """
+    solid = set(map(tuple, blacks))
+    segments = []
+    for x in range(width):
+        segment = []
+        for y in range(height):
+            if (x, y) in solid:
+                if segment:
+                    segments.append(segment)
+                segment = []
+            else:
+                segment.append([x, y])
+        if segment:
+            segments.append(segment)
+    return segments
+
+
+def decode_solution(solution, width, height):
+    """
+    Décode une solution renvoyée par le satsolver (liste d'entiers telle que
+    renvoyée par pycosat) en la disposition de la grille: une liste de height
+    chaînes de width caractères, avec les symboles suivants:
+      - 'B' = ballon
+      - 'S' = pierre (stone)
+      - 'N' = case noire
+      - '-' = case vide
+    """
+    layout = []
+    # La première variable dans la grille (la case en haut à gauche) est
+    # précédée par une ligne entière de variables
+    i = width * 3
+    for _ in range(height):
+        row = []
+        for _ in range(width):
+            if solution[i] > 0:
+                row.append("B")
+            elif solution[i + 1] > 0:
+                row.append("S")
+            elif solution[i + 2] > 0:
+                row.append("N")
+            else:
+                row.append("-")
+            i += 3
+        layout.append("".join(row))
+    return layout
+
+
+def decode_solutions(solutions, width, height):
+    """
+    Version vectorisée de decode_solution pour un grand nombre de solutions
+    (nécessite numpy). solutions est un tableau (ou une liste de listes)
+    d'entiers de forme (nombre de solutions, nombre de variables); seules
+    les 3*width*(height+1) premières colonnes sont lues.
+    Renvoie un tableau numpy d'octets de forme (nombre de solutions, height,
+    width) contenant les codes ASCII des symboles de decode_solution.
+    """
+    import numpy
+
+    solutions = numpy.asarray(solutions)
+    # colonne de la variable de chaque (case, mode): la première case est
+    # précédée par une ligne entière de variables
+    columns = 3 * width + numpy.arange(0, 3 * width * height).reshape(-1, 3)
+    true = solutions[:, columns] > 0
+    # indice du premier mode vrai (ballon, pierre, noir), 3 si aucun
+    codes = numpy.argmax(
+        numpy.concatenate(
+            (true, numpy.ones(true.shape[:2] + (1,), dtype=bool)), axis=2
+        ),
+        axis=2,
+    )
+    symbols = numpy.frombuffer(b"BSN-", dtype=numpy.uint8)
+    return symbols[codes].reshape(len(solutions), height, width)
+
+
+# Nombre de variables de remplissage partagées par le mode lean de sat_3sat
+LEAN_PADDING = 3
+
+
+@profiled("sat_3sat", count_result=True)
+def sat_3sat(cnf, height, width=None, lean=False):
     """
     Convertit une liste de clauses quelconques en des clauses 3-SAT.
     Format utilisé: liste dimacs compatible pycosat.
+    Les dimensions de la grille peuvent être données par un GridModel (voir
+    lib/grid_model) à la place de height et width.
+    Avec lean, les clauses trop courtes sont complétées par des variables
+    partagées, forcées à faux une fois pour toutes (voir iter_3sat): une
+    seule clause par clause courte au lieu de deux ou quatre.
     """
-    cnf_3sat = []  # nouvelle liste de clauses
+    if isinstance(height, GridModel):
+        height, width = height.height, height.width
 
-    # calculer le 1e indice de variable qui est libre.
+    # calculer le 1e indice de variable qui est libre: après les variables
+    # de la grille, et après les éventuelles variables auxiliaires utilisées
+    # par l'encodage (voir gen_segments)
     i = 1 + 3 * (height + 2) * width
+    for clause in cnf:
+        for variable in clause:
+            if abs(variable) >= i:
+                i = abs(variable) + 1
+    return list(iter_3sat(cnf, i, lean))
+
 
+def iter_3sat(cnf, next_var, lean=False):
+    """
+    Version en flux de sat_3sat: convertit au fur et à mesure les clauses
+    fournies (itérable quelconque, par exemple iter_cnf) en clauses 3-SAT,
+    sans les garder en mémoire. next_var est le premier indice de variable
+    libre (1 + 3 * (height + 2) * width pour les formules de gen_cnf et de
+    iter_cnf).
+    Avec lean, les LEAN_PADDING premières variables libres sont forcées à
+    faux par 7 clauses (toutes les combinaisons de signes sauf celle où les
+    trois variables sont fausses), puis servent à compléter les clauses de
+    moins de trois littéraux.
+    """
+    i = next_var
+    if lean:
+        u, v, w = i, i + 1, i + 2
+        i += LEAN_PADDING
+        for signs in range(1, 8):
+            yield [
+                -u if signs & 1 else u,
+                -v if signs & 2 else v,
+                -w if signs & 4 else w,
+            ]
     for clause in cnf:
-        if len(clause) == 1:
+        if len(clause) == 3:
+            # ne rien rajouter, utiliser telle quelle la clause
+            yield clause
+        elif len(clause) > 3:
+            # découper la clause
+            # ex: (a+b+c+d+e) = (a+b+u)(-u+c+v)(-v+d+e)
+            yield [clause[0], clause[1], i]
+            for k in range(1, len(clause) - 3):
+                yield [-i, clause[k + 1], i + 1]
+                i += 1
+            yield [-i, clause[len(clause) - 2], clause[len(clause) - 1]]
+            # la dernière variable de la chaîne ne doit pas être réutilisée
+            # par la clause suivante
+            i += 1
+        elif lean:
+            # compléter avec les variables fausses
+            # ex: (a) = (a+u+v), (a+b) = (a+b+u), () = (u+v+w)
+            yield (list(clause) + [u, v, w])[:3]
+        elif len(clause) == 1:
             # rajouter deux variables pour remplir
             # ex: (a) = (a+u+v)(a+u+-v)(a+-u+v)(a+-u+-v)
-            cnf_3sat.append([clause[0], i, i + 1])
-            cnf_3sat.append([clause[0], i, -(i + 1)])
-            cnf_3sat.append([clause[0], -i, i + 1])
-            cnf_3sat.append([clause[0], -i, -(i + 1)])
+            yield [clause[0], i, i + 1]
+            yield [clause[0], i, -(i + 1)]
+            yield [clause[0], -i, i + 1]
+            yield [clause[0], -i, -(i + 1)]
             i += 2
         elif len(clause) == 2:
             # rajouter une variable pour remplir
             # ex: (a+b) = (a+b+u)(a+b+-u)
-            cnf_3sat.append([clause[0], clause[1], i])
-            cnf_3sat.append([clause[0], clause[1], -i])
+            yield [clause[0], clause[1], i]
+            yield [clause[0], clause[1], -i]
             i += 1
-        elif len(clause) == 3:
-            # ne rien rajouter, utiliser telle quelle la clause
-            cnf_3sat.append(clause)
         else:
-            # découper la clause
-            # ex: (a+b+c+d+e) = (a+b+u)(-u+c+v)(-v+d+e)
-            cnf_3sat.append([clause[0], clause[1], i])
-            for k in range(1, len(clause) - 3):
-                cnf_3sat.append([-i, clause[k + 1], i + 1])
-                i += 1
-            cnf_3sat.append([-i, clause[len(clause) - 2], clause[len(clause) - 1]])
-    return cnf_3sat
+            # clause vide: insatisfaisable, comme (u)(-u)
+            yield [i, i, i]
+            yield [-i, -i, -i]
+            i += 1
 
 
 def make_each_positive_once(zone, gridWidth, mode):
@@ -88,7 +235,8 @@ def make_each_positive_once(zone, gridWidth, mode):
             yield clause
 
 
-def gen_cnf(width, height, zones, blacks):
+@profiled("gen_cnf", count_result=True)
+def gen_cnf(width, height=None, zones=None, blacks=None, implied=()):
     """
     Génère la forme normale conjonctive donnant la satisfaisabilité de la
     grille de Dosun-Fuwari donnée en argument.
@@ -111,6 +259,10 @@ def gen_cnf(width, height, zones, blacks):
                     [x2,y2],
                     ...
                   ]
+        Un GridModel (voir lib/grid_model) peut être fourni à la place de
+        width, height, zones et blacks.
+        - implied (optionnel): noms des familles de clauses impliquées à
+                   ajouter à la formule (voir lib/implied)
 
     Règles logiques traduites:
         Chaque case de la grille a trois variables qui lui sont associées:
@@ -148,6 +300,7 @@ def gen_cnf(width, height, zones, blacks):
 
 	     (37,38,39) (40,41,42) (43,44,45)
     """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
     cnf = []
 
     # Clauses pour les cases en dehors de la grille
@@ -167,10 +320,11 @@ def gen_cnf(width, height, zones, blacks):
         cnf.append([i + 2])
 
     # Clauses définissant les cases noires
+    solid = set(map(tuple, blacks))
     i = 1 + 3 * width
     for y in range(height):
         for x in range(width):
-            if [x, y] in blacks:
+            if (x, y) in solid:
                 cnf.append([i + 2])     # (x,y) est noire
                 cnf.append([-i])        # (x,y) ne peut pas contenir un ballon
                 cnf.append([-(i + 1)])  # (x,y) ne peut pas contenir une pierre
@@ -213,4 +367,77 @@ def gen_cnf(width, height, zones, blacks):
         # Chaque case de la zone pourrait être une pierre
         for clause in make_each_positive_once(zone, width, 1): #1 = mode pierre
             cnf.append(list(clause))
+    if implied:
+        from lib.implied import implied_clauses
+
+        cnf.extend(implied_clauses([width, height, zones, blacks], implied))
     return cnf
+
+
+def iter_cnf(width, height=None, zones=None, blacks=None):
+    """
+    Version en flux de gen_cnf: génère les mêmes règles, mais clause par
+    clause et ligne de la grille par ligne, sans construire la liste des
+    clauses. La mémoire utilisée ne dépend que de la taille de la grille
+    (son GridModel) et des zones pas encore terminées: les clauses d'une zone
+    sont générées dès que sa dernière ligne est atteinte.
+    Arguments: comme gen_cnf. Les clauses sont les mêmes que celles de
+    gen_cnf(GridModel), dans un autre ordre.
+    """
+    if not isinstance(width, GridModel):
+        width = GridModel.from_lists(width, height, zones, blacks)
+    model = width
+    width, height, labels = model.width, model.height, model.labels
+
+    # dernière ligne de chaque zone (-1 pour une zone vide)
+    last_row = array("i", [-1]) * model.nb_zones
+    for c, label in enumerate(labels):
+        if label >= 0:
+            last_row[label] = c // width
+
+    # Cases au dessus de la grille: pas de ballon, pas de pierre, noires
+    for i in range(1, 3 * width, 3):
+        yield [-i]
+        yield [-(i + 1)]
+        yield [i + 2]
+
+    open_zones = {}  # zone -> cases déjà rencontrées
+    i = 1 + 3 * width
+    for y in range(height):
+        row = y * width
+        for x in range(width):
+            label = labels[row + x]
+            if label == BLACK_CELL:
+                yield [i + 2]
+                yield [-i]
+                yield [-(i + 1)]
+            else:
+                yield [-(i + 2)]
+                if label >= 0:
+                    open_zones.setdefault(label, []).append((x, y))
+            # pas à la fois un ballon et une pierre
+            yield [-i, -(i + 1)]
+            # une pierre repose sur une pierre ou une case noire
+            if y < height - 1:
+                yield [-(i + 1), (i + 1) + 3 * width, (i + 1) + 3 * width + 1]
+            # un ballon est sous un ballon ou une case noire
+            if y > 0:
+                yield [-i, i - 3 * width, i - 3 * width + 2]
+            i += 3
+        # zones dont c'est la dernière ligne
+        for label in [label for label in open_zones if last_row[label] == y]:
+            zone = open_zones.pop(label)
+            yield from make_each_positive_once(zone, width, BALLOON)
+            yield from make_each_positive_once(zone, width, STONE)
+
+    # zones vides: aucune case ne peut y être le ballon (ni la pierre)
+    for label in range(model.nb_zones):
+        if last_row[label] < 0:
+            yield []
+            yield []
+
+    # Cases en dessous de la grille: règles identiques que pour au dessus
+    for i in range(i, i + 3 * width, 3):
+        yield [-i]
+        yield [-(i + 1)]
+        yield [i + 2]
@@ -0,0 +1,185 @@
+from lib.gen_formule import BALLOON, STONE, BLACK, cell_var, column_segments, gen_cnf
+from lib.profiling import profiled
+from lib.grid_model import unpack_grid
+
+# Au-delà de cette taille, la contrainte "exactement un" d'une zone est
+# encodée par une échelle plutôt que par toutes les paires de cases
+LADDER_THRESHOLD = 6
+
+
+def exactly_one(literals, next_var):
+    """
+    Génère les clauses imposant qu'exactement un des littéraux fournis soit
+    vrai. Les petites listes sont encodées par paires, les grandes par une
+    échelle (ladder) de variables auxiliaires r_i <=> x_1 or ... or x_i, ce
+    qui donne un nombre linéaire de clauses. Les variables auxiliaires sont
+    entièrement déterminées par les littéraux: le nombre de modèles de la
+    formule est inchangé.
+    Arguments:
+      - literals: liste des littéraux
+      - next_var: premier indice de variable libre
+    Renvoie la liste des clauses et le nouveau premier indice libre.
+    """
+    clauses = [list(literals)]
+    n = len(literals)
+    if n <= LADDER_THRESHOLD:
+        for i in range(n - 1):
+            for k in range(i + 1, n):
+                clauses.append([-literals[i], -literals[k]])
+        return clauses, next_var
+
+    # r[i] représente "un des littéraux 0..i est vrai", pour i < n-1
+    r = list(range(next_var, next_var + n - 1))
+    next_var += n - 1
+    for i in range(n - 1):
+        clauses.append([-literals[i], r[i]])  # x_i => r_i
+        if i == 0:
+            clauses.append([-r[0], literals[0]])  # r_0 => x_0
+        else:
+            clauses.append([-r[i - 1], r[i]])  # r_i-1 => r_i
+            clauses.append([-r[i], r[i - 1], literals[i]])  # r_i => r_i-1 or x_i
+    for i in range(1, n):
+        clauses.append([-r[i - 1], -literals[i]])  # au plus un
+    return clauses, next_var
+
+
+@profiled("gen_cnf_segments", count_result=True)
+def gen_cnf_segments(width, height=None, zones=None, blacks=None, implied=()):
+    """
+    Encodage alternatif de la grille, plus compact que gen_cnf, qui exploite
+    la structure des colonnes. Mêmes arguments et même format de sortie que
+    gen_cnf; les variables des cases gardent la même numérotation, les
+    solutions se décodent donc de la même façon (Grid.draw_solution,
+    decode_solution).
+
+    Dans chaque segment de colonne (suite verticale de cases non noires, voir
+    column_segments), les ballons forment un préfixe du segment et les
+    pierres un suffixe. En notant c_0..c_L-1 les cases du segment de haut en
+    bas, la variable isBalloon(c_k) est donc la variable d'ordre "les k+1
+    premières cases sont des ballons", et isStone(c_k) la variable d'ordre
+    "les L-k dernières cases sont des pierres":
+      - isBalloon(c_k) => isBalloon(c_k-1)
+      - isStone(c_k) => isStone(c_k+1)
+      - isBalloon(c_k) => not isStone(c_k)
+    Ces clauses binaires remplacent les clauses ternaires de support de
+    gen_cnf qui faisaient intervenir isBlack.
+
+    Deux cases d'une même zone dans un même segment ne peuvent pas être
+    toutes les deux des ballons: seule la plus haute peut contenir le ballon
+    de la zone, et seule la plus basse peut contenir sa pierre. Les autres
+    sont exclues par des clauses unitaires, et l'unicité dans chaque zone
+    n'est encodée que sur les cases restantes (par paires, ou par échelle
+    pour les grandes zones, voir exactly_one).
+
+    Comme pour gen_cnf, implied donne les familles de clauses impliquées à
+    ajouter (voir lib/implied).
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    cnf = []
+    solid = set(map(tuple, blacks))
+
+    # Cases en dehors de la grille: identiques à gen_cnf (elles ne sont
+    # utilisées par aucune autre clause mais fixent la numérotation)
+    for x in range(width):
+        for y in (-1, height):
+            cnf.append([-cell_var(x, y, width, BALLOON)])
+            cnf.append([-cell_var(x, y, width, STONE)])
+            cnf.append([cell_var(x, y, width, BLACK)])
+
+    # Cases noires
+    for y in range(height):
+        for x in range(width):
+            if (x, y) in solid:
+                cnf.append([cell_var(x, y, width, BLACK)])
+                cnf.append([-cell_var(x, y, width, BALLOON)])
+                cnf.append([-cell_var(x, y, width, STONE)])
+            else:
+                cnf.append([-cell_var(x, y, width, BLACK)])
+
+    # Echelles des segments
+    segment_of = {}  # (x,y) -> (indice du segment, position dans le segment)
+    for index, segment in enumerate(column_segments(width, height, blacks)):
+        for k, (x, y) in enumerate(segment):
+            segment_of[(x, y)] = (index, k)
+            balloon = cell_var(x, y, width, BALLOON)
+            stone = cell_var(x, y, width, STONE)
+            cnf.append([-balloon, -stone])
+            if k > 0:
+                cnf.append([-balloon, cell_var(x, y - 1, width, BALLOON)])
+            if k < len(segment) - 1:
+                cnf.append([-stone, cell_var(x, y + 1, width, STONE)])
+
+    # Unicité des ballons et des pierres dans les zones
+    next_var = 1 + 3 * width * (height + 2)
+    for zone in zones:
+        # pour chaque segment touché par la zone: case la plus haute et case
+        # la plus basse de la zone dans ce segment
+        top = {}
+        bottom = {}
+        for x, y in zone:
+            if (x, y) not in segment_of:
+                continue  # case noire
+            index, k = segment_of[(x, y)]
+            if index not in top or k < top[index][0]:
+                top[index] = (k, x, y)
+            if index not in bottom or k > bottom[index][0]:
+                bottom[index] = (k, x, y)
+        balloons = []
+        stones = []
+        for x, y in zone:
+            if (x, y) not in segment_of:
+                continue
+            index, k = segment_of[(x, y)]
+            if top[index][0] == k:
+                balloons.append(cell_var(x, y, width, BALLOON))
+            else:
+                cnf.append([-cell_var(x, y, width, BALLOON)])
+            if bottom[index][0] == k:
+                stones.append(cell_var(x, y, width, STONE))
+            else:
+                cnf.append([-cell_var(x, y, width, STONE)])
+        # Zone entièrement noire: on garde la clause de gen_cnf (toutes ses
+        # variables sont fausses), la formule est alors insatisfaisable
+        if not balloons:
+            balloons = [cell_var(x, y, width, BALLOON) for x, y in zone]
+            stones = [cell_var(x, y, width, STONE) for x, y in zone]
+        for literals in (balloons, stones):
+            clauses, next_var = exactly_one(literals, next_var)
+            cnf.extend(clauses)
+    if implied:
+        from lib.implied import implied_clauses
+
+        cnf.extend(implied_clauses([width, height, zones, blacks], implied))
+    return cnf
+
+
+# Encodages disponibles, par nom (option --encoding des scripts)
+ENCODERS = {"classic": gen_cnf, "segments": gen_cnf_segments}
+
+
+def parse_encoding_flag(args):
+    """
+    Extrait de la liste d'arguments fournie les options --encoding=nom et
+    --implied=famille,famille... (clauses impliquées, voir lib/implied) et
+    renvoie la fonction d'encodage choisie (gen_cnf par défaut) et la liste
+    des arguments restants.
+    """
+    encoder = gen_cnf
+    implied = ()
+    remaining = []
+    for arg in args:
+        if arg.startswith("--encoding="):
+            encoder = ENCODERS[arg.split("=", 1)[1]]
+        elif arg.startswith("--implied="):
+            implied = tuple(name for name in arg.split("=", 1)[1].split(",") if name)
+        else:
+            remaining.append(arg)
+    if implied:
+        from functools import partial
+        from lib.implied import IMPLIED
+
+        for name in implied:
+            if name not in IMPLIED:
+                raise ValueError("unknown implied clauses: {}".format(name))
+        encoder = partial(encoder, implied=implied)
+    return encoder, remaining
@@ -1,7 +1,15 @@
 from tkinter import Canvas
-import pycosat as sat
 
 from lib.gen_formule import gen_cnf, sat_3sat
+from lib import bitset_solver
+from lib.backends import get_backend
+from lib.profiling import profiled, stage
+from lib.hints import HintEngine, Contradiction
+from lib.validate import validate_grid, unsat_reason
+from lib.grid_model import GridModel, BLACK, NO_ZONE
+from lib.grid_editor import GridEditor, LABELS
+from lib.verify import verify_models, describe
+from lib.solution_pager import SolutionPager
 
 class Grid(Canvas):
     """
@@ -12,12 +20,27 @@ class Grid(Canvas):
     border_width = 4
     border_colour = "#afafaf"
     selection_colour = "#b3e5fc"
+    # Moteur de résolution: "bitset" (solveur dédié, voir lib/bitset_solver)
+    # ou "sat" (formule réduite en 3-SAT résolue par le satsolver backend,
+    # voir lib/backends.get_backend)
+    engine = "bitset"
+    backend = "pycosat"
+    # Budget de la résolution (voir lib/budget), None: pas de limite
+    budget = None
+    # Indices: couleur des cases révélées et temps de recherche maximal (en
+    # secondes) avant de rendre la main à l'interface
+    hint_colour = "#4caf50"
+    hint_budget = 0.04
+    # Pages de solutions (boutons Next/Previous): délai (en millisecondes)
+    # entre deux vérifications qu'une page demandée est prête
+    page_poll = 20
 
-    def __init__(self, x, y, solvable_textvar, blacks=[], zones=[], master=None):
+    def __init__(self, x, y=None, solvable_textvar=None, blacks=[], zones=[], master=None):
         """
         Initialisation automatique à la création d'une grille
         Arguments:
-          - x : largeur de la grille
+          - x : largeur de la grille, ou GridModel de la grille à afficher
+                (voir lib/grid_model; y, blacks et zones sont alors ignorés)
           - y : hauteur de la grille
           - solvable_textvar: TextVar contenant le message de satisfaisabilité
                               de la grille (à mettre à jour après résolution
@@ -28,12 +51,23 @@ class Grid(Canvas):
                                afficher
           - master (optionnel): Element Tk dans lequel dessiner la grille
         """
+        if isinstance(x, GridModel):
+            zones = blacks = x
+            x, y = x.width, x.height
         # Initialiser les variables d'instance
         self.master = master
         self.dimensions = (x, y)
-        self.black_cells = blacks
-        self.zones = zones
+        # état de l'éditeur (zones, cases noires et sélection, voir
+        # lib/grid_editor): le canvas ne fait que l'afficher
+        self.editor = GridEditor(GridModel(x, y))
+        self.model = self.editor.model
         self.solvable_textvar = solvable_textvar
+        # moteur d'indices, recréé à chaque modification de la grille
+        self.hint_engine = None
+        self.hint_pending = False
+        # pages des solutions, créées par solve (voir lib/solution_pager)
+        self.pager = None
+        self.page = 0
 
         # Initialiser le canvas
         super().__init__(
@@ -43,290 +77,130 @@ class Grid(Canvas):
         )
         # Dessiner la grille vide
         self.draw()
+        self.editor.subscribe(self.on_change)
 
         # Dessiner la grille fournie (si fournie)
-        if zones != [] or blacks != []:
+        if isinstance(zones, GridModel):
+            self.load_grid(zones)
+        elif zones != [] or blacks != []:
             self.load_grid(zones, blacks)
 
     def draw(self):
         """
         Dessiner une grille vide
         """
-        # Dessiner les cases
+        # Dessiner les cases (self.cell_items[y * largeur + x] est l'élément
+        # du canvas de la case (x,y), self.cell_index l'inverse)
+        self.cell_items = []
+        self.cell_index = {}
         for y in range(self.dimensions[1]):
             for x in range(self.dimensions[0]):
-                self.create_rectangle(
+                item = self.create_rectangle(
                     x * self.cell_width + self.border_width,
                     y * self.cell_width + self.border_width,
                     (x + 1) * self.cell_width,
                     (y + 1) * self.cell_width,
                     fill="white",
                     width=0.0,
-                    tags="cell x" + str(x) + " y" + str(y) + " blank",
-                    # le tag "blank" sert à vérifier à la fin que toutes les
-                    # cases soient soit dans une zone, soit noires
+                    tags="cell",
                 )
+                self.cell_index[item] = len(self.cell_items)
+                self.cell_items.append(item)
         # Assigner à chaque case l'action toggle_selected_tag
         self.tag_bind("cell", "<ButtonPress-1>", self.toggle_selected_tag)
 
-        # Dessiner les bordures horizontales
+        # Dessiner les bordures horizontales (bordure supérieure de la case
+        # (x,y): self.horizontal_borders[x, y])
+        self.horizontal_borders = {}
         for y in range(self.dimensions[1] + 1):
             for x in range(self.dimensions[0] + 1):
-                self.create_rectangle(
+                self.horizontal_borders[x, y] = self.create_rectangle(
                     x * self.cell_width,
                     y * self.cell_width,
                     (x + 1) * self.cell_width + 2 * self.border_width,
                     y * self.cell_width + self.border_width,
                     fill=self.border_colour,
                     width=0.0,
-                    tags="border horizontal x" + str(x) + " y" + str(y),
+                    tags="border",
                 )
-        # Dessiner les bordures verticales
+        # Dessiner les bordures verticales (bordure gauche de la case (x,y):
+        # self.vertical_borders[x, y])
+        self.vertical_borders = {}
         for y in range(self.dimensions[1] + 1):
             for x in range(self.dimensions[0] + 1):
-                self.create_rectangle(
+                self.vertical_borders[x, y] = self.create_rectangle(
                     x * self.cell_width,
                     y * self.cell_width,
                     x * self.cell_width + self.border_width,
                     (y + 1) * self.cell_width + self.border_width,
                     fill=self.border_colour,
                     width=0.0,
-                    tags="border vertical x" + str(x) + " y" + str(y),
+                    tags="border",
                 )
 
-    def find_selected_neighbours(self, cell, found):
+    def on_change(self, kind, cells):
         """
-        Trouver les voisins sélectionnés de la case donnée en argument,
-        ainsi que les voisins sélectionnés de chacun d'entre eux etc
-        récursivement.
-        Arguments:
-          - cell: case à partir de laquelle on cherche les voisins
-          - found: ensemble des voisins connus. Nécessaire pour ne
-                   pas revenir en arrière lors de la récursion.
-                   Initialement devrait être vide.
-        """
-        # vérifier que cell est bien sélectionnée
-        tags = self.gettags(cell)
-        if "selected" in tags:
-            # l'ajouter à l'ensemble
-            found.add(cell)
-            # trouver ses coordonnées pour trouver tous ses voisins
-            x = int(tags[1][1:])
-            y = int(tags[2][1:])
-            neighbours = self.find_neighbours(x, y)
-            # ne garder que les voisins sélectionnés et tous leurs voisins
-            # sélectionnés
-            for ncell in neighbours:
-                if neighbours[ncell] not in found:
-                    for u in self.find_selected_neighbours(neighbours[ncell], found):
-                        found.add(u)
-        return found
-
-    def toggle_selected_tag(self, event):
+        Redessine les cases modifiées dans l'éditeur (voir
+        lib/grid_editor): leur couleur, et pour un changement de zone ou de
+        couleur, leurs bordures.
         """
-        Ajoute la case sur laquelle l'utilisateur a cliqué à la sélection. Si
-        la case était déjà sélectionnée, on la déselectionne à la place. Si
-        la déselectionner couperait la sélection en deux zones séparées, on
-        désélectionne tout (par sécurité).
-        """
-        # Trouver les coordonnées de la case cliquée
-        tags = self.gettags("current")
-        x = int(tags[1][1:])
-        y = int(tags[2][1:])
-
-        # Si elle était déja sélectionnée, la déselectionner
-        if "selected" in tags:
-            self.dtag("current", "selected")
-            # la recolorer de la bonne facon
-            if "solid" in tags:
-                self.itemconfig("current", fill="#000000")
+        labels = self.model.labels
+        selected = self.editor.selected
+        for c in cells:
+            if selected[c]:
+                fill = self.selection_colour
+            elif labels[c] == BLACK:
+                fill = "#000000"
             else:
-                self.itemconfig("current", fill="#ffffff")
-
-            # Vérifier si la sélection a été coupée en deux zones distinctes
-            
-            # On compare la sélection entière avec l'ensemble des cases
-            # sélectionnées qui sont en contact avec la case de
-            # la sélection. Si les deux ensembles ne sont pas égaux, alors
-            # la sélection a été coupée
-            # sélection entière
-            selection = self.find_withtag("selected")
-            # Si la sélection est vide ca sert à rien
-            if len(selection) > 0:
-                # partie de la sélection en contact avec le 1e élement de la
-                # liste précédente
-                selection_contiguous = self.find_selected_neighbours(selection[0], set())
-                # si les deux ensembles sont différents, tout désélectionner
-                if set(selection) != selection_contiguous:
-                    self.itemconfig("selected", fill="#ffffff")
-                    self.itemconfig("solid", fill="#000000")
-                    self.dtag("selected", "selected")
-
-        # Sinon ajouter la case cliquée à la sélection (si c'est autorisé)
-        else:
-            # vérifier si elle partage une bordure avec la sélection existante
-            # trouver ses voisins, vérifier si l'un d'entre eux est sélectionné
-            neighbours = self.find_neighbours(x, y)
-            has_selected_neighbour = False
-            for cell in neighbours:
-                if "selected" in self.gettags(neighbours[cell]):
-                    has_selected_neighbour = True
-                    break
-
-            # Si non, tout déselectionner et garder que la nouvelle case
-            if not has_selected_neighbour:
-                self.itemconfig("selected", fill="#ffffff")
-                self.itemconfig("solid", fill="#000000")
-                self.dtag("selected", "selected")
+                fill = "#ffffff"
+            self.itemconfig(self.cell_items[c], fill=fill)
+        if kind != LABELS:
+            return
+        # la grille a changé: les indices déjà donnés ne sont plus valables
+        self.reset_hints()
+        width, height = self.dimensions
+        for c in cells:
+            x, y = c % width, c // width
+            for border, nx, ny in (
+                (self.vertical_borders[x, y], x - 1, y),  # bordure gauche
+                (self.horizontal_borders[x, y], x, y - 1),  # bordure supérieure
+                (self.vertical_borders[x + 1, y], x + 1, y),  # bordure droite
+                (self.horizontal_borders[x, y + 1], x, y + 1),  # bordure inférieure
+            ):
+                other = labels[ny * width + nx] if 0 <= nx < width and 0 <= ny < height else NO_ZONE
+                # bordures noires entre une case de zone et une case qui
+                # n'est pas dans sa zone
+                if labels[c] < 0 and other < 0:
+                    colour = self.border_colour
+                elif labels[c] == other:
+                    colour = "#aaaaaa"
+                else:
+                    colour = "#000000"
+                self.itemconfig(border, fill=colour)
 
-            # Sélectionner la case et la colorer en bleu
-            self.addtag_withtag("selected", "current")
-            self.itemconfig("selected", fill=self.selection_colour)
-
-    def find_neighbours(self, x, y):
+    def toggle_selected_tag(self, event):
         """
-        Trouve les cases voisines de la case (x,y)
-        Renvoie un dictionaire des éléments Tk des voisins
-        Format:
-        {
-            "up": id de l'élément du canvas (entier),
-            "down": id de l'élément du canvas (entier),
-            "left": id de l'élément du canvas (entier),
-            "right": id de l'élément du canvas (entier)
-        }
+        Ajoute la case sur laquelle l'utilisateur a cliqué à la sélection. Si
+        la case était déjà sélectionnée, on la déselectionne à la place (voir
+        GridEditor.toggle_cell).
         """
-        # Trouver toutes les cases
-        cells = self.find_withtag("cell")
-        neighbours = {}
-        # Pour chaque case de la grille, si la case a les bonnes coordonnées,
-        # l'ajouter au dict
-        for cell in cells:
-            cell_tags = self.gettags(cell)
-            # Voisin gauche
-            if "x" + str(x - 1) in cell_tags and "y" + str(y) in cell_tags:
-                neighbours["left"] = cell
-            # Voisin supérieur
-            if "x" + str(x) in cell_tags and "y" + str(y - 1) in cell_tags:
-                neighbours["up"] = cell
-            # Voisin droit
-            if "x" + str(x + 1) in cell_tags and "y" + str(y) in cell_tags:
-                neighbours["right"] = cell
-            # Voisin inférieur
-            if "x" + str(x) in cell_tags and "y" + str(y + 1) in cell_tags:
-                neighbours["down"] = cell
-        return neighbours
+        c = self.cell_index[self.find_withtag("current")[0]]
+        width = self.dimensions[0]
+        self.editor.toggle_cell(c % width, c // width)
 
     def make_zone_from_selection(self):
         """
         Créé une zone à partir de la sélection courante.
         """
-        # Commencer par enlever le tag "blank" à toutes les cases sélectionnées
-        self.dtag("selected", "blank")
-
-        # Trouver les cases sélectionnées
-        selection = self.find_withtag("selected")
-        borders = self.find_withtag("border")
-        # Ajouter une zone dans la liste
-        self.zones.append([])
-        for item in selection:
-            # Trouver les coordonnées de la case courante
-            tags = self.gettags(item)
-            x = int(tags[1][1:])
-            y = int(tags[2][1:])
-            if "solid" in tags:
-                self.dtag(item, "solid")
-                self.black_cells.remove([x, y])
-            # Trouver ses voisins
-            neighbours = self.find_neighbours(x, y)
-            # Ne garder que ceux qui sont sélectionnés
-            for cell in list(neighbours):
-                tags = self.gettags(neighbours[cell])
-                if "selected" not in tags:
-                    del neighbours[cell]
-            # Colorier ses bordures
-            for border in borders:
-                border_tags = self.gettags(border)
-                # bordure gauche
-                if (
-                    "x" + str(x) in border_tags
-                    and "y" + str(y) in border_tags
-                    and "vertical" in border_tags
-                ):
-                    if "left" not in neighbours.keys():
-                        self.itemconfig(border, fill="#000000")
-                    else:
-                        self.itemconfig(border, fill="#aaaaaa")
-                # bordure supérieure
-                elif (
-                    "x" + str(x) in border_tags
-                    and "y" + str(y) in border_tags
-                    and "horizontal" in border_tags
-                ):
-                    if "up" not in neighbours.keys():
-                        self.itemconfig(border, fill="#000000")
-                    else:
-                        self.itemconfig(border, fill="#aaaaaa")
-                # bordure droite
-                elif (
-                    "x" + str(x + 1) in border_tags
-                    and "y" + str(y) in border_tags
-                    and "vertical" in border_tags
-                ):
-                    if "right" not in neighbours.keys():
-                        self.itemconfig(border, fill="#000000")
-                    else:
-                        self.itemconfig(border, fill="#aaaaaa")
-                # bordure inférieure
-                elif (
-                    "x" + str(x) in border_tags
-                    and "y" + str(y + 1) in border_tags
-                    and "horizontal" in border_tags
-                ):
-                    if "down" not in neighbours.keys():
-                        self.itemconfig(border, fill="#000000")
-                    else:
-                        self.itemconfig(border, fill="#aaaaaa")
-
-            # Retirer l'item de toute autre zone
-            for zone in self.zones:
-                if [x, y] in zone:
-                    zone.remove([x, y])
-            # L'ajouter à la nouvelle zone
-            self.zones[-1].append([x, y])
-            # Retirer les zones vides
-            for zone in self.zones:
-                if zone == []:
-                    self.zones.remove(zone)
-        # désélectionner les cases
-        self.itemconfig("selected", fill="#ffffff")
-        self.itemconfig("solid", fill="#000000")
-        self.dtag("selected", "selected")
+        self.editor.make_zone_from_selection()
 
     def toggle_selection_solid(self):
         """
         Rend solide toutes les cases sélectionnées
         """
-        # trouver toutes les cases sélectionnées
-        selection = self.find_withtag("selected")
-        for cell in selection:
-            # vérifier si la case est déjà solide
-            tags = self.gettags(cell)
-            if "solid" in tags:
-                # Si oui, la remettre vide
-                self.black_cells.remove([int(tags[1][1:]), int(tags[2][1:])])
-                self.dtag(cell, "solid")
-                self.itemconfig(cell, fill="#ffffff")
-                self.addtag_withtag("blank", cell) # lui remettre le tag "blank"
-            else:
-                # Sinon la rendre solide
-                self.dtag(cell, "blank") # lui retirer le tag "blank"
-                self.black_cells.append([int(tags[1][1:]), int(tags[2][1:])])
-                self.addtag_withtag("solid", cell)
-                self.itemconfig(cell, fill="#000000")
-
-        # Tout déselectionner
-        self.dtag("selected", "selected")
+        self.editor.toggle_selection_black()
 
+    @profiled("Grid.solve")
     def solve(self):
         """
         Résoudre la grille, dessiner la solution et afficher le résultat dans
@@ -338,26 +212,179 @@ class Grid(Canvas):
         # un peu de temps
         self.solvable_textvar.set("Looking for solution...")
         # rendre solides toutes les cases qui ne sont pas dans une zone ou solides
-        self.dtag("selected", "selected")
-        self.addtag_withtag("selected", "blank")
-        self.toggle_selection_solid()
+        self.editor.blacken_unassigned()
+        self.editor.compact()
 
-        # Générer les clauses
-        cnf = gen_cnf(
-            self.dimensions[0], self.dimensions[1], self.zones, self.black_cells
-        )
-        # Convertir les clauses en 3-sat
-        cnf = sat_3sat(cnf, self.dimensions[1], self.dimensions[0])
-        # Trouver une solution
-        solution = sat.solve(cnf)
+        # Grilles manifestement sans solution: inutile de lancer la recherche
+        reason = unsat_reason(validate_grid(self.model))
+        if reason is not None:
+            self.solvable_textvar.set("No solution found!\n" + reason["message"])
+            return
+
+        if self.engine == "bitset":
+            # Solveur dédié: pas de formule à générer
+            solution = bitset_solver.solve(self.model, budget=self.budget)
+        else:
+            # Générer les clauses
+            cnf = gen_cnf(self.model)
+            # Convertir les clauses en 3-sat
+            cnf = sat_3sat(cnf, self.model)
+            # Trouver une solution
+            with stage("satsolver") as st:
+                solution = get_backend(self.backend).solve(cnf, self.budget)
+                st.record_cnf(cnf)
         # Si une solution a été trouvée, l'afficher et mettre à jour le texte
         if not (solution == "UNSAT" or solution == "UNKNOWN"):
+            # la solution est vérifiée sur les règles du jeu avant d'être
+            # dessinée (voir lib/verify)
+            flags = verify_models(self.model, [solution])[0]
+            if flags:
+                self.solvable_textvar.set("Invalid solution!\n" + "\n".join(describe(flags)))
+                return
             self.draw_solution(solution)
             self.solvable_textvar.set("Solution found!")
+            # les autres solutions sont énumérées à la demande (Next/Previous)
+            if self.pager is not None:
+                self.pager.close()
+            self.pager = SolutionPager(self.model, solution)
+            self.page = 0
+            # calculer d'avance la solution suivante
+            self.pager.request(0)
         # Sinon, juste mettre a jour le texte
+        elif solution == "UNKNOWN" and self.budget:
+            self.solvable_textvar.set("No answer within the budget!\n{}".format(self.budget))
         else:
             self.solvable_textvar.set("No solution found!")
 
+    def next_solution(self):
+        """
+        Afficher la solution suivante (après résolution de la grille).
+        """
+        if self.pager is not None:
+            self.show_page(self.page + 1)
+
+    def previous_solution(self):
+        """
+        Afficher la solution précédente (après résolution de la grille).
+        """
+        if self.pager is not None and self.page > 0:
+            self.show_page(self.page - 1)
+
+    def show_page(self, index):
+        """
+        Afficher la solution numéro index (à partir de 0). Si elle n'a pas
+        encore été calculée, l'afficher dès qu'elle est prête, sans bloquer
+        l'interface.
+        """
+        layout = self.pager.request(index)
+        if layout is None:
+            if self.pager.exists(index) is False:
+                self.solvable_textvar.set(
+                    "No more solutions ({} in total)".format(self.pager.total)
+                )
+                return
+            self.solvable_textvar.set("Looking for solution {}...".format(index + 1))
+            self.after(self.page_poll, self.poll_page, self.pager, index)
+            return
+        self.page = index
+        self.draw_layout(layout)
+        if self.pager.total is None:
+            self.solvable_textvar.set("Solution {}".format(index + 1))
+        else:
+            self.solvable_textvar.set("Solution {} of {}".format(index + 1, self.pager.total))
+
+    def poll_page(self, pager, index):
+        """
+        Vérifier si la solution demandée par show_page est prête.
+        """
+        # ignorer les pages d'une résolution précédente, ou remplacées par
+        # une autre demande
+        if pager is self.pager and pager.target == index:
+            self.show_page(index)
+
+    def destroy(self):
+        """
+        Arrêter l'énumération des solutions avec le canvas.
+        """
+        if self.pager is not None:
+            self.pager.close()
+        super().destroy()
+
+    def reset_hints(self):
+        """
+        Oublier les indices déjà donnés (la grille a été modifiée).
+        """
+        self.hint_engine = None
+        self.delete("hint")
+
+    def hint(self):
+        """
+        Révéler la prochaine case forcée par les règles de la grille (voir
+        lib/hints) et afficher la règle qui la force. Les déductions sont
+        conservées d'un indice à l'autre. Si la recherche dépasse
+        hint_budget, elle reprend plus tard pour ne pas bloquer l'interface.
+        """
+        if self.hint_pending:
+            # une recherche est déjà en cours
+            return
+        if self.hint_engine is None:
+            self.editor.compact()
+            self.hint_engine = HintEngine(self.model)
+        try:
+            done = self.hint_engine.search(self.hint_budget)
+        except Contradiction:
+            self.solvable_textvar.set("No solution: the rules lead to a contradiction")
+            return
+        if not done:
+            self.solvable_textvar.set("Looking for a hint...")
+            self.hint_pending = True
+            self.after(1, self.resume_hint)
+            return
+        hint = self.hint_engine.next_hint()
+        if hint is None:
+            self.solvable_textvar.set("No more hints")
+            return
+        x, y = hint["x"], hint["y"]
+        if hint["value"] == "-":
+            # case vide: une croix
+            for dx in (0, 1):
+                self.create_line(
+                    self.cell_width * (x + dx) + 15 - 30 * dx,
+                    self.cell_width * y + 15,
+                    self.cell_width * (x + 1 - dx) - 15 + 30 * dx,
+                    self.cell_width * (y + 1) - 15,
+                    fill=self.hint_colour,
+                    width=2.0,
+                    tags="hint",
+                )
+        else:
+            # ballon (blanc) ou pierre (noire), entouré de la couleur des
+            # indices
+            self.create_oval(
+                self.cell_width * x + 5,
+                self.cell_width * y + 5,
+                self.cell_width * (x + 1) - 5,
+                self.cell_width * (y + 1) - 5,
+                fill="white" if hint["value"] == "B" else "black",
+                outline=self.hint_colour,
+                width=3.0,
+                tags="hint",
+            )
+        self.solvable_textvar.set(
+            "({}, {}): {}".format(
+                x, y, {"B": "balloon", "S": "stone", "-": "empty"}[hint["value"]]
+            )
+            + "\n"
+            + hint["rule"]
+        )
+
+    def resume_hint(self):
+        """
+        Reprendre la recherche d'indice interrompue.
+        """
+        self.hint_pending = False
+        self.hint()
+
     def get_grid(self):
         """
         Renvoyer le dictionnaire définissant les propriétés de la grille.
@@ -373,13 +400,8 @@ class Grid(Canvas):
             "blacks": [[x1, y1], [x2, y2], ...] les coordonnées des cellules noires
         }
         """
-        grid = {
-            "width": self.dimensions[0],
-            "height": self.dimensions[1],
-            "zones": self.zones,
-            "blacks": self.black_cells,
-        }
-        return grid
+        self.editor.compact()
+        return self.model.to_json()
 
     def draw_solution(self, solution):
         """
@@ -388,6 +410,8 @@ class Grid(Canvas):
         Format attendu de la solution: liste d'entiers telle que renvoyée par
         pycosat.
         """
+        # effacer la solution précédente
+        self.delete("solution")
         # Parcourir la clause en ignorant les variables en dehors de la grille
         # servant uniquement pour résoudre le problème
         x = 0  # colonne courante
@@ -408,6 +432,7 @@ class Grid(Canvas):
                     self.cell_width * (y + 1) - 5,
                     fill="white",
                     width=2.0,
+                    tags="solution",
                 )
             elif solution[i + 1] > 0:
                 # Dessiner une pierre
@@ -418,6 +443,7 @@ class Grid(Canvas):
                     self.cell_width * (y + 1) - 5,
                     fill="black",
                     width=2.0,
+                    tags="solution",
                 )
 
             i += 3 # passer au groupe de variables suivante
@@ -429,36 +455,28 @@ class Grid(Canvas):
                 x = 0
                 y += 1
 
-    def load_grid(self, zones, blacks):
+    def draw_layout(self, layout):
         """
-        Charger les zones et les cases noires fournies en argument
+        Dessiner une solution donnée par sa disposition (voir
+        gen_formule.decode_solution), comme draw_solution.
         """
-        # récupérer la liste des cases de la grille
-        cells = self.find_withtag("cell")
+        self.delete("solution")
+        for y, row in enumerate(layout):
+            for x, symbol in enumerate(row):
+                if symbol in "BS":
+                    self.create_oval(
+                        self.cell_width * x + 5,
+                        self.cell_width * y + 5,
+                        self.cell_width * (x + 1) - 5,
+                        self.cell_width * (y + 1) - 5,
+                        fill="white" if symbol == "B" else "black",
+                        width=2.0,
+                        tags="solution",
+                    )
 
-        # dessiner les cases noires: les sélectionner toutes, les rendre noires
-        # et les désélectionner
-        for cell in blacks:
-            for id in cells:
-                tags = self.gettags(id)
-                if ("x{}".format(cell[0]) in tags) and ("y{}".format(cell[1]) in tags):
-                    self.addtag_withtag("selected", id)
-        self.toggle_selection_solid()
-        self.dtag("selected", "selected")
-
-        # dessiner les zones: sélectionner chaque zone puis appeller la
-        # fonction make_zone_from_selection()
-        for zone in list(zones):
-            # list() est nécessaire parce que la zones se fait modifier en
-            # cours de route: en appelant list() dessus on force une copie de
-            # la liste qui ne se fait donc pas modifier
-            for cell in zone:
-                for id in cells:
-                    tags = self.gettags(id)
-                    if ("x{}".format(cell[0]) in tags) and (
-                        "y{}".format(cell[1]) in tags
-                    ):
-                        self.addtag_withtag("selected", id)
-            self.make_zone_from_selection()
-            # la fonction désélectionne toute seule la zone à la fin: pas
-            # besoin de le faire ici
+    def load_grid(self, zones, blacks=None):
+        """
+        Charger les zones et les cases noires fournies en argument (ou le
+        GridModel fourni à la place de zones)
+        """
+        self.editor.load_grid(zones, blacks)
@@ -0,0 +1,225 @@
+"""
+Edition d'une grille, sans interface graphique.
+
+GridEditor contient tout l'état modifiable par l'éditeur: la grille
+(GridModel: zone ou couleur de chaque case) et la sélection courante. Les
+opérations de l'éditeur (cliquer sur une case, rendre noires les cases
+sélectionnées, faire une zone de la sélection...) se font sur des tableaux
+indexés par case, en temps constant par case concernée, et peuvent être
+utilisées et testées sans affichage.
+
+Une zone vidée par une modification reste un trou dans la numérotation (son
+numéro est réutilisé par la prochaine zone créée): renuméroter toutes les
+cases à chaque modification coûterait un parcours de la grille. Les trous
+sont supprimés par compact, à appeler avant d'utiliser la grille
+(résolution, indices, enregistrement...).
+
+Chaque modification est signalée aux abonnés (voir subscribe), par exemple
+lib/grid.Grid qui ne fait que redessiner les cases concernées:
+    listener(kind, cells)
+avec kind valant LABELS (zone ou couleur des cases modifiée) ou SELECTION
+(cases sélectionnées ou désélectionnées), et cells la liste des indices
+(y * width + x) des cases concernées.
+"""
+from array import array
+
+from lib.grid_model import GridModel, BLACK, NO_ZONE
+
+LABELS = "labels"
+SELECTION = "selection"
+
+
+class GridEditor:
+    """
+    Etat de l'éditeur de grille.
+    Arguments:
+      - model: GridModel à éditer (modifié sur place)
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.selected = bytearray(model.width * model.height)
+        self.selection = set()  # indices des cases sélectionnées
+        self.listeners = []
+        # nombre de cases de chaque zone, et numéros des zones vides
+        self.sizes = array("i", [0]) * model.nb_zones
+        for label in model.labels:
+            if label >= 0:
+                self.sizes[label] += 1
+        self.free = [z for z in range(model.nb_zones) if not self.sizes[z]]
+
+    def subscribe(self, listener):
+        """
+        Abonne listener(kind, cells) aux modifications.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, kind, cells):
+        if cells:
+            for listener in self.listeners:
+                listener(kind, cells)
+
+    def neighbours(self, c):
+        """
+        Renvoie les indices des cases voisines (haut, bas, gauche, droite) de
+        la case d'indice c.
+        """
+        width = self.model.width
+        x, y = c % width, c // width
+        found = []
+        if x > 0:
+            found.append(c - 1)
+        if y > 0:
+            found.append(c - width)
+        if x < width - 1:
+            found.append(c + 1)
+        if y < self.model.height - 1:
+            found.append(c + width)
+        return found
+
+    def _relabel(self, c, label):
+        # change la zone (ou la couleur) de la case c en tenant à jour la
+        # taille des zones
+        old = self.model.labels[c]
+        if old >= 0:
+            self.sizes[old] -= 1
+            if not self.sizes[old]:
+                self.free.append(old)
+        self.model.labels[c] = label
+        if label >= 0:
+            self.sizes[label] += 1
+
+    def _new_zone(self):
+        # numéro d'une zone vide, réutilisé si possible
+        if self.free:
+            return self.free.pop()
+        self.sizes.append(0)
+        return self.model.new_zone()
+
+    def compact(self):
+        """
+        Supprime les zones vides en renumérotant les autres (dans le même
+        ordre). Ne parcourt la grille que s'il y a des zones vides. Les
+        cases d'une même zone le restent: rien n'est à redessiner.
+        """
+        if not self.free:
+            return
+        self.model.compact()
+        self.sizes = array("i", [size for size in self.sizes if size])
+        self.free = []
+
+    def _set_selected(self, cells, value):
+        for c in cells:
+            self.selected[c] = value
+            if value:
+                self.selection.add(c)
+            else:
+                self.selection.discard(c)
+
+    def clear_selection(self):
+        """
+        Désélectionne toutes les cases.
+        """
+        cells = list(self.selection)
+        self._set_selected(cells, 0)
+        self._notify(SELECTION, cells)
+
+    def is_selection_connected(self):
+        """
+        Renvoie True si la sélection est d'un seul tenant (ou vide).
+        """
+        if not self.selection:
+            return True
+        start = next(iter(self.selection))
+        seen = {start}
+        stack = [start]
+        while stack:
+            for n in self.neighbours(stack.pop()):
+                if self.selected[n] and n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        return len(seen) == len(self.selection)
+
+    def toggle_cell(self, x, y):
+        """
+        Clic sur la case (x,y): l'ajoute à la sélection, ou l'en retire si
+        elle y était déjà.
+          - une case qui ne touche pas la sélection la remplace
+          - si retirer la case coupe la sélection en plusieurs morceaux, tout
+            est désélectionné (par sécurité)
+        """
+        c = y * self.model.width + x
+        neighbours = [n for n in self.neighbours(c) if self.selected[n]]
+        if self.selected[c]:
+            self._set_selected((c,), 0)
+            changed = [c]
+            # une case qui a au plus une voisine sélectionnée ne peut pas
+            # couper la sélection: le parcours n'est fait que sinon
+            if len(neighbours) > 1 and not self.is_selection_connected():
+                changed += list(self.selection)
+                self._set_selected(list(self.selection), 0)
+            self._notify(SELECTION, changed)
+            return
+        changed = [c]
+        if not neighbours:
+            changed += list(self.selection)
+            self._set_selected(list(self.selection), 0)
+        self._set_selected((c,), 1)
+        self._notify(SELECTION, changed)
+
+    def toggle_selection_black(self):
+        """
+        Rend noires les cases sélectionnées (ou rend vides, hors de toute
+        zone, celles qui étaient déjà noires), puis désélectionne tout.
+        """
+        cells = list(self.selection)
+        labels = self.model.labels
+        for c in cells:
+            self._relabel(c, NO_ZONE if labels[c] == BLACK else BLACK)
+        self._set_selected(cells, 0)
+        self._notify(LABELS, cells)
+
+    def make_zone_from_selection(self):
+        """
+        Crée une zone avec les cases sélectionnées (qui sont retirées de
+        leur ancienne zone, voir compact pour les zones devenues vides),
+        puis désélectionne tout.
+        """
+        cells = list(self.selection)
+        if cells:
+            zone = self._new_zone()
+            for c in cells:
+                self._relabel(c, zone)
+            self._set_selected(cells, 0)
+        self._notify(LABELS, cells)
+
+    def blacken_unassigned(self):
+        """
+        Rend noires les cases qui ne sont ni noires ni dans une zone (avant
+        la résolution), et désélectionne tout.
+        """
+        self.clear_selection()
+        labels = self.model.labels
+        cells = [c for c in range(len(labels)) if labels[c] == NO_ZONE]
+        for c in cells:
+            labels[c] = BLACK
+        self._notify(LABELS, cells)
+
+    def load_grid(self, zones, blacks=None):
+        """
+        Charge les zones et les cases noires fournies (ou le GridModel
+        fourni à la place de zones). Une case présente dans plusieurs zones
+        reste dans la dernière.
+        """
+        if isinstance(zones, GridModel):
+            zones, blacks = zones.zones(), zones.blacks()
+        width = self.model.width
+        labels = self.model.labels
+        for x, y in blacks:
+            self._relabel(y * width + x, BLACK)
+        for zone in zones:
+            z = self._new_zone()
+            for x, y in zone:
+                self._relabel(y * width + x, z)
+        self.clear_selection()
+        self._notify(LABELS, list(range(len(labels))))
@@ -0,0 +1,185 @@
+"""
+Représentation dense d'une grille: un tableau de width*height entiers
+donnant, ligne par ligne, le numéro de la zone de chaque case (BLACK pour
+une case noire, NO_ZONE pour une case qui n'est dans aucune zone).
+
+L'appartenance d'une case à une zone ou sa couleur se lit en temps constant,
+et toute la grille tient dans un seul tableau. Une case noire n'appartient à
+aucune zone: les cases noires présentes dans les zones d'une grille au
+format JSON en sont retirées (elles ne peuvent de toute façon contenir ni
+ballon ni pierre). Le nombre de zones est conservé, même si certaines
+deviennent vides.
+
+Les fonctions de la bibliothèque qui prennent les arguments
+(width, height, zones, blacks) acceptent aussi un GridModel à la place de
+width (voir unpack_grid):
+    gen_cnf(GridModel.from_json(read_grid("grille.json")))
+"""
+from array import array
+
+BLACK = -1
+NO_ZONE = -2
+
+
+class GridModel:
+    """
+    Grille de Dosun Fuwari sous forme de matrice de numéros de zones.
+    Arguments:
+      - width, height: dimensions de la grille
+      - labels (optionnel): numéros de zones des cases, ligne par ligne
+                            (toutes les cases hors zone par défaut)
+      - nb_zones (optionnel): nombre de zones (par défaut, plus grand numéro
+                              de zone + 1)
+    """
+
+    __slots__ = ("width", "height", "labels", "nb_zones")
+
+    def __init__(self, width, height, labels=None, nb_zones=None):
+        self.width = width
+        self.height = height
+        if labels is None:
+            self.labels = array("i", [NO_ZONE]) * (width * height)
+        else:
+            self.labels = array("i", labels)
+            if len(self.labels) != width * height:
+                raise ValueError(
+                    "Expected {} labels, got {}".format(width * height, len(self.labels))
+                )
+        if nb_zones is None:
+            nb_zones = max(self.labels, default=-1) + 1
+        self.nb_zones = max(nb_zones, 0)
+
+    @classmethod
+    def from_lists(cls, width, height, zones, blacks):
+        """
+        Construit le modèle à partir des listes de zones et de cases noires
+        (format de gen_cnf). Lève ValueError si des zones se chevauchent ou
+        si une case est en dehors de la grille.
+        """
+        model = cls(width, height, nb_zones=len(zones))
+        labels = model.labels
+
+        def index(x, y):
+            if not (0 <= x < width and 0 <= y < height):
+                raise ValueError(
+                    "Cell ({}, {}) is outside the {}x{} grid".format(x, y, width, height)
+                )
+            return y * width + x
+
+        for z, zone in enumerate(zones):
+            for x, y in zone:
+                c = index(x, y)
+                if labels[c] != NO_ZONE and labels[c] != z:
+                    raise ValueError("Cell ({}, {}) belongs to several zones".format(x, y))
+                labels[c] = z
+        for x, y in blacks:
+            labels[index(x, y)] = BLACK
+        return model
+
+    @classmethod
+    def from_json(cls, grid):
+        """
+        Construit le modèle à partir d'un dictionnaire au format de
+        file_io.read_grid, ou au format dense renvoyé par to_json(dense=True).
+        """
+        if "labels" in grid:
+            return cls(
+                grid["width"], grid["height"], grid["labels"], grid.get("nb_zones")
+            )
+        return cls.from_lists(grid["width"], grid["height"], grid["zones"], grid["blacks"])
+
+    def to_json(self, dense=False):
+        """
+        Renvoie la grille sous forme de dictionnaire au format de
+        file_io.save_grid, ou au format dense si dense vaut True:
+        {"width": ..., "height": ..., "nb_zones": ..., "labels": [...]}
+        """
+        if dense:
+            return {
+                "width": self.width,
+                "height": self.height,
+                "nb_zones": self.nb_zones,
+                "labels": self.labels.tolist(),
+            }
+        return {
+            "width": self.width,
+            "height": self.height,
+            "zones": self.zones(),
+            "blacks": self.blacks(),
+        }
+
+    def copy(self):
+        return GridModel(self.width, self.height, self.labels, self.nb_zones)
+
+    def __getitem__(self, cell):
+        x, y = cell
+        return self.labels[y * self.width + x]
+
+    def __setitem__(self, cell, label):
+        x, y = cell
+        self.labels[y * self.width + x] = label
+        if label >= self.nb_zones:
+            self.nb_zones = label + 1
+
+    def is_black(self, x, y):
+        return self.labels[y * self.width + x] == BLACK
+
+    def new_zone(self):
+        """
+        Réserve un nouveau numéro de zone (vide) et le renvoie.
+        """
+        self.nb_zones += 1
+        return self.nb_zones - 1
+
+    def compact(self):
+        """
+        Supprime les zones vides en renumérotant les autres (dans le même
+        ordre).
+        """
+        used = [False] * self.nb_zones
+        for label in self.labels:
+            if label >= 0:
+                used[label] = True
+        renumber = []
+        count = 0
+        for z in range(self.nb_zones):
+            renumber.append(count)
+            count += used[z]
+        if count == self.nb_zones:
+            return
+        labels = self.labels
+        for c in range(len(labels)):
+            if labels[c] >= 0:
+                labels[c] = renumber[labels[c]]
+        self.nb_zones = count
+
+    def zones(self):
+        """
+        Renvoie la liste des zones (format de gen_cnf), les cases de chaque
+        zone étant données ligne par ligne.
+        """
+        zones = [[] for _ in range(self.nb_zones)]
+        width = self.width
+        for c, label in enumerate(self.labels):
+            if label >= 0:
+                zones[label].append([c % width, c // width])
+        return zones
+
+    def blacks(self):
+        """
+        Renvoie la liste des cases noires (format de gen_cnf).
+        """
+        width = self.width
+        return [
+            [c % width, c // width] for c, label in enumerate(self.labels) if label == BLACK
+        ]
+
+
+def unpack_grid(width, height=None, zones=None, blacks=None):
+    """
+    Renvoie (width, height, zones, blacks): les arguments tels quels, ou ceux
+    du GridModel fourni à la place de width.
+    """
+    if isinstance(width, GridModel):
+        return width.width, width.height, width.zones(), width.blacks()
+    return width, height, zones, blacks
@@ -0,0 +1,327 @@
+"""
+Moteur d'indices: trouve la prochaine case dont le contenu est forcé par les
+règles, avec la règle qui la force.
+
+Chaque case blanche a un domaine: l'ensemble des contenus encore possibles
+parmi ballon, pierre et vide. Les règles de la grille retirent des valeurs
+aux domaines, de proche en proche (propagation):
+  - une seule case par zone contient le ballon (resp. la pierre);
+  - si une seule case d'une zone peut encore contenir le ballon (resp. la
+    pierre), c'est elle qui le contient;
+  - un ballon est sous une case noire, sous le bord ou sous un autre ballon:
+    si la case au-dessus ne peut pas être un ballon, la case non plus, et
+    si la case est un ballon, celle au-dessus aussi (idem vers le bas pour
+    les pierres);
+  - un ballon ne peut pas être sous une case de sa propre zone dans le même
+    segment de colonne (il faudrait deux ballons dans la zone).
+Quand ces règles ne donnent plus rien, le moteur essaie chaque valeur
+possible des cases restantes et élimine celles qui mènent à une
+contradiction (jusqu'à une profondeur d'essais bornée).
+
+L'état est conservé entre deux indices: chaque appel à next_hint ne coûte
+que les nouvelles déductions.
+"""
+import time
+
+from lib.grid_model import unpack_grid
+
+BALLOON = 1
+STONE = 2
+EMPTY = 4
+ANY = BALLOON | STONE | EMPTY
+
+SYMBOLS = {BALLOON: "B", STONE: "S", EMPTY: "-"}
+
+# règles, telles qu'affichées avec les indices
+RULE_BALLOON_TAKEN = "the zone already has its balloon"
+RULE_STONE_TAKEN = "the zone already has its stone"
+RULE_BALLOON_LAST = "only cell of its zone that can hold the balloon"
+RULE_STONE_LAST = "only cell of its zone that can hold the stone"
+RULE_BALLOON_CHAIN = "the balloon below must hang under another balloon"
+RULE_STONE_CHAIN = "the stone above must rest on another stone"
+RULE_BALLOON_SUPPORT = "a balloon here would have nothing to hang from"
+RULE_STONE_SUPPORT = "a stone here would have nothing to rest on"
+RULE_BALLOON_ZONE = "a balloon here would need the cell of the same zone above it to hold a balloon too"
+RULE_STONE_ZONE = "a stone here would need the cell of the same zone below it to hold a stone too"
+RULE_PROBE = {
+    BALLOON: "placing a balloon here leads to a contradiction",
+    STONE: "placing a stone here leads to a contradiction",
+    EMPTY: "leaving this cell empty leads to a contradiction",
+}
+
+
+class Contradiction(Exception):
+    pass
+
+
+class HintEngine:
+    """
+    Propagation incrémentale des règles sur une grille.
+    Arguments:
+      - width, height, zones, blacks: grille, comme pour gen_cnf. Les cases
+        qui ne sont dans aucune zone sont considérées noires (comme le fait
+        Grid.solve). Un GridModel peut être fourni à la place de width.
+      - depth (optionnel): profondeur maximale des essais quand les règles
+        directes ne donnent plus rien (0 pour n'utiliser que les règles)
+    """
+
+    def __init__(self, width, height=None, zones=None, blacks=None, depth=1):
+        width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+        self.width = width
+        self.height = height
+        self.depth = depth
+        size = width * height
+        self.zone_of = [-1] * size
+        self.zones = []
+        for z, zone in enumerate(zones):
+            cells = []
+            for x, y in zone:
+                c = y * width + x
+                if self.zone_of[c] == -1:
+                    self.zone_of[c] = z
+                    cells.append(c)
+            self.zones.append(cells)
+        for x, y in blacks:
+            c = y * width + x
+            if self.zone_of[c] != -1:
+                self.zones[self.zone_of[c]].remove(c)
+            self.zone_of[c] = -1
+
+        # voisins dans le segment de colonne (-1 au bord ou sous/sur une
+        # case noire)
+        self.above = [-1] * size
+        self.below = [-1] * size
+        for c in range(size):
+            if self.zone_of[c] == -1:
+                continue
+            if c >= width and self.zone_of[c - width] != -1:
+                self.above[c] = c - width
+            if c + width < size and self.zone_of[c + width] != -1:
+                self.below[c] = c + width
+
+        self.domains = bytearray(ANY if z != -1 else 0 for z in self.zone_of)
+        # nombre de cases de chaque zone pouvant encore contenir le ballon
+        # (indice 2*z) et la pierre (indice 2*z+1)
+        self.counts = []
+        for cells in self.zones:
+            self.counts += [len(cells), len(cells)]
+        self.revealed = bytearray(size)
+        self.hints = []  # indices forcés trouvés mais pas encore donnés
+        self.queue = []
+        self.failed = False
+        # position des essais (case, valeur) et position du premier essai
+        # fait depuis la dernière déduction
+        self.probe_cursor = self.probe_start = (0, 0)
+        self.exhausted = False
+
+        # règle statique: ballon sous une case de sa zone, pierre sur une
+        # case de sa zone
+        try:
+            for cells in self.zones:
+                if not cells:
+                    raise Contradiction()
+                for c in cells:
+                    a = self.above[c]
+                    while a != -1:
+                        if self.zone_of[a] == self.zone_of[c]:
+                            self._restrict(self.domains, self.counts, self.queue,
+                                           self.hints, c, ~BALLOON, RULE_BALLOON_ZONE)
+                            self._restrict(self.domains, self.counts, self.queue,
+                                           self.hints, a, ~STONE, RULE_STONE_ZONE)
+                            break
+                        a = self.above[a]
+            self.queue.extend(range(size))
+        except Contradiction:
+            self.failed = True
+
+    def _xy(self, c):
+        return c % self.width, c // self.width
+
+    def _restrict(self, domains, counts, queue, hints, c, mask, rule):
+        """
+        Restreint le domaine de la case c aux valeurs de mask.
+        """
+        old = domains[c]
+        new = old & mask
+        if new == old:
+            return
+        if new == 0:
+            raise Contradiction()
+        domains[c] = new
+        removed = old & ~new
+        z = 2 * self.zone_of[c]
+        if removed & BALLOON:
+            counts[z] -= 1
+            if not counts[z]:
+                raise Contradiction()
+        if removed & STONE:
+            counts[z + 1] -= 1
+            if not counts[z + 1]:
+                raise Contradiction()
+        queue.append(c)
+        if hints is not None and new in SYMBOLS:
+            hints.append((c, new, rule))
+
+    def _propagate(self, domains, counts, queue, hints, stop_on_hint=False):
+        """
+        Applique les règles aux cases de la file jusqu'au point fixe (ou
+        jusqu'au premier indice si stop_on_hint). Lève Contradiction si un
+        domaine devient vide.
+        """
+        restrict = self._restrict
+        above_of = self.above
+        below_of = self.below
+        while queue:
+            if stop_on_hint and hints:
+                return
+            c = queue.pop()
+            value = domains[c]
+            above = above_of[c]
+            below = below_of[c]
+            if value == BALLOON:
+                if above != -1:
+                    restrict(domains, counts, queue, hints, above, BALLOON, RULE_BALLOON_CHAIN)
+            elif not value & BALLOON and below != -1:
+                restrict(domains, counts, queue, hints, below, ~BALLOON, RULE_BALLOON_SUPPORT)
+            if value == STONE:
+                if below != -1:
+                    restrict(domains, counts, queue, hints, below, STONE, RULE_STONE_CHAIN)
+            elif not value & STONE and above != -1:
+                restrict(domains, counts, queue, hints, above, ~STONE, RULE_STONE_SUPPORT)
+
+            # cases noires ou hors zone: pas de règle de zone
+            z = self.zone_of[c]
+            if z == -1:
+                continue
+            for kind, index, taken, last in (
+                (BALLOON, 2 * z, RULE_BALLOON_TAKEN, RULE_BALLOON_LAST),
+                (STONE, 2 * z + 1, RULE_STONE_TAKEN, RULE_STONE_LAST),
+            ):
+                if value == kind:
+                    for d in self.zones[z]:
+                        if d != c:
+                            restrict(domains, counts, queue, hints, d, ~kind, taken)
+                elif counts[index] == 1 and not value & kind:
+                    for d in self.zones[z]:
+                        if domains[d] & kind:
+                            restrict(domains, counts, queue, hints, d, kind, last)
+                            break
+
+    def _probe(self, deadline):
+        """
+        Reprend les essais là où ils s'étaient arrêtés: essaie les valeurs
+        possibles des cases non résolues, une par une, jusqu'à en trouver une
+        qui mène à une contradiction (elle est alors éliminée). Renvoie True
+        si une valeur a été éliminée ou si tous les essais ont été faits
+        depuis la dernière déduction, False si l'échéance est dépassée.
+        """
+        domains = self.domains
+        size = len(domains)
+        while True:
+            c, k = self.probe_cursor
+            kind = (BALLOON, STONE, EMPTY)[k]
+            value = domains[c]
+            self.probe_cursor = (c, k + 1) if k < 2 else ((c + 1) % size, 0)
+            if value & kind and value not in SYMBOLS:
+                if self._leads_to_contradiction(
+                    bytearray(domains), list(self.counts), c, kind, self.depth
+                ):
+                    self._restrict(domains, self.counts, self.queue, self.hints,
+                                   c, ~kind, RULE_PROBE[kind])
+                    # l'état a changé: tous les essais sont à refaire
+                    self.probe_start = self.probe_cursor
+                    return True
+            if self.probe_cursor == self.probe_start:
+                self.exhausted = True
+                return True
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+
+    def _leads_to_contradiction(self, domains, counts, c, kind, depth):
+        queue = []
+        try:
+            self._restrict(domains, counts, queue, None, c, kind, None)
+            self._propagate(domains, counts, queue, None)
+        except Contradiction:
+            return True
+        if depth <= 1:
+            return False
+        # essais imbriqués: toutes les valeurs d'une autre case mènent à une
+        # contradiction
+        for d in range(len(domains)):
+            value = domains[d]
+            if value in SYMBOLS or value == 0:
+                continue
+            if all(
+                self._leads_to_contradiction(
+                    bytearray(domains), list(counts), d, k, depth - 1
+                )
+                for k in (BALLOON, STONE, EMPTY)
+                if value & k
+            ):
+                return True
+        return False
+
+    def search(self, budget=None):
+        """
+        Cherche le prochain indice pendant au plus budget secondes (sans
+        limite si budget vaut None). Renvoie True si la recherche est
+        terminée (next_hint répond alors immédiatement), False si le budget
+        est épuisé: un nouvel appel reprend là où celui-ci s'est arrêté.
+        Lève Contradiction si la grille n'a pas de solution.
+        """
+        if self.failed:
+            raise Contradiction()
+        deadline = None if budget is None else time.perf_counter() + budget
+        try:
+            while True:
+                while self.hints:
+                    c, value, _ = self.hints[0]
+                    if not self.revealed[c] and self.domains[c] == value:
+                        return True
+                    self.hints.pop(0)
+                if self.queue:
+                    self._propagate(
+                        self.domains, self.counts, self.queue, self.hints,
+                        stop_on_hint=True,
+                    )
+                    continue
+                # les règles ne donnent plus rien: essais
+                if self.exhausted or self.depth <= 0:
+                    return True
+                if not self._probe(deadline):
+                    return False
+        except Contradiction:
+            self.failed = True
+            raise
+
+    def next_hint(self):
+        """
+        Renvoie la prochaine case forcée, sous la forme d'un dictionnaire
+        {"x": colonne, "y": ligne, "value": 'B', 'S' ou '-', "rule": règle
+        qui la force}, ou None s'il n'y en a plus (grille résolue, ou plus
+        rien de déductible à la profondeur d'essais choisie). Lève
+        Contradiction si la grille n'a pas de solution.
+        """
+        self.search()
+        if not self.hints:
+            return None
+        c, value, rule = self.hints.pop(0)
+        self.revealed[c] = 1
+        x, y = self._xy(c)
+        return {"x": x, "y": y, "value": SYMBOLS[value], "rule": rule}
+
+    def layout(self):
+        """
+        Renvoie l'état courant des déductions: liste de height chaînes de
+        width caractères ('B', 'S', '-', 'N' pour les cases noires ou hors
+        zone, '?' pour les cases encore indéterminées).
+        """
+        rows = []
+        for y in range(self.height):
+            row = []
+            for x in range(self.width):
+                value = self.domains[y * self.width + x]
+                row.append("N" if value == 0 else SYMBOLS.get(value, "?"))
+            rows.append("".join(row))
+        return rows
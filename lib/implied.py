@@ -0,0 +1,131 @@
+"""
+Clauses impliquées (redondantes) pour renforcer les encodages de la grille.
+
+Ces clauses sont des conséquences des règles de gen_cnf: elles ne changent
+pas les solutions, mais donnent directement au satsolver des déductions
+qu'il ne trouverait qu'après plusieurs propagations ou conflits, ce qui
+aide sur les grandes grilles aux grandes zones et aux rares cases noires.
+Chaque famille se choisit séparément (argument implied de gen_cnf et
+gen_cnf_segments, option --implied=famille,famille... des scripts):
+  - "support": un ballon impose des ballons dans toutes les cases au-dessus
+    de lui jusqu'au haut de son segment de colonne, une pierre des pierres
+    dans toutes les cases en dessous jusqu'au bas du segment
+        isBalloon(c_k) => isBalloon(c_j) pour j < k
+  - "cardinality": dans un segment, les ballons au-dessus d'un ballon sont
+    dans des zones distinctes (une zone n'a qu'un ballon): une case dont le
+    préfixe du segment contient deux cases d'une même zone ne peut pas
+    être un ballon (de même pour les pierres et les suffixes). Chaque zone a
+    alors son ballon (et sa pierre) parmi les cases restantes.
+  - "exclusion": dans un segment, les pierres sont sous les ballons: un
+    ballon et une pierre placée au-dessus de lui ne peuvent pas coexister
+        not isBalloon(c_k) or not isStone(c_j) pour j < k
+Les familles "support" et "exclusion" ajoutent un nombre de clauses
+quadratique en la longueur des segments: seules les cases distantes d'au
+plus QUADRATIC_SPAN cases sont reliées.
+"""
+from lib.gen_formule import BALLOON, STONE, cell_var
+from lib.grid_model import GridModel, BLACK
+
+# distance maximale entre deux cases reliées par les familles quadratiques
+QUADRATIC_SPAN = 32
+
+
+def _segments(model):
+    # segments de colonnes: listes de (x, y, zone) de haut en bas
+    width, height, labels = model.width, model.height, model.labels
+    segments = []
+    for x in range(width):
+        segment = []
+        for y in range(height):
+            label = labels[y * width + x]
+            if label == BLACK:
+                if segment:
+                    segments.append(segment)
+                segment = []
+            else:
+                segment.append((x, y, label))
+        if segment:
+            segments.append(segment)
+    return segments
+
+
+def support_clauses(model):
+    """
+    Supports transitifs des ballons et des pierres dans chaque segment.
+    """
+    width = model.width
+    for segment in _segments(model):
+        for k, (x, y, _) in enumerate(segment):
+            balloon = cell_var(x, y, width, BALLOON)
+            stone = cell_var(x, y, width, STONE)
+            for j in range(max(0, k - QUADRATIC_SPAN), k):
+                yield [-balloon, cell_var(segment[j][0], segment[j][1], width, BALLOON)]
+            for j in range(k + 1, min(len(segment), k + 1 + QUADRATIC_SPAN)):
+                yield [-stone, cell_var(segment[j][0], segment[j][1], width, STONE)]
+
+
+def cardinality_clauses(model):
+    """
+    Cases qui ne peuvent pas contenir le ballon (ou la pierre) de leur zone,
+    et ballon (et pierre) de chaque zone parmi les cases restantes.
+    """
+    width = model.width
+    balloons = [[] for _ in range(model.nb_zones)]
+    stones = [[] for _ in range(model.nb_zones)]
+    for segment in _segments(model):
+        for mode, cells, candidates in (
+            (BALLOON, segment, balloons),
+            (STONE, segment[::-1], stones),
+        ):
+            seen = set()
+            repeated = False
+            for x, y, zone in cells:
+                if zone >= 0:
+                    repeated = repeated or zone in seen
+                    seen.add(zone)
+                if repeated:
+                    yield [-cell_var(x, y, width, mode)]
+                elif zone >= 0:
+                    candidates[zone].append(cell_var(x, y, width, mode))
+    for candidates in balloons + stones:
+        # zone sans case possible: les clauses unitaires suffisent à rendre
+        # la formule insatisfaisable
+        if candidates:
+            yield candidates
+
+
+def exclusion_clauses(model):
+    """
+    Un ballon et une pierre placée au-dessus de lui dans le même segment
+    sont incompatibles.
+    """
+    width = model.width
+    for segment in _segments(model):
+        for k, (x, y, _) in enumerate(segment):
+            balloon = cell_var(x, y, width, BALLOON)
+            for j in range(max(0, k - QUADRATIC_SPAN), k):
+                yield [-balloon, -cell_var(segment[j][0], segment[j][1], width, STONE)]
+
+
+# Familles de clauses impliquées, par nom
+IMPLIED = {
+    "support": support_clauses,
+    "cardinality": cardinality_clauses,
+    "exclusion": exclusion_clauses,
+}
+
+
+def implied_clauses(model, families):
+    """
+    Renvoie la liste des clauses impliquées des familles choisies (noms de
+    IMPLIED) pour la grille (GridModel, ou liste [width, height, zones,
+    blacks]).
+    """
+    if not isinstance(model, GridModel):
+        model = GridModel.from_lists(*model)
+    cnf = []
+    for family in families:
+        if family not in IMPLIED:
+            raise ValueError("unknown implied clauses: {}".format(family))
+        cnf.extend(IMPLIED[family](model))
+    return cnf
@@ -0,0 +1,304 @@
+"""
+Instrumentation légère de la bibliothèque.
+
+Chaque étape instrumentée (génération des clauses, réduction en 3-SAT,
+écriture DIMACS, appel au satsolver...) enregistre son temps d'exécution, le
+nombre de clauses et de variables manipulées et le pic mémoire mesuré par
+tracemalloc. Le rapport est émis au format JSON à la fin du programme.
+
+Activation:
+  - variable d'environnement DOSUN_PROFILE: chemin du rapport JSON à écrire,
+    ou "1" / "-" pour l'écrire sur la sortie d'erreur
+  - variable d'environnement DOSUN_PROFILE_CPROFILE (optionnelle): dossier
+    dans lequel enregistrer un dump cProfile par étape
+  - ou bien appel à enable() (option --profile des scripts)
+
+Quand l'instrumentation est désactivée, stage() renvoie un objet vide
+partagé et profiled() se contente d'un test de booléen: le surcoût est
+négligeable.
+"""
+import atexit
+import os
+import sys
+import time
+from functools import wraps
+
+
+_enabled = False
+_report_path = None
+_cprofile_dir = None
+_records = []
+_stack = []
+_atexit_registered = False
+
+
+class _NullStage:
+    """
+    Etape factice renvoyée quand l'instrumentation est désactivée.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def record(self, **counters):
+        pass
+
+    def record_cnf(self, cnf):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """
+    Etape instrumentée, à utiliser comme gestionnaire de contexte.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        self.profiler = None
+
+    def __bool__(self):
+        return True
+
+    def record(self, **counters):
+        """
+        Ajoute des compteurs (entiers) au rapport de l'étape.
+        """
+        self.counters.update(counters)
+
+    def record_cnf(self, cnf):
+        """
+        Ajoute au rapport le nombre de clauses et de variables de la formule
+        fournie en argument.
+        """
+        self.counters.update(cnf_stats(cnf))
+
+    def __enter__(self):
+        import tracemalloc
+
+        # Le pic mémoire d'une étape englobante ne doit pas être perdu
+        # lorsqu'on remet à zéro le pic pour cette étape
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, tracemalloc.get_traced_memory()[1])
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self.base, self.peak = tracemalloc.get_traced_memory()
+        # cProfile ne supporte qu'un profileur actif à la fois: on ne profile
+        # que les étapes les plus externes
+        if _cprofile_dir is not None and not _stack:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        _stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        import tracemalloc
+
+        elapsed = time.perf_counter() - self.start
+        _stack.pop()
+        peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, peak)
+        record = {
+            "stage": self.name,
+            "depth": len(_stack),
+            "wall_time": elapsed,
+            "memory_peak": peak - self.base,
+        }
+        record.update(self.counters)
+        if self.profiler is not None:
+            self.profiler.disable()
+            dump = os.path.join(
+                _cprofile_dir, "{:03d}-{}.prof".format(len(_records), self.name)
+            )
+            self.profiler.dump_stats(dump)
+            record["cprofile"] = dump
+        _records.append(record)
+        return False
+
+
+def cnf_stats(cnf):
+    """
+    Renvoie le nombre de clauses et le nombre de variables (plus grand indice
+    de variable utilisé) de la formule fournie en argument.
+    """
+    nb_vars = 0
+    for clause in cnf:
+        for variable in clause:
+            if variable > nb_vars:
+                nb_vars = variable
+            elif -variable > nb_vars:
+                nb_vars = -variable
+    return {"clauses": len(cnf), "variables": nb_vars}
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(report_path="-", cprofile_dir=None):
+    """
+    Active l'instrumentation.
+    Arguments:
+      - report_path: fichier dans lequel écrire le rapport JSON à la fin du
+                     programme ("-" pour la sortie d'erreur, None pour ne rien
+                     écrire automatiquement)
+      - cprofile_dir (optionnel): dossier où enregistrer un dump cProfile par
+                                  étape
+    """
+    # tracemalloc (et json, pour le rapport) ne sont importés que si
+    # l'instrumentation est activée
+    import tracemalloc
+
+    global _enabled, _report_path, _cprofile_dir, _atexit_registered
+    _enabled = True
+    _report_path = report_path
+    _cprofile_dir = cprofile_dir
+    if cprofile_dir is not None:
+        os.makedirs(cprofile_dir, exist_ok=True)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not _atexit_registered:
+        atexit.register(_write_report_at_exit)
+        _atexit_registered = True
+
+
+def disable():
+    """
+    Désactive l'instrumentation (les mesures déjà faites sont conservées).
+    """
+    global _enabled
+    _enabled = False
+    if "tracemalloc" in sys.modules and sys.modules["tracemalloc"].is_tracing():
+        sys.modules["tracemalloc"].stop()
+
+
+def stage(name):
+    """
+    Renvoie le gestionnaire de contexte mesurant l'étape name, ou un objet
+    vide si l'instrumentation est désactivée. Exemple:
+        with stage("pycosat") as st:
+            solution = sat.solve(cnf)
+            st.record_cnf(cnf)
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return Stage(name)
+
+
+def profiled(name, count_result=False, count_arg=None):
+    """
+    Décorateur mesurant chaque appel de la fonction décorée comme une étape
+    name. Si count_result est vrai, la valeur renvoyée (une liste de clauses)
+    est comptée avec cnf_stats. Si count_arg est un entier, c'est l'argument
+    positionnel correspondant qui est compté.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Stage(name) as st:
+                result = function(*args, **kwargs)
+                if count_result:
+                    st.record_cnf(result)
+                elif count_arg is not None:
+                    st.record_cnf(args[count_arg])
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def report():
+    """
+    Renvoie le rapport des étapes mesurées: la liste détaillée de chaque
+    étape et un résumé cumulé par nom d'étape.
+    """
+    totals = {}
+    for record in _records:
+        total = totals.setdefault(
+            record["stage"], {"calls": 0, "wall_time": 0.0, "memory_peak": 0}
+        )
+        total["calls"] += 1
+        total["wall_time"] += record["wall_time"]
+        total["memory_peak"] = max(total["memory_peak"], record["memory_peak"])
+    return {"stages": list(_records), "totals": totals}
+
+
+def write_report(path="-"):
+    """
+    Ecrit le rapport au format JSON dans le fichier fourni en argument ("-"
+    pour la sortie d'erreur).
+    """
+    import json
+
+    content = json.dumps(report(), indent=2)
+    if path == "-":
+        print(content, file=sys.stderr)
+    else:
+        with open(path, "w") as out_file:
+            out_file.write(content)
+
+
+def reset():
+    """
+    Oublie toutes les mesures effectuées.
+    """
+    del _records[:]
+
+
+def parse_cli_flags(args):
+    """
+    Extrait de la liste d'arguments fournie les options --profile[=rapport.json]
+    et --cprofile=dossier, active l'instrumentation si besoin et renvoie la
+    liste des arguments restants.
+    """
+    remaining = []
+    report_path = None
+    cprofile_dir = None
+    for arg in args:
+        if arg == "--profile":
+            report_path = "-"
+        elif arg.startswith("--profile="):
+            report_path = arg.split("=", 1)[1]
+        elif arg.startswith("--cprofile="):
+            cprofile_dir = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    if report_path is not None or cprofile_dir is not None:
+        enable(report_path if report_path is not None else "-", cprofile_dir)
+    return remaining
+
+
+def _write_report_at_exit():
+    if _report_path is not None and _records:
+        write_report(_report_path)
+
+
+def _configure_from_env():
+    path = os.environ.get("DOSUN_PROFILE")
+    cprofile_dir = os.environ.get("DOSUN_PROFILE_CPROFILE")
+    if path or cprofile_dir:
+        if not path or path == "1":
+            path = "-"
+        enable(path, cprofile_dir)
+
+
+_configure_from_env()
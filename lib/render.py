@@ -0,0 +1,198 @@
+"""
+Images des grilles et de leurs solutions, sans interface graphique (ni
+tkinter): recueils de grilles produits par lots, illustrations.
+
+Le dessin reprend celui du canvas de l'éditeur (lib/grid, mêmes couleurs et
+mêmes proportions): cases blanches ou noires, bordures noires entre les
+zones, ballons (cercles blancs) et pierres (cercles noirs).
+
+L'image est un tableau numpy d'indices de couleurs (voir PALETTE), de forme
+(hauteur, largeur) en pixels:
+  - le fond (cases et bordures) ne dépend que de la case du pixel et de sa
+    position dans la case (bordure ou intérieur): il est obtenu en indexant
+    une petite table (deux lignes et deux colonnes par case) par les codes
+    des lignes et des colonnes de pixels;
+  - les ballons et les pierres sont des motifs précalculés, copiés dans
+    toutes les cases concernées à la fois.
+Les images sont enregistrées en PNG (palette de 4 couleurs, 2 bits par
+pixel, compressé avec zlib) ou en PPM binaire, sans autre bibliothèque.
+
+    image = render(model, layout)    # layout: voir gen_formule.decode_solution
+    save_image(image, "grille.png")
+"""
+import struct
+import zlib
+
+from lib.grid_model import GridModel, BLACK, NO_ZONE
+
+# Dimensions par défaut, en pixels (celles de lib/grid)
+CELL_WIDTH = 50
+BORDER_WIDTH = 4
+
+# Couleurs des images (indices dans PALETTE), celles du canvas de lib/grid
+WHITE = 0
+INK = 1  # cases noires, bordures entre zones, pierres, contours des cercles
+FRAME = 2  # bordures entre cases hors zone (Grid.border_colour)
+SEAM = 3  # bordures entre deux cases d'une même zone
+PALETTE = (
+    (0xFF, 0xFF, 0xFF),
+    (0x00, 0x00, 0x00),
+    (0xAF, 0xAF, 0xAF),
+    (0xAA, 0xAA, 0xAA),
+)
+
+# Niveau de compression zlib des PNG
+PNG_LEVEL = 6
+
+
+def _borders(numpy, first, second):
+    # couleur des bordures entre les cases de numéros first et second
+    # (voir Grid.on_change)
+    return numpy.where(
+        (first < 0) & (second < 0), FRAME, numpy.where(first == second, SEAM, INK)
+    )
+
+
+def _stamps(numpy, cell_width):
+    # masques (cell_width, cell_width) du disque et du contour des cercles,
+    # dessinés comme par Grid.draw_solution: marge de 5 et contour de 2
+    # pixels pour des cases de 50 pixels
+    margin = cell_width / 10
+    line = max(1.0, cell_width / 25)
+    radius = cell_width / 2 - margin
+    centres = numpy.arange(cell_width) + 0.5 - cell_width / 2
+    distance = numpy.hypot(centres[:, None], centres[None, :])
+    ring = numpy.abs(distance - radius) <= line / 2
+    return distance <= radius, ring
+
+
+def _layout_array(numpy, layout, width, height):
+    if isinstance(layout, numpy.ndarray):
+        return layout.reshape(height, width)
+    return numpy.frombuffer(
+        "".join(layout).encode("ascii", "replace"), dtype=numpy.uint8
+    ).reshape(height, width)
+
+
+def render(model, layout=None, cell_width=CELL_WIDTH, border_width=BORDER_WIDTH):
+    """
+    Dessine la grille, et la solution si elle est fournie.
+    Arguments:
+      - model: GridModel de la grille (ou sa représentation JSON)
+      - layout (optionnel): disposition de la solution, liste de chaînes
+                            (voir gen_formule.decode_solution) ou tableau
+                            numpy d'octets (voir decode_solutions)
+      - cell_width, border_width (optionnels): dimensions en pixels
+    Renvoie un tableau numpy d'octets (indices dans PALETTE) de forme
+    (height * cell_width + border_width, width * cell_width + border_width).
+    """
+    import numpy
+
+    if not isinstance(model, GridModel):
+        model = GridModel.from_json(model)
+    width, height = model.width, model.height
+
+    # numéros de zone des cases, entourées de cases hors zone
+    labels = numpy.full((height + 2, width + 2), NO_ZONE, dtype=numpy.int32)
+    labels[1:-1, 1:-1] = numpy.frombuffer(model.labels, dtype=numpy.int32).reshape(height, width)
+    # bordure supérieure (horizontal) et gauche (vertical) de chaque case,
+    # lignes et colonnes supplémentaires comprises
+    horizontal = _borders(numpy, labels[:-1, 1:], labels[1:, 1:])
+    vertical = _borders(numpy, labels[1:, :-1], labels[1:, 1:])
+
+    # table du fond: ligne 2y (resp. colonne 2x) pour les pixels de la
+    # bordure supérieure (resp. gauche) de la ligne y (resp. colonne x),
+    # 2y+1 (resp. 2x+1) pour ceux de l'intérieur des cases. Comme dans le
+    # canvas, les bordures verticales sont dessinées par dessus les
+    # horizontales.
+    table = numpy.empty((2 * height + 1, 2 * width + 1), dtype=numpy.uint8)
+    table[0::2, 0::2] = vertical
+    table[0::2, 1::2] = horizontal[:, :width]
+    table[1::2, 0::2] = vertical[:height]
+    table[1::2, 1::2] = numpy.where(labels[1:-1, 1:-1] == BLACK, INK, WHITE)
+
+    def codes(size):
+        pixels = numpy.arange(size * cell_width + border_width)
+        return 2 * (pixels // cell_width) + (pixels % cell_width >= border_width)
+
+    image = table.take(codes(height), axis=0).take(codes(width), axis=1)
+    if layout is None:
+        return image
+
+    # ballons et pierres: toutes les cases d'un même symbole à la fois,
+    # vues comme des blocs de cell_width x cell_width pixels
+    layout = _layout_array(numpy, layout, width, height)
+    disc, ring = _stamps(numpy, cell_width)
+    blocks = image[: height * cell_width, : width * cell_width].reshape(
+        height, cell_width, width, cell_width
+    )
+    for symbol, fill in ((b"B", WHITE), (b"S", INK)):
+        ys, xs = numpy.nonzero(layout == ord(symbol))
+        if len(ys):
+            stamp = numpy.where(ring, INK, fill).astype(numpy.uint8)
+            blocks[ys, :, xs, :] = numpy.where(disc | ring, stamp, blocks[ys, :, xs, :])
+    return image
+
+
+def encode_png(image, level=PNG_LEVEL):
+    """
+    Renvoie le contenu d'un fichier PNG de l'image (voir render): palette
+    PALETTE, 2 bits par pixel.
+    """
+    import numpy
+
+    height, width = image.shape
+    # 4 pixels par octet, le premier dans les bits de poids fort; chaque
+    # ligne commence par l'octet de filtre 0 (aucun filtre)
+    padded = numpy.zeros((height, -(-width // 4) * 4), dtype=numpy.uint8)
+    padded[:, :width] = image
+    packed = (
+        (padded[:, 0::4] << 6) | (padded[:, 1::4] << 4) | (padded[:, 2::4] << 2) | padded[:, 3::4]
+    )
+    rows = numpy.zeros((height, packed.shape[1] + 1), dtype=numpy.uint8)
+    rows[:, 1:] = packed
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 2, 3, 0, 0, 0)),
+        chunk(b"PLTE", bytes(value for colour in PALETTE for value in colour)),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), level)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def encode_ppm(image):
+    """
+    Renvoie le contenu d'un fichier PPM binaire (P6) de l'image (voir
+    render).
+    """
+    import numpy
+
+    height, width = image.shape
+    pixels = numpy.array(PALETTE, dtype=numpy.uint8)[image]
+    return b"P6\n%d %d\n255\n" % (width, height) + pixels.tobytes()
+
+
+# Formats d'images, par extension de fichier
+ENCODERS = {".png": encode_png, ".ppm": encode_ppm}
+
+
+def save_image(image, path):
+    """
+    Enregistre l'image (voir render) au format donné par l'extension du
+    fichier (voir ENCODERS).
+    """
+    for extension, encode in ENCODERS.items():
+        if path.lower().endswith(extension):
+            with open(path, "wb") as f:
+                f.write(encode(image))
+            return
+    raise ValueError("unsupported image format: {}".format(path))
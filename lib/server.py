@@ -0,0 +1,346 @@
+"""
+Service de résolution local: un serveur HTTP (sur 127.0.0.1) qui garde en
+mémoire des processus de résolution déjà démarrés, pour éviter de payer le
+lancement de Python et l'import des bibliothèques à chaque grille.
+
+Les grilles reçues sont regroupées par lots (jusqu'à batch_size grilles, en
+attendant au plus batch_wait secondes): chaque lot est résolu d'un coup par
+un des processus. Les résultats sont gardés en cache (une grille déjà
+résolue, ou en cours de résolution, ne l'est pas deux fois). Avec un budget
+(voir lib/budget), les grilles d'un lot restées sans réponse sont
+réessayées à la fin du lot avec un budget plus grand.
+
+Requêtes:
+  - POST /solve avec une grille au format de file_io.read_grid (ou au
+    format dense de GridModel.to_json): renvoie son résultat
+  - POST /solve avec {"grids": [grille, grille, ...]}: renvoie
+    {"results": [résultat, résultat, ...]}
+  - GET /metrics: nombre de requêtes et de grilles traitées, taille de la
+    file d'attente, lots envoyés, cache, latences (médiane, 90e et 99e
+    centiles, en millisecondes)
+
+Chaque résultat est un dictionnaire:
+{
+    "status": "sat", "unsat", "unknown" (pas de réponse du satsolver) ou
+              "error" (grille invalide),
+    "layout": disposition de la solution (voir decode_solution), si "sat"
+    "message": explication, pour "unsat" (si connue) et "error"
+    "spent": {"seconds": durée du dernier essai, "budget": budget de ce
+              dernier essai}, pour "unknown" avec un budget
+}
+
+Voir lib/solve_client pour le client.
+"""
+import json
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lib.grid_model import GridModel
+from lib.budget import DEFAULT_FACTOR, DEFAULT_ROUNDS
+
+DEFAULT_PORT = 8765
+
+# état des processus de résolution (voir _init_worker)
+_worker = {}
+
+
+def _init_worker(backend, encoding, budget=None, factor=None, rounds=None):
+    # imports faits une fois pour toutes au démarrage du processus
+    from lib.backends import get_backend
+    from lib.gen_segments import ENCODERS
+    from lib.budget import parse_budget
+
+    _worker["backend"] = get_backend(backend)
+    _worker["encoder"] = ENCODERS[encoding]
+    _worker["budget"] = parse_budget(budget) if budget else None
+    _worker["factor"] = factor
+    _worker["rounds"] = rounds
+
+
+def _warm_up():
+    return True
+
+
+def _solve_batch(models):
+    """
+    Résout les grilles (GridModel) fournies, dans un processus de
+    résolution. Renvoie la liste de leurs résultats.
+    """
+    from lib.gen_formule import decode_solution
+    from lib.validate import validate_grid, unsat_reason
+    from lib.budget import solve_within, solve_batch
+
+    backend = _worker["backend"]
+    encoder = _worker["encoder"]
+
+    def attempt(index, budget):
+        model = models[index]
+        try:
+            reason = unsat_reason(validate_grid(model))
+            if reason is not None:
+                return {"status": "unsat", "message": reason["message"]}, None
+            return solve_within(backend, encoder(model), budget)
+        except Exception as error:
+            return {"status": "error", "message": str(error)}, None
+
+    # les grilles sans réponse dans le budget sont réessayées à la fin du lot
+    results = [None] * len(models)
+    for index, solution, spent in solve_batch(
+        range(len(models)), attempt, _worker["budget"], _worker["factor"], _worker["rounds"]
+    ):
+        model = models[index]
+        if isinstance(solution, dict):
+            results[index] = solution
+        elif solution == "UNSAT":
+            results[index] = {"status": "unsat"}
+        elif solution == "UNKNOWN":
+            results[index] = {"status": "unknown"}
+            if spent["budget"]:
+                results[index]["spent"] = {
+                    "seconds": round(spent["seconds"], 3),
+                    "budget": repr(spent["budget"]),
+                }
+        else:
+            results[index] = {
+                "status": "sat",
+                "layout": decode_solution(solution, model.width, model.height),
+            }
+    return results
+
+
+class SolveService:
+    """
+    Résolution de grilles par lots dans des processus déjà démarrés.
+    Arguments:
+      - backend, encoding (optionnels): satsolver et encodage (voir
+        backends.get_backend et gen_segments.ENCODERS)
+      - workers (optionnel): nombre de processus (nombre de processeurs par
+        défaut)
+      - batch_size (optionnel): nombre maximal de grilles par lot
+      - batch_wait (optionnel): attente maximale (en secondes) avant
+        d'envoyer un lot incomplet
+      - cache_size (optionnel): nombre de résultats gardés en cache
+      - budget (optionnel): budget de chaque appel au satsolver (description
+        textuelle, voir lib/budget), multiplié par factor pour chacun des
+        rounds nouveaux essais des grilles restées sans réponse
+    """
+
+    def __init__(self, backend="pycosat", encoding="classic", workers=None,
+                 batch_size=32, batch_wait=0.005, cache_size=4096,
+                 budget=None, factor=DEFAULT_FACTOR, rounds=DEFAULT_ROUNDS):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.cache_size = cache_size
+        self.pool = ProcessPoolExecutor(
+            workers,
+            initializer=_init_worker,
+            initargs=(backend, encoding, budget, factor, rounds),
+        )
+        # démarrer les processus tout de suite plutôt qu'à la première grille
+        workers = self.pool._max_workers
+        for future in [self.pool.submit(_warm_up) for _ in range(workers)]:
+            future.result()
+        self.workers = workers
+
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()  # (clé, modèle) en attente d'un lot
+        self.cache = OrderedDict()  # clé -> résultat, du plus ancien au plus récent
+        self.inflight = {}  # clé -> Future des grilles en cours de résolution
+        self.latencies = deque(maxlen=10000)
+        self.counters = {
+            "requests": 0,
+            "grids": 0,
+            "cache_hits": 0,
+            "batches": 0,
+            "solved": 0,
+        }
+        self.running = True
+        self.batcher = threading.Thread(target=self._batch_loop, daemon=True)
+        self.batcher.start()
+
+    def submit(self, grid):
+        """
+        Demande la résolution d'une grille (dictionnaire au format de
+        file_io.read_grid ou GridModel). Renvoie un
+        concurrent.futures.Future dont le résultat est le dictionnaire décrit
+        en tête de module.
+        """
+        start = time.perf_counter()
+        future = Future()
+        future.add_done_callback(
+            lambda _: self.latencies.append(time.perf_counter() - start)
+        )
+        try:
+            model = grid if isinstance(grid, GridModel) else GridModel.from_json(grid)
+        except (ValueError, KeyError, TypeError, IndexError) as error:
+            future.set_result({"status": "error", "message": str(error)})
+            return future
+        key = (model.width, model.height, model.labels.tobytes())
+        with self.lock:
+            self.counters["grids"] += 1
+            if key in self.cache:
+                self.counters["cache_hits"] += 1
+                self.cache.move_to_end(key)
+                future.set_result(self.cache[key])
+                return future
+            if key in self.inflight:
+                # même grille déjà en cours: attendre son résultat
+                self.counters["cache_hits"] += 1
+                self.inflight[key].add_done_callback(
+                    lambda done: future.set_result(done.result())
+                )
+                return future
+            self.inflight[key] = future
+        self.pending.put((key, model))
+        return future
+
+    def solve(self, grids):
+        """
+        Résout les grilles fournies et renvoie la liste de leurs résultats.
+        """
+        with self.lock:
+            self.counters["requests"] += 1
+        futures = [self.submit(grid) for grid in grids]
+        return [future.result() for future in futures]
+
+    def _batch_loop(self):
+        while self.running:
+            item = self.pending.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.running = False
+                    break
+                batch.append(item)
+            keys = [key for key, _ in batch]
+            with self.lock:
+                self.counters["batches"] += 1
+            try:
+                task = self.pool.submit(_solve_batch, [model for _, model in batch])
+            except RuntimeError as error:
+                # service arrêté
+                self._finish(keys, None, error)
+                continue
+            task.add_done_callback(lambda done, keys=keys: self._finish(keys, done))
+
+    def _finish(self, keys, task, error=None):
+        if error is None:
+            error = task.exception()
+        if error is not None:
+            results = [{"status": "error", "message": str(error)}] * len(keys)
+        else:
+            results = task.result()
+        with self.lock:
+            futures = [self.inflight.pop(key) for key in keys]
+            for key, result in zip(keys, results):
+                if result["status"] in ("sat", "unsat"):
+                    self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.counters["solved"] += len(keys)
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def metrics(self):
+        """
+        Renvoie les mesures du service (voir GET /metrics).
+        """
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(1000 * latencies[index], 3)
+
+        with self.lock:
+            metrics = dict(self.counters)
+            metrics["in_flight"] = len(self.inflight)
+            metrics["cache_size"] = len(self.cache)
+        metrics["queue_depth"] = self.pending.qsize()
+        metrics["workers"] = self.workers
+        metrics["mean_batch_size"] = (
+            round(metrics["solved"] / metrics["batches"], 2) if metrics["batches"] else None
+        )
+        metrics["latency_ms"] = {
+            "p50": percentile(0.5),
+            "p90": percentile(0.9),
+            "p99": percentile(0.99),
+        }
+        return metrics
+
+    def close(self):
+        self.running = False
+        self.pending.put(None)
+        self.batcher.join()
+        self.pool.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # self.server.service: SolveService
+
+    def _reply(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(200, self.server.service.metrics())
+        else:
+            self._reply(404, {"error": "unknown path: {}".format(self.path)})
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self._reply(404, {"error": "unknown path: {}".format(self.path)})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+        except ValueError as error:
+            self._reply(400, {"error": "invalid JSON: {}".format(error)})
+            return
+        if isinstance(request, dict) and "grids" in request:
+            self._reply(200, {"results": self.server.service.solve(request["grids"])})
+        else:
+            self._reply(200, self.server.service.solve([request])[0])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """
+    Lance le serveur HTTP du service fourni (bloquant, jusqu'à Ctrl-C).
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    # arrêt propre (processus de résolution compris) sur SIGTERM aussi
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,153 @@
+"""
+Parcours page par page des solutions d'une grille (boutons Next/Previous de
+l'éditeur), sans bloquer l'interface.
+
+Les solutions sont énumérées par pycosat.itersolve sur la formule de gen_cnf,
+restreintes aux variables des cases, dans un thread: le générateur n'avance
+que lorsqu'une page pas encore calculée est demandée (plus la suivante,
+calculée d'avance pour que "Next" soit immédiat). Seules les cache_size
+dernières pages consultées sont gardées: la mémoire utilisée ne dépend pas
+du nombre de solutions. Une page oubliée est recalculée en reprenant
+l'énumération depuis le début (itersolve énumère toujours dans le même
+ordre).
+
+    pager = SolutionPager(model, first_solution)
+    layout = pager.request(3)  # None si la page n'est pas encore prête
+    ...
+    layout = pager.get(3)      # à interroger régulièrement (Tk: after)
+
+Les pages sont des dispositions (voir gen_formule.decode_solution). Les
+cases hors zone doivent avoir été rendues noires (Grid.solve): chaque
+solution de la formule est alors une disposition différente.
+"""
+import threading
+from collections import OrderedDict
+
+from lib.gen_formule import gen_cnf, decode_solution
+
+
+def _solutions(model, first=None):
+    """
+    Enumère les solutions de la grille (listes d'entiers restreintes aux
+    variables des cases), en commençant par first si elle est fournie.
+    """
+    import pycosat
+
+    nb_vars = 3 * model.width * (model.height + 2)
+    cnf = gen_cnf(model)
+    if first is not None:
+        first = list(first[:nb_vars])
+        yield first
+        # les autres solutions sont différentes de first
+        cnf.append([-literal for literal in first])
+    for solution in pycosat.itersolve(cnf):
+        yield solution[:nb_vars]
+
+
+class SolutionPager:
+    """
+    Pages des solutions d'une grille, calculées à la demande dans un thread.
+    Arguments:
+      - model: GridModel de la grille
+      - first (optionnel): solution déjà trouvée (format de pycosat), qui
+                           sera la page 0
+      - cache_size (optionnel): nombre maximal de pages gardées
+    """
+
+    cache_size = 256
+
+    def __init__(self, model, first=None, cache_size=None):
+        self.model = model
+        self.first = first
+        if cache_size is not None:
+            self.cache_size = cache_size
+        self.pages = OrderedDict()  # indice -> disposition, la plus récente en dernier
+        self.total = None  # nombre de solutions, connu une fois l'énumération finie
+        self.target = None  # page demandée
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def request(self, index):
+        """
+        Demande la page index et renvoie sa disposition si elle est déjà
+        prête, None sinon (voir get).
+        """
+        with self.condition:
+            self.target = index
+            self.condition.notify()
+            return self._lookup(index)
+
+    def get(self, index):
+        """
+        Renvoie la disposition de la page index si elle est prête, None
+        sinon.
+        """
+        with self.condition:
+            return self._lookup(index)
+
+    def exists(self, index):
+        """
+        Renvoie False si la grille a moins de index + 1 solutions, True si
+        elle en a au moins autant, None si on ne le sait pas encore.
+        """
+        with self.condition:
+            if index in self.pages:
+                return True
+            if self.total is not None:
+                return index < self.total
+            return None
+
+    def close(self):
+        """
+        Arrête le thread (à la fin du calcul de la solution en cours).
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def _lookup(self, index):
+        layout = self.pages.get(index)
+        if layout is not None:
+            self.pages.move_to_end(index)
+        return layout
+
+    def _wanted(self, position):
+        # prochaine page à calculer (la page demandée, puis la suivante), ou
+        # None s'il n'y a rien à faire
+        if self.target is None:
+            return None
+        for index in (self.target, self.target + 1):
+            if index not in self.pages and (self.total is None or index < self.total):
+                return index
+        return None
+
+    def _run(self):
+        solutions = None
+        position = 0  # indice de la prochaine solution de solutions
+        while True:
+            with self.condition:
+                while not self.closed and self._wanted(position) is None:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                wanted = self._wanted(position)
+            if solutions is None or wanted < position:
+                # page oubliée: reprendre l'énumération depuis le début
+                solutions = _solutions(self.model, self.first)
+                position = 0
+            solution = next(solutions, None)
+            layout = None
+            if solution is not None:
+                layout = decode_solution(solution, self.model.width, self.model.height)
+            with self.condition:
+                if layout is None:
+                    self.total = position
+                    solutions = None
+                    continue
+                self.pages[position] = layout
+                self.pages.move_to_end(position)
+                while len(self.pages) > self.cache_size:
+                    self.pages.popitem(last=False)
+                position += 1
@@ -0,0 +1,61 @@
+"""
+Client du service de résolution local (voir lib/server). N'importe que la
+bibliothèque standard: un script client démarre bien plus vite qu'un script
+qui résout lui-même les grilles.
+"""
+import json
+import socket
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+# nombre de grilles envoyées par requête
+CHUNK_SIZE = 256
+
+
+def _request(url, data=None):
+    # requête HTTP minimale sur une socket: urllib.request coûte à lui seul
+    # plusieurs dizaines de millisecondes d'imports
+    address, _, path = url.partition("://")[2].partition("/")
+    host, _, port = address.partition(":")
+    method = "GET" if data is None else "POST"
+    body = b"" if data is None else json.dumps(data).encode()
+    request = (
+        "{} /{} HTTP/1.0\r\nHost: {}\r\nContent-Type: application/json\r\n"
+        "Content-Length: {}\r\n\r\n".format(method, path, address, len(body))
+    ).encode()
+    with socket.create_connection((host, int(port or 80))) as connection:
+        connection.sendall(request + body)
+        chunks = []
+        while True:
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    head, _, content = b"".join(chunks).partition(b"\r\n\r\n")
+    status = head.split(b"\r\n", 1)[0].split()
+    if len(status) < 2 or status[1] != b"200":
+        raise OSError("{} {}: {}".format(method, url, content.decode(errors="replace")))
+    return json.loads(content)
+
+
+def solve_remote(grids, url=DEFAULT_URL):
+    """
+    Fait résoudre les grilles fournies (itérable de dictionnaires au format
+    de file_io.read_grid) par le service. Renvoie leurs résultats (voir
+    lib/server), dans l'ordre, au fur et à mesure.
+    """
+    chunk = []
+    for grid in grids:
+        chunk.append(grid)
+        if len(chunk) == CHUNK_SIZE:
+            yield from _request(url + "/solve", {"grids": chunk})["results"]
+            chunk = []
+    if chunk:
+        yield from _request(url + "/solve", {"grids": chunk})["results"]
+
+
+def remote_metrics(url=DEFAULT_URL):
+    """
+    Renvoie les mesures du service (voir lib/server).
+    """
+    return _request(url + "/metrics")
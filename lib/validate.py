@@ -0,0 +1,224 @@
+"""
+Vérification d'une grille avant résolution, en temps linéaire en le nombre
+de cases.
+
+validate_grid() renvoie une liste de diagnostics, chacun étant un
+dictionnaire:
+{
+    "severity": "unsat" (la grille n'a certainement pas de solution),
+                "error" (grille mal formée) ou "warning",
+    "code": identifiant du problème (voir ci-dessous),
+    "message": description du problème,
+    "zone": indice de la zone concernée (ou None),
+    "cells": liste des cases concernées [[x1, y1], [x2, y2], ...]
+}
+
+Codes:
+  - "out-of-bounds" (error): case de zone ou case noire hors de la grille
+  - "overlap" (error): case présente dans plusieurs zones
+  - "black-in-zone" (warning): case noire présente dans une zone
+  - "disconnected" (warning): zone en plusieurs morceaux
+  - "unassigned" (warning): cases ni noires ni dans une zone (Grid.solve les
+    rend noires)
+  - "empty-zone" (unsat): zone sans case blanche
+  - "single-cell" (unsat): zone d'une seule case blanche, qui devrait
+    contenir à la fois le ballon et la pierre
+  - "no-balloon-cell" / "no-stone-cell" (unsat): aucune case de la zone ne
+    peut contenir le ballon (resp. la pierre)
+
+Supports des colonnes: un ballon dans une case impose des ballons dans
+toutes les cases au-dessus d'elle jusqu'à la première case noire (ou au
+bord). Une case ne peut donc contenir un ballon que si les cases au-dessus
+d'elle dans son segment de colonne (elle comprise) appartiennent à des zones
+toutes différentes. Ces cases se calculent en un seul parcours de chaque
+colonne (idem vers le bas pour les pierres).
+"""
+from lib.grid_model import unpack_grid
+
+
+def _diagnostic(severity, code, message, zone=None, cells=()):
+    return {
+        "severity": severity,
+        "code": code,
+        "message": message,
+        "zone": zone,
+        "cells": [list(cell) for cell in cells],
+    }
+
+
+def _find(parent, i):
+    # union-find avec compression de chemin par division
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _supported(width, zone_of, blacks, rows):
+    """
+    Renvoie, pour chaque case, True si les cases de son segment de colonne
+    parcourues avant elle (dans l'ordre des lignes fourni) et elle-même
+    appartiennent toutes à des zones différentes.
+    """
+    supported = bytearray(len(zone_of))
+    # seen[z] == numéro du segment courant si la zone z y est déjà apparue
+    seen = {}
+    segment = 0
+    for x in range(width):
+        segment += 1
+        valid = True
+        for y in rows:
+            c = y * width + x
+            if blacks[c]:
+                segment += 1
+                valid = True
+                continue
+            z = zone_of[c]
+            if z >= 0:
+                if seen.get(z) == segment:
+                    valid = False
+                seen[z] = segment
+            supported[c] = valid
+    return supported
+
+
+def validate_grid(width, height=None, zones=None, blacks=None):
+    """
+    Vérifie la grille et renvoie la liste de ses diagnostics (liste vide si
+    rien n'a été détecté). Un diagnostic de sévérité "unsat" prouve que la
+    grille n'a pas de solution; l'absence de tels diagnostics ne prouve pas
+    qu'elle en a une.
+    """
+    width, height, zones, blacks = unpack_grid(width, height, zones, blacks)
+    diagnostics = []
+    size = width * height
+
+    black = bytearray(size)
+    outside = []
+    for x, y in blacks:
+        if 0 <= x < width and 0 <= y < height:
+            black[y * width + x] = 1
+        else:
+            outside.append((x, y))
+
+    zone_of = [-1] * size
+    overlaps = []
+    black_cells = []
+    white = [[] for _ in zones]  # cases blanches de chaque zone
+    for z, zone in enumerate(zones):
+        for x, y in zone:
+            if not (0 <= x < width and 0 <= y < height):
+                outside.append((x, y))
+                continue
+            c = y * width + x
+            if zone_of[c] >= 0 and zone_of[c] != z:
+                # la case reste une case de la zone pour les vérifications
+                # suivantes, mais n'en change pas
+                overlaps.append((x, y))
+            else:
+                zone_of[c] = z
+            if black[c]:
+                black_cells.append((x, y))
+            else:
+                white[z].append(c)
+
+    if outside:
+        diagnostics.append(_diagnostic(
+            "error", "out-of-bounds",
+            "{} cell(s) outside of the {}x{} grid".format(len(outside), width, height),
+            cells=outside,
+        ))
+    if overlaps:
+        diagnostics.append(_diagnostic(
+            "error", "overlap",
+            "{} cell(s) belong to several zones".format(len(overlaps)),
+            cells=overlaps,
+        ))
+    if black_cells:
+        diagnostics.append(_diagnostic(
+            "warning", "black-in-zone",
+            "{} black cell(s) belong to a zone".format(len(black_cells)),
+            cells=black_cells,
+        ))
+    unassigned = [
+        (c % width, c // width)
+        for c in range(size)
+        if zone_of[c] < 0 and not black[c]
+    ]
+    if unassigned:
+        diagnostics.append(_diagnostic(
+            "warning", "unassigned",
+            "{} cell(s) are neither black nor in a zone".format(len(unassigned)),
+            cells=unassigned,
+        ))
+
+    # morceaux de chaque zone: union des cases voisines de la même zone
+    parent = list(range(size))
+    for c in range(size):
+        z = zone_of[c]
+        if z < 0 or black[c]:
+            continue
+        for d in (c + 1 if (c + 1) % width else -1, c + width):
+            if 0 <= d < size and zone_of[d] == z and not black[d]:
+                root_c, root_d = _find(parent, c), _find(parent, d)
+                if root_c != root_d:
+                    parent[root_d] = root_c
+
+    balloon_ok = _supported(width, zone_of, black, range(height))
+    stone_ok = _supported(width, zone_of, black, range(height - 1, -1, -1))
+
+    for z, cells in enumerate(white):
+        xy = [(c % width, c // width) for c in cells]
+        if not cells:
+            diagnostics.append(_diagnostic(
+                "unsat", "empty-zone",
+                "zone {} has no white cell".format(z),
+                zone=z, cells=map(tuple, zones[z]),
+            ))
+            continue
+        if len(cells) == 1:
+            diagnostics.append(_diagnostic(
+                "unsat", "single-cell",
+                "zone {} has a single white cell for both its balloon and its stone".format(z),
+                zone=z, cells=xy,
+            ))
+            continue
+        if len({_find(parent, c) for c in cells}) > 1:
+            diagnostics.append(_diagnostic(
+                "warning", "disconnected",
+                "zone {} is not connected".format(z),
+                zone=z, cells=xy,
+            ))
+        if not any(balloon_ok[c] for c in cells):
+            diagnostics.append(_diagnostic(
+                "unsat", "no-balloon-cell",
+                "no cell of zone {} can hold a balloon".format(z),
+                zone=z, cells=xy,
+            ))
+        if not any(stone_ok[c] for c in cells):
+            diagnostics.append(_diagnostic(
+                "unsat", "no-stone-cell",
+                "no cell of zone {} can hold a stone".format(z),
+                zone=z, cells=xy,
+            ))
+    return diagnostics
+
+
+def unsat_reason(diagnostics):
+    """
+    Renvoie le premier diagnostic prouvant que la grille n'a pas de
+    solution, ou None.
+    """
+    for diagnostic in diagnostics:
+        if diagnostic["severity"] == "unsat":
+            return diagnostic
+    return None
+
+
+def format_diagnostic(diagnostic):
+    """
+    Renvoie le diagnostic sous forme d'une ligne de texte.
+    """
+    return "{}: {} [{}]".format(
+        diagnostic["severity"], diagnostic["message"], diagnostic["code"]
+    )
@@ -0,0 +1,168 @@
+"""
+Vérification de solutions décodées, indépendante de l'encodage SAT.
+
+Les solutions renvoyées par un satsolver (display_sat_results.py, Grid)
+sont vérifiées directement sur les règles du jeu, ce qui détecte aussi bien
+un satsolver défaillant qu'une erreur dans un encodage:
+  - chaque zone contient exactement un ballon et une pierre
+  - les cases noires de la solution sont celles de la grille
+  - chaque ballon est sous un ballon, une case noire ou le bord du haut
+  - chaque pierre est sur une pierre, une case noire ou le bord du bas
+
+Avec numpy, les solutions sont empilées en un tableau (solutions, lignes,
+colonnes) et chaque règle est vérifiée pour toutes les solutions à la fois
+(décalage d'une ligne pour les supports, sommes par zone pour les
+ballons et les pierres). Sans numpy, les solutions sont vérifiées une par
+une.
+
+Le résultat est, pour chaque solution, un ensemble de drapeaux (0 si la
+solution est valide), voir ERRORS.
+"""
+from lib.grid_model import GridModel, BLACK
+
+ZONE_BALLOON = 1
+ZONE_STONE = 2
+BLACK_CELLS = 4
+BALLOON_SUPPORT = 8
+STONE_SUPPORT = 16
+
+ERRORS = {
+    ZONE_BALLOON: "a zone does not have exactly one balloon",
+    ZONE_STONE: "a zone does not have exactly one stone",
+    BLACK_CELLS: "black cells differ from the grid",
+    BALLOON_SUPPORT: "a balloon is not below a balloon or a black cell",
+    STONE_SUPPORT: "a stone is not on a stone or a black cell",
+}
+
+# nombre de solutions vérifiées à la fois avec numpy
+CHUNK_SIZE = 1 << 16
+
+
+def describe(flags):
+    """
+    Renvoie la liste des messages correspondant aux drapeaux fournis.
+    """
+    return [message for flag, message in ERRORS.items() if flags & flag]
+
+
+def _verify_python(model, layout):
+    width, height, labels = model.width, model.height, model.labels
+    flags = 0
+    balloons = [0] * model.nb_zones
+    stones = [0] * model.nb_zones
+    for y in range(height):
+        for x in range(width):
+            c = y * width + x
+            symbol = layout[y][x]
+            if (symbol == "N") != (labels[c] == BLACK) or symbol not in "BSN-":
+                flags |= BLACK_CELLS
+            if symbol == "B":
+                if labels[c] >= 0:
+                    balloons[labels[c]] += 1
+                if y > 0 and layout[y - 1][x] != "B" and labels[c - width] != BLACK:
+                    flags |= BALLOON_SUPPORT
+            elif symbol == "S":
+                if labels[c] >= 0:
+                    stones[labels[c]] += 1
+                if y < height - 1 and layout[y + 1][x] != "S" and labels[c + width] != BLACK:
+                    flags |= STONE_SUPPORT
+    if any(count != 1 for count in balloons):
+        flags |= ZONE_BALLOON
+    if any(count != 1 for count in stones):
+        flags |= ZONE_STONE
+    return flags
+
+
+def _verify_numpy(numpy, model, codes):
+    # codes: tableau d'octets (solutions, height, width) des symboles
+    width, height = model.width, model.height
+    labels = numpy.frombuffer(model.labels, dtype=numpy.int32).reshape(height, width)
+    black = labels == BLACK
+    balloon = codes == ord("B")
+    stone = codes == ord("S")
+    flags = numpy.zeros(len(codes), dtype=numpy.uint8)
+
+    # cases noires (et symboles inconnus)
+    wrong = (codes == ord("N")) != black
+    wrong |= ~(balloon | stone | (codes == ord("N")) | (codes == ord("-")))
+    flags[wrong.reshape(len(codes), -1).any(axis=1)] |= BLACK_CELLS
+
+    # supports, par décalage d'une ligne dans chaque colonne
+    unsupported = balloon[:, 1:] & ~(balloon[:, :-1] | black[:-1])
+    flags[unsupported.reshape(len(codes), -1).any(axis=1)] |= BALLOON_SUPPORT
+    unsupported = stone[:, :-1] & ~(stone[:, 1:] | black[1:])
+    flags[unsupported.reshape(len(codes), -1).any(axis=1)] |= STONE_SUPPORT
+
+    # un ballon et une pierre par zone: cases triées par zone, puis sommes
+    # par tranche
+    flat = labels.reshape(-1)
+    cells = numpy.flatnonzero(flat >= 0)
+    cells = cells[numpy.argsort(flat[cells], kind="stable")]
+    zones, starts = numpy.unique(flat[cells], return_index=True)
+    if len(zones) < model.nb_zones:
+        # zone vide: aucune solution n'est valide
+        flags |= ZONE_BALLOON | ZONE_STONE
+    elif len(zones):
+        for objects, flag in ((balloon, ZONE_BALLOON), (stone, ZONE_STONE)):
+            counts = numpy.add.reduceat(
+                objects.reshape(len(codes), -1)[:, cells], starts, axis=1, dtype=numpy.int32
+            )
+            flags[(counts != 1).any(axis=1)] |= flag
+    return flags
+
+
+def verify_layouts(model, layouts):
+    """
+    Vérifie des solutions de la grille (GridModel ou dictionnaire au format
+    de file_io.read_grid). layouts est soit une liste de dispositions (voir
+    gen_formule.decode_solution), soit un tableau numpy d'octets de forme
+    (solutions, height, width) tel que renvoyé par decode_solutions.
+    Renvoie la liste (ou le tableau numpy) des drapeaux de chaque solution.
+    """
+    if not isinstance(model, GridModel):
+        model = GridModel.from_json(model)
+    try:
+        import numpy
+    except ImportError:
+        return [_verify_python(model, layout) for layout in layouts]
+
+    if not isinstance(layouts, numpy.ndarray):
+        layouts = numpy.frombuffer(
+            "".join("".join(layout) for layout in layouts).encode("ascii", "replace"),
+            dtype=numpy.uint8,
+        ).reshape(-1, model.height, model.width)
+    return numpy.concatenate(
+        [numpy.zeros(0, dtype=numpy.uint8)]
+        + [
+            _verify_numpy(numpy, model, layouts[start : start + CHUNK_SIZE])
+            for start in range(0, len(layouts), CHUNK_SIZE)
+        ]
+    )
+
+
+def verify_models(model, solutions):
+    """
+    Décode puis vérifie des solutions au format de pycosat (liste de listes
+    d'entiers, ou tableau numpy d'une solution par ligne, voir
+    display_sat_results.parse_models), par paquets.
+    Renvoie la liste (ou le tableau numpy) des drapeaux de chaque solution.
+    """
+    from lib.gen_formule import decode_solution, decode_solutions
+
+    if not isinstance(model, GridModel):
+        model = GridModel.from_json(model)
+    width, height = model.width, model.height
+    try:
+        import numpy
+    except ImportError:
+        return verify_layouts(
+            model, [decode_solution(solution, width, height) for solution in solutions]
+        )
+    needed = 3 * width * (height + 1)
+    flags = [numpy.zeros(0, dtype=numpy.uint8)]
+    for start in range(0, len(solutions), CHUNK_SIZE):
+        chunk = solutions[start : start + CHUNK_SIZE]
+        if not isinstance(chunk, numpy.ndarray):
+            chunk = numpy.array([solution[:needed] for solution in chunk])
+        flags.append(verify_layouts(model, decode_solutions(chunk, width, height)))
+    return numpy.concatenate(flags)
@@ -18,6 +18,7 @@ from tkinter import (
 from tkinter.ttk import Button, Label, Frame, Entry
 from tkinter.filedialog import askopenfilename, asksaveasfilename
 from tkinter.messagebox import askyesno
+from sys import argv
 
 # Classe de la grille de Dosun Fuwari (basée sur un tkinter.Canvas)
 from lib.grid import Grid
@@ -25,6 +26,9 @@ from lib.grid import Grid
 import lib.file_io as fio
 # Fonctions de résolution de grille
 from lib.gen_formule import gen_cnf, sat_3sat
+# Instrumentation (option --profile)
+from lib.profiling import parse_cli_flags
+from lib.budget import parse_budget_flags
 
 
 def quit():
@@ -129,10 +133,20 @@ class Editor_Frame(Frame):
         Button(right_bar, text="Solve!", command=self.dosun_grid.solve).grid(
             row=2, column=0, sticky=W + E
         )
-        # Dessiner la zone de texte associée au StringVar self.solvable
-        Label(right_bar, textvariable=self.solvable, font=("Helvetica", 12)).grid(
-            row=3, column=0, sticky=S, pady=(10, 10)
+        Button(right_bar, text="Hint", command=self.dosun_grid.hint).grid(
+            row=3, column=0, sticky=W + E
         )
+        # Parcourir les solutions après résolution
+        Button(
+            right_bar, text="Previous solution", command=self.dosun_grid.previous_solution
+        ).grid(row=4, column=0, sticky=W + E)
+        Button(
+            right_bar, text="Next solution", command=self.dosun_grid.next_solution
+        ).grid(row=5, column=0, sticky=W + E)
+        # Dessiner la zone de texte associée au StringVar self.solvable
+        Label(
+            right_bar, textvariable=self.solvable, font=("Helvetica", 12), wraplength=200
+        ).grid(row=6, column=0, sticky=S, pady=(10, 10))
 
     def save_grid(self):
         """
@@ -153,12 +167,17 @@ class Editor_Frame(Frame):
         """
         filename = asksaveasfilename(
             initialdir=".",
-            filetypes=(("DIMACS File", "*.cnf"), ("All Files", "*.*")),
+            filetypes=(
+                ("DIMACS File", "*.cnf"),
+                ("Compressed DIMACS File", ("*.cnf.gz", "*.cnf.xz", "*.cnf.zst")),
+                ("All Files", "*.*"),
+            ),
             title="Choose a file.",
         )
         if filename:
-            grid = self.dosun_grid.get_grid()
-            sat = gen_cnf(grid["width"], grid["height"], grid["zones"], grid["blacks"])
+            # supprimer les zones vidées pendant l'édition (voir GridEditor.compact)
+            self.dosun_grid.editor.compact()
+            sat = gen_cnf(self.dosun_grid.model)
             fio.save_dimacs(sat, filename)
 
     def export_dimacs3SAT(self):
@@ -167,13 +186,17 @@ class Editor_Frame(Frame):
         """
         filename = asksaveasfilename(
             initialdir=".",
-            filetypes=(("DIMACS File", "*.cnf"), ("All Files", "*.*")),
+            filetypes=(
+                ("DIMACS File", "*.cnf"),
+                ("Compressed DIMACS File", ("*.cnf.gz", "*.cnf.xz", "*.cnf.zst")),
+                ("All Files", "*.*"),
+            ),
             title="Choose a file.",
         )
         if filename:
-            grid = self.dosun_grid.get_grid()
-            cnf = gen_cnf(grid["width"], grid["height"], grid["zones"], grid["blacks"])
-            tab = sat_3sat(cnf, grid["height"], grid["width"])
+            self.dosun_grid.editor.compact()
+            cnf = gen_cnf(self.dosun_grid.model)
+            tab = sat_3sat(cnf, self.dosun_grid.model)
             fio.save_dimacs(tab, filename)
 
     def new_grid(self):
@@ -406,6 +429,11 @@ class Window(Tk):
 
 
 if __name__ == "__main__":
+    # options d'instrumentation: --profile[=rapport.json] --cprofile=dossier
+    parse_cli_flags(argv)
+    # budget de la résolution: --budget=propagations=N,seconds=S (voir
+    # lib/budget)
+    Grid.budget = parse_budget_flags(argv[1:])[0]
     # Créer une fenêtre Tk, la nommer et y initialiser une fenêtre principale
     root = Window()
     root.title("Dosun Fuwari Solver")
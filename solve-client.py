@@ -0,0 +1,50 @@
+#!venv/bin/python
+import json
+from sys import argv, stderr
+from lib.solve_client import solve_remote, remote_metrics, DEFAULT_URL
+
+if __name__ == "__main__":
+    # adresse du service (voir solve-server.py): --url=http://127.0.0.1:8765
+    url = DEFAULT_URL
+    for arg in argv:
+        if arg.startswith("--url="):
+            url = arg.split("=", 1)[1].rstrip("/")
+    argv = [arg for arg in argv if not arg.startswith("--url=")]
+    # afficher les mesures du service: --metrics
+    if "--metrics" in argv:
+        print(json.dumps(remote_metrics(url), indent=2))
+        exit(0)
+    if len(argv) < 2:
+        print("Erreur: veuillez fournir au moins une grille en argument", file=stderr)
+        print("Usage: {} [--url=http://127.0.0.1:8765] [--metrics] path/to/grid.json path/to/corpus.dfc ....".format(argv[0]), file=stderr)
+        exit(1)
+
+    # import différé: les corpus de grilles ne sont lus que si nécessaire
+    from lib.file_io import iter_grids
+
+    names = []
+
+    def grids():
+        for name, grid in iter_grids(argv[1:]):
+            names.append(name)
+            yield grid
+
+    print("S : stone\nB : balloon\nN : black cell\n- : empty cell\n")
+    for i, result in enumerate(solve_remote(grids(), url)):
+        if result["status"] == "error":
+            print("{}: error: {}".format(names[i], result["message"]), file=stderr)
+            continue
+        print(names[i])
+        if result["status"] == "sat":
+            for row in result["layout"]:
+                print(" ".join(row))
+        elif result["status"] == "unsat":
+            if "message" in result:
+                print("No solution found ({})".format(result["message"]))
+            else:
+                print("No solution found")
+        else:
+            print("Satsolver gave no answer")
+        print(
+            "________________________________________________________________________________\n"
+        )
@@ -0,0 +1,49 @@
+#!venv/bin/python
+from sys import argv, stderr
+from lib.server import SolveService, serve, DEFAULT_PORT
+
+if __name__ == "__main__":
+    # options: --port=N --workers=N --batch-size=N --batch-wait=ms
+    # --cache-size=N --backend=description --encoding=nom
+    # --budget=propagations=N,seconds=S --escalate=4 --rounds=2
+    options = {
+        "port": DEFAULT_PORT,
+        "workers": None,
+        "batch-size": 32,
+        "batch-wait": 5,
+        "cache-size": 4096,
+        "backend": "pycosat",
+        "encoding": "classic",
+        "budget": None,
+        "escalate": 4,
+        "rounds": 2,
+    }
+    for arg in argv[1:]:
+        name, _, value = arg[2:].partition("=")
+        if not arg.startswith("--") or name not in options or not value:
+            print("Erreur: option inconnue: {}".format(arg), file=stderr)
+            print("Usage: {} [--port=8765] [--workers=N] [--batch-size=32] [--batch-wait=5 (ms)] [--cache-size=4096] [--backend=pycosat|picosat|cmd:<commande>|...] [--encoding=classic|segments] [--budget=propagations=N,seconds=S [--escalate=4] [--rounds=2]]".format(argv[0]), file=stderr)
+            exit(1)
+        if name in ("backend", "encoding", "budget"):
+            options[name] = value
+        elif name == "escalate":
+            options[name] = float(value)
+        else:
+            options[name] = int(value)
+
+    service = SolveService(
+        backend=options["backend"],
+        encoding=options["encoding"],
+        workers=options["workers"],
+        batch_size=options["batch-size"],
+        batch_wait=options["batch-wait"] / 1000,
+        cache_size=options["cache-size"],
+        budget=options["budget"],
+        factor=options["escalate"],
+        rounds=options["rounds"],
+    )
+    print(
+        "Listening on http://127.0.0.1:{} ({} workers)".format(options["port"], service.workers),
+        file=stderr,
+    )
+    serve(service, port=options["port"])
@@ -0,0 +1,23 @@
+import pytest
+
+from lib.corpus import write_corpus, append_corpus, CorpusReader
+
+GRID = {"width": 2, "height": 2, "zones": [[[0, 0], [1, 0]], [[0, 1], [1, 1]]], "blacks": []}
+
+
+@pytest.mark.parametrize("bad", [
+    {"width": 2, "height": 2, "zones": [[[0, 0]], [[0, 0]]], "blacks": []},
+    {"width": 2, "height": 2, "zones": [[[-1, 0]]], "blacks": []},
+    {"width": 2, "height": 2, "zones": [[[2, 0]]], "blacks": []},
+    {"width": 2, "height": 2, "zones": [], "blacks": [[0, 2]]},
+    {"width": 1 << 16, "height": 1, "zones": [], "blacks": []},
+])
+def test_invalid_grid_leaves_corpus_intact(tmp_path, bad):
+    path = str(tmp_path / "corpus.dfc")
+    write_corpus(path, [GRID, GRID])
+    with pytest.raises(ValueError):
+        append_corpus(path, [GRID, bad])
+    with pytest.raises(ValueError):
+        write_corpus(path, [GRID, bad])
+    with CorpusReader(path) as corpus:
+        assert len(list(corpus)) == 2
@@ -0,0 +1,19 @@
+from lib.file_io import save_dimacs, save_dimacs_stream, read_dimacs
+from lib.gen_formule import gen_cnf, iter_cnf
+from lib.grid_model import GridModel
+
+
+def test_empty_zone_clauses_survive_dimacs(tmp_path):
+    # la zone 1 est vide: la formule contient des clauses vides
+    model = GridModel(2, 2, [0, 0, 0, 0], 2)
+    cnf = gen_cnf(model)
+    assert [] in cnf
+    for path, save in (
+        (tmp_path / "list.cnf", lambda path: save_dimacs(cnf, path)),
+        (tmp_path / "stream.cnf", lambda path: save_dimacs_stream(iter_cnf(model), path)),
+    ):
+        save(str(path))
+        header = open(str(path)).read().splitlines()[1].split()
+        assert header == ["p", "cnf", str(3 * 2 * 4), str(len(cnf))]
+        # iter_cnf ne donne pas les clauses dans le même ordre
+        assert sorted(read_dimacs(str(path))) == sorted(cnf)
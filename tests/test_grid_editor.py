@@ -0,0 +1,31 @@
+from lib.grid_editor import GridEditor
+from lib.grid_model import GridModel
+
+
+def select(editor, cells):
+    for x, y in cells:
+        editor.toggle_cell(x, y)
+
+
+def test_emptied_zone_is_reused_then_compacted():
+    editor = GridEditor(GridModel(3, 1))
+    select(editor, [(0, 0), (1, 0)])
+    editor.make_zone_from_selection()
+    select(editor, [(2, 0)])
+    editor.make_zone_from_selection()
+    # la zone 0 est vidée: elle reste un trou jusqu'à la prochaine zone
+    select(editor, [(0, 0), (1, 0)])
+    editor.toggle_selection_black()
+    assert editor.free == [0]
+    assert list(editor.model.labels) == [-1, -1, 1]
+    select(editor, [(0, 0)])
+    editor.toggle_selection_black()
+    select(editor, [(0, 0)])
+    editor.make_zone_from_selection()
+    assert list(editor.model.labels) == [0, -1, 1]
+    # zone 1 vidée, puis supprimée par compact
+    select(editor, [(2, 0)])
+    editor.toggle_selection_black()
+    editor.compact()
+    assert editor.model.nb_zones == 1
+    assert editor.model.zones() == [[[0, 0]]]
@@ -0,0 +1,15 @@
+import pytest
+
+from lib.grid_model import GridModel
+
+
+@pytest.mark.parametrize("zones, blacks", [
+    ([[[-1, 0]]], []),
+    ([[[2, 0]]], []),
+    ([[[0, 2]]], []),
+    ([], [[0, -1]]),
+    ([], [[2, 1]]),
+])
+def test_cells_outside_the_grid(zones, blacks):
+    with pytest.raises(ValueError):
+        GridModel.from_lists(2, 2, zones, blacks)
@@ -0,0 +1,25 @@
+from lib.grid_model import GridModel
+from lib.hints import HintEngine
+
+
+def test_grid_without_zones():
+    engine = HintEngine(GridModel(3, 3))
+    assert engine.next_hint() is None
+    assert engine.layout() == ["NNN"] * 3
+
+
+def test_all_black_grid():
+    blacks = [[x, y] for y in range(3) for x in range(3)]
+    engine = HintEngine(GridModel.from_lists(3, 3, [], blacks))
+    assert engine.next_hint() is None
+    assert engine.layout() == ["NNN"] * 3
+
+
+def test_unzoned_cell_ignores_other_zones():
+    # la case (1,0) n'est dans aucune zone: elle ne doit pas être comptée
+    # dans la zone de la colonne 0
+    model = GridModel.from_lists(2, 2, [[[0, 0], [0, 1]]], [])
+    engine = HintEngine(model)
+    while engine.next_hint() is not None:
+        pass
+    assert engine.layout() == ["BN", "SN"]
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_check_imports():
+    # modules sans interface graphique: ni tkinter, ni pycosat, ni numpy à
+    # l'import, dans le budget de temps (voir lib.cli.check_imports)
+    process = subprocess.run(
+        [sys.executable, "-m", "lib", "check-imports"], cwd=ROOT, capture_output=True, text=True
+    )
+    assert process.returncode == 0, process.stdout + process.stderr
+
+
+def test_solver_path_imports():
+    # résolution complète d'une grille (json-solve.py): pycosat est importé,
+    # mais ni tkinter ni numpy
+    code = (
+        "import sys\n"
+        "from lib.cli import solve\n"
+        "solve(['json-solve.py', 'example grids/grid_10x10.json'])\n"
+        "print('imported:', *[name for name in ('tkinter', 'numpy') if name in sys.modules])\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.splitlines()[-1] == "imported:"